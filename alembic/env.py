@@ -5,14 +5,15 @@ from sqlalchemy import pool
 
 from alembic import context
 from app.database.base import Base
-from app.config import settings
+from app.config import get_settings
+import app.database.models  # noqa: F401
 
 config = context.config
 
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
-config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+config.set_main_option("sqlalchemy.url", get_settings().DATABASE_URL)
 
 target_metadata = Base.metadata
 
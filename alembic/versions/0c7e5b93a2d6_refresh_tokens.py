@@ -0,0 +1,50 @@
+"""Refresh tokens
+
+Revision ID: 0c7e5b93a2d6
+Revises: f2a94c0d7b18
+Create Date: 2026-10-19 18:31:14.772590
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c7e5b93a2d6'
+down_revision: Union[str, None] = 'f2a94c0d7b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('refresh_tokens',
+    sa.Column('jti', sa.String(), nullable=False),
+    sa.Column('family', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('revoked_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('jti')
+    )
+    op.create_index(
+        op.f('ix_refresh_tokens_expires_at'), 'refresh_tokens', ['expires_at'],
+        unique=False
+    )
+    op.create_index(
+        op.f('ix_refresh_tokens_family'), 'refresh_tokens', ['family'], unique=False
+    )
+    op.create_index(
+        op.f('ix_refresh_tokens_revoked_at'), 'refresh_tokens', ['revoked_at'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_refresh_tokens_revoked_at'), table_name='refresh_tokens')
+    op.drop_index(op.f('ix_refresh_tokens_family'), table_name='refresh_tokens')
+    op.drop_index(op.f('ix_refresh_tokens_expires_at'), table_name='refresh_tokens')
+    op.drop_table('refresh_tokens')
@@ -0,0 +1,37 @@
+"""Poll closed_at
+
+Revision ID: 1c6f0a9e4b27
+Revises: a3c81f5e9d72
+Create Date: 2026-10-19 23:12:08.418306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c6f0a9e4b27'
+down_revision: Union[str, None] = 'a3c81f5e9d72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('polls', sa.Column('closed_at', sa.DateTime(), nullable=True))
+    # Для уже закрытых опросов момент закрытия неизвестен: берём close_date,
+    # если он в прошлом, иначе время миграции.
+    op.execute(
+        "UPDATE polls SET closed_at = CASE "
+        "WHEN close_date IS NOT NULL AND close_date < CURRENT_TIMESTAMP "
+        "THEN close_date ELSE CURRENT_TIMESTAMP END "
+        "WHERE is_closed"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('polls') as batch_op:
+        batch_op.drop_column('closed_at')
@@ -0,0 +1,32 @@
+"""Open polls close_date partial index
+
+Revision ID: 4d9a2f61b7e3
+Revises: e7d3b1a45c86
+Create Date: 2026-10-19 15:02:41.503718
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d9a2f61b7e3'
+down_revision: Union[str, None] = 'e7d3b1a45c86'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    open_polls = sa.column('is_closed').is_(False)
+    op.create_index(
+        'ix_polls_open_close_date', 'polls', ['close_date'], unique=False,
+        sqlite_where=open_polls, postgresql_where=open_polls
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_polls_open_close_date', table_name='polls')
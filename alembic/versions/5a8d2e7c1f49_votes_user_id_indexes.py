@@ -0,0 +1,42 @@
+"""Votes and ballots user_id indexes
+
+Revision ID: 5a8d2e7c1f49
+Revises: 0c7e5b93a2d6
+Create Date: 2026-10-19 19:05:42.118304
+
+Индексы больших таблиц можно построить заранее, не останавливая запись:
+python -m app.database.online_migrations copy-swap votes_cascade_user_id_index votes
+python -m app.database.online_migrations copy-swap ballots_user_id_index ballots
+Ревизия пропускает индексы, построенные так.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.database.online_migrations import applied_online
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a8d2e7c1f49'
+down_revision: Union[str, None] = '0c7e5b93a2d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VOTES_ONLINE_MIGRATION = 'votes_cascade_user_id_index'
+BALLOTS_ONLINE_MIGRATION = 'ballots_user_id_index'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not applied_online(VOTES_ONLINE_MIGRATION):
+        op.create_index(op.f('ix_votes_user_id'), 'votes', ['user_id'], unique=False)
+    if not applied_online(BALLOTS_ONLINE_MIGRATION):
+        op.create_index(
+            op.f('ix_ballots_user_id'), 'ballots', ['user_id'], unique=False
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_ballots_user_id'), table_name='ballots')
+    op.drop_index(op.f('ix_votes_user_id'), table_name='votes')
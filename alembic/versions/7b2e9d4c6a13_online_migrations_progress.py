@@ -0,0 +1,45 @@
+"""Online migrations progress
+
+Revision ID: 7b2e9d4c6a13
+Revises: 5a8d2e7c1f49
+Create Date: 2026-10-19 20:12:37.405118
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2e9d4c6a13'
+down_revision: Union[str, None] = '5a8d2e7c1f49'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Таблицу уже могла создать онлайн-миграция, запущенная до этой ревизии
+    if not context.is_offline_mode() and sa.inspect(
+        op.get_bind()
+    ).has_table('online_migrations'):
+        return
+    op.create_table('online_migrations',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('phase', sa.String(), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('rows_done', sa.Integer(), nullable=False),
+    sa.Column('total_rows', sa.Integer(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('online_migrations')
@@ -0,0 +1,33 @@
+"""Poll shard overrides
+
+Revision ID: 8a41d6e0c9b2
+Revises: 3b7f9c2d1e4a
+Create Date: 2026-10-19 12:03:18.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a41d6e0c9b2'
+down_revision: Union[str, None] = '3b7f9c2d1e4a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('poll_shard_overrides',
+    sa.Column('poll_id', sa.Integer(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['poll_id'], ['polls.id'], ),
+    sa.PrimaryKeyConstraint('poll_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('poll_shard_overrides')
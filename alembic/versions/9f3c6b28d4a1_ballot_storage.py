@@ -0,0 +1,41 @@
+"""Ballot storage for multiple-choice polls
+
+Revision ID: 9f3c6b28d4a1
+Revises: 4d9a2f61b7e3
+Create Date: 2026-10-19 15:41:07.281954
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f3c6b28d4a1'
+down_revision: Union[str, None] = '4d9a2f61b7e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ballots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('poll_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('selection', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['poll_id'], ['polls.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('poll_id', 'user_id')
+    )
+    op.add_column('polls', sa.Column('ballot_storage', sa.Boolean(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('polls') as batch_op:
+        batch_op.drop_column('ballot_storage')
+    op.drop_table('ballots')
@@ -0,0 +1,37 @@
+"""Archived polls
+
+Revision ID: a3c81f5e9d72
+Revises: 7b2e9d4c6a13
+Create Date: 2026-10-19 21:04:55.630941
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c81f5e9d72'
+down_revision: Union[str, None] = '7b2e9d4c6a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('archived_polls',
+    sa.Column('poll_id', sa.Integer(), nullable=False),
+    sa.Column('close_date', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.Column('location', sa.String(), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=False),
+    sa.Column('details', sa.Text(), nullable=False),
+    sa.Column('results', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('poll_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('archived_polls')
@@ -0,0 +1,29 @@
+"""Poll voting method
+
+Revision ID: b6e08d5c2f97
+Revises: 9f3c6b28d4a1
+Create Date: 2026-10-19 16:18:52.640173
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e08d5c2f97'
+down_revision: Union[str, None] = '9f3c6b28d4a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('polls', sa.Column('voting_method', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('polls') as batch_op:
+        batch_op.drop_column('voting_method')
@@ -0,0 +1,61 @@
+"""Vote change log and choice tallies
+
+Revision ID: d81f4a7e6c35
+Revises: b6e08d5c2f97
+Create Date: 2026-10-19 17:05:33.918402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f4a7e6c35'
+down_revision: Union[str, None] = 'b6e08d5c2f97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('vote_changes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('poll_id', sa.Integer(), nullable=False),
+    sa.Column('choice_id', sa.Integer(), nullable=False),
+    sa.Column('delta', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['choice_id'], ['choices.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['poll_id'], ['polls.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+    op.create_index(
+        op.f('ix_vote_changes_poll_id'), 'vote_changes', ['poll_id'], unique=False
+    )
+    op.create_table('choice_tallies',
+    sa.Column('choice_id', sa.Integer(), nullable=False),
+    sa.Column('poll_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['choice_id'], ['choices.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['poll_id'], ['polls.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('choice_id')
+    )
+    op.create_index(
+        op.f('ix_choice_tallies_poll_id'), 'choice_tallies', ['poll_id'], unique=False
+    )
+    op.create_table('change_log_cursors',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('change_log_cursors')
+    op.drop_index(op.f('ix_choice_tallies_poll_id'), table_name='choice_tallies')
+    op.drop_table('choice_tallies')
+    op.drop_index(op.f('ix_vote_changes_poll_id'), table_name='vote_changes')
+    op.drop_table('vote_changes')
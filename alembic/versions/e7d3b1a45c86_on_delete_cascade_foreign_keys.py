@@ -0,0 +1,91 @@
+"""On delete cascade foreign keys
+
+Revision ID: e7d3b1a45c86
+Revises: c52e7a9f3d10
+Create Date: 2026-10-19 14:41:02.377914
+
+Большую таблицу votes можно пересобрать заранее, не останавливая запись:
+python -m app.database.online_migrations copy-swap votes_cascade_user_id_index votes
+Тогда ревизия пересоздает только polls, choices и poll_shard_overrides.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.database.online_migrations import applied_online
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7d3b1a45c86'
+down_revision: Union[str, None] = 'c52e7a9f3d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VOTES_ONLINE_MIGRATION = 'votes_cascade_user_id_index'
+
+
+def _tables(ondelete):
+    """Определения таблиц для пересоздания в batch-режиме (SQLite)"""
+    metadata = sa.MetaData()
+    polls = sa.Table('polls', metadata,
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('creator_id', sa.Integer(), nullable=False),
+    sa.Column('is_closed', sa.Boolean(), nullable=True),
+    sa.Column('close_date', sa.DateTime(), nullable=True),
+    sa.Column('is_multiple_choice', sa.Boolean(), nullable=True),
+    sa.Column('creation_date', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['creator_id'], ['users.id'], ondelete=ondelete),
+    sa.PrimaryKeyConstraint('id'),
+    sa.Index('ix_polls_id', 'id'),
+    sa.Index('ix_polls_title', 'title')
+    )
+    choices = sa.Table('choices', metadata,
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('text', sa.String(), nullable=False),
+    sa.Column('poll_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['poll_id'], ['polls.id'], ondelete=ondelete),
+    sa.PrimaryKeyConstraint('id'),
+    sa.Index('ix_choices_id', 'id'),
+    sa.Index('ix_choices_text', 'text')
+    )
+    votes = sa.Table('votes', metadata,
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('choice_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['choice_id'], ['choices.id'], ondelete=ondelete),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete=ondelete),
+    sa.PrimaryKeyConstraint('id'),
+    sa.Index('ix_votes_id', 'id')
+    )
+    poll_shard_overrides = sa.Table('poll_shard_overrides', metadata,
+    sa.Column('poll_id', sa.Integer(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['poll_id'], ['polls.id'], ondelete=ondelete),
+    sa.PrimaryKeyConstraint('poll_id')
+    )
+    return [polls, choices, votes, poll_shard_overrides]
+
+
+def _recreate(ondelete, skip=()):
+    for table in _tables(ondelete):
+        if table.name in skip:
+            continue
+        with op.batch_alter_table(
+            table.name, copy_from=table, recreate='always'
+        ):
+            pass
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    skip = ('votes',) if applied_online(VOTES_ONLINE_MIGRATION) else ()
+    _recreate('CASCADE', skip)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _recreate(None)
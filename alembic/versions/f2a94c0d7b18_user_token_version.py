@@ -0,0 +1,31 @@
+"""User token version
+
+Revision ID: f2a94c0d7b18
+Revises: d81f4a7e6c35
+Create Date: 2026-10-19 17:48:26.054917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a94c0d7b18'
+down_revision: Union[str, None] = 'd81f4a7e6c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column(
+        'token_version', sa.Integer(), server_default='0', nullable=False
+    ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('token_version')
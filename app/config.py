@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from pydantic import ConfigDict
+from pydantic import ConfigDict, model_validator
 
 
 class Settings(BaseSettings):
@@ -8,11 +8,89 @@ class Settings(BaseSettings):
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     REFRESH_TOKEN_EXPIRE_DAYS: int
+    REFRESH_TOKEN_FILTER_CAPACITY: int = 1_000_000
+    REFRESH_TOKEN_FILTER_ERROR_RATE: float = 0.01
+    CREATE_TABLES_ON_STARTUP: bool = True
+    BIND: str = "0.0.0.0:8000"
+    WORKERS: int = 1
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    REPLICA_DATABASE_URLS: list[str] = []
+    READ_YOUR_WRITES_SECONDS: int = 5
+    VOTE_SHARD_URLS: list[str] = []
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_LOGIN_PER_MINUTE: float = 10
+    RATE_LIMIT_LOGIN_PER_CLIENT_PER_MINUTE: float = 120
+    RATE_LIMIT_VOTE_PER_MINUTE: float = 30
+    MAX_CONCURRENT_REQUESTS: int = 0
+    POLL_PURGE_THRESHOLD: int = 10000
+    POLL_PURGE_BATCH_SIZE: int = 5000
+    BULK_IMPORT_BATCH_SIZE: int = 500
+    POLL_DETAILS_MAX_IDS: int = 500
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    GZIP_COMPRESS_LEVEL: int = 6
+    BROTLI_QUALITY: int = 5
+    SNAPSHOT_CACHE_SIZE: int = 1000
+    TOKEN_VERSION_CACHE_SIZE: int = 10000
+    QUERY_PROFILING: bool = False
+    SLOW_QUERY_MS: float = 100.0
+    PROFILER_INTERVAL_MS: float = 5.0
+    PROFILER_MAX_SECONDS: int = 60
+    PROFILER_HISTORY_SIZE: int = 20
+    PROFILE_REQUESTS: bool = False
+    TRACING: bool = False
+    TRACE_EXPORTERS: list[str] = ["memory"]
+    TRACE_BUFFER_SIZE: int = 10000
+    TRACE_FILE: str = "logs/traces.ndjson"
+    ONLINE_MIGRATION_BATCH_SIZE: int = 1000
+    ONLINE_MIGRATION_DUTY_CYCLE: float = 0.5
+    MULTIPLE_CHOICE_BALLOTS: bool = True
+    VOTE_CHANGE_LOG: bool = False
+    CHANGE_LOG_BATCH_SIZE: int = 1000
+    ARCHIVE_AFTER_DAYS: int = 0
+    ARCHIVE_URL: str = "archive"
+    ARCHIVE_BATCH_SIZE: int = 50
+    ARCHIVE_POLLS_PER_SWEEP: int = 5
+    MAX_QUEUED_REQUESTS: int = 100
+    QUEUE_TIMEOUT_SECONDS: float = 5
+    CACHE_TTL_SECONDS: float = 0
+    INVALIDATION_POLL_SECONDS: float = 1.0
+    EXPIRY_SWEEP_INTERVAL_SECONDS: float = 60
+    LEADER_LEASE_SECONDS: int = 30
+    EXPIRY_SWEEP_BATCH_SIZE: int = 1000
 
     model_config = ConfigDict(
         env_file=".env",
         env_file_encoding="utf-8"
     )
 
+    @model_validator(mode="after")
+    def check_leader_lease(self):
+        """Лидер продлевает аренду на каждой итерации фонового цикла"""
+        if self.LEADER_LEASE_SECONDS <= 2 * self.INVALIDATION_POLL_SECONDS:
+            raise ValueError(
+                "LEADER_LEASE_SECONDS must exceed twice INVALIDATION_POLL_SECONDS"
+            )
+        return self
 
-settings = Settings()
+
+_settings: Settings | None = None
+
+
+def get_settings() -> Settings:
+    """Ленивое создание настроек при первом обращении"""
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+
+def configure_settings(settings: Settings | None):
+    """Подмена настроек приложения (используется фабрикой приложения)"""
+    global _settings
+    _settings = settings
+
+
+def __getattr__(name: str):
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
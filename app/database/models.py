@@ -4,7 +4,12 @@ from sqlalchemy import (
     String,
     Boolean,
     DateTime,
-    ForeignKey
+    Float,
+    ForeignKey,
+    Index,
+    LargeBinary,
+    Text,
+    UniqueConstraint
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -18,7 +23,13 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     role = Column(String, default="user")
-    polls = relationship("Poll", back_populates="creator")
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+    polls = relationship(
+        "Poll",
+        back_populates="creator",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
 
 
 class Poll(Base):
@@ -26,29 +37,199 @@ class Poll(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True, nullable=False)
     description = Column(String, nullable=True)
-    creator_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    creator_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
     creator = relationship("User", back_populates="polls")
     creation_date = Column(DateTime, nullable=True)
     is_closed = Column(Boolean, default=False)
     close_date = Column(DateTime, nullable=True)
+    closed_at = Column(DateTime, nullable=True)
     is_multiple_choice = Column(Boolean, default=False)
-    choices = relationship("Choice", back_populates="poll")
+    ballot_storage = Column(Boolean, default=False)
+    voting_method = Column(String, default="plurality")
+    choices = relationship(
+        "Choice",
+        back_populates="poll",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
+    __table_args__ = (
+        Index(
+            "ix_polls_open_close_date",
+            "close_date",
+            sqlite_where=is_closed.is_(False),
+            postgresql_where=is_closed.is_(False)
+        ),
+    )
 
 
 class Choice(Base):
     __tablename__ = "choices"
     id = Column(Integer, primary_key=True, index=True)
     text = Column(String, index=True, nullable=False)
-    poll_id = Column(Integer, ForeignKey("polls.id"), nullable=False)
+    poll_id = Column(
+        Integer,
+        ForeignKey("polls.id", ondelete="CASCADE"),
+        nullable=False
+    )
     poll = relationship("Poll", back_populates="choices")
-    votes = relationship("Vote", back_populates="choice")
+    votes = relationship(
+        "Vote",
+        back_populates="choice",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
 
 
 class Vote(Base):
     __tablename__ = "votes"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    choice_id = Column(Integer, ForeignKey("choices.id"), nullable=False)
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    choice_id = Column(
+        Integer,
+        ForeignKey("choices.id", ondelete="CASCADE"),
+        nullable=False
+    )
     created_at = Column(DateTime, default=datetime.utcnow)
     user = relationship("User")
     choice = relationship("Choice", back_populates="votes")
+
+
+class Ballot(Base):
+    __tablename__ = "ballots"
+    id = Column(Integer, primary_key=True)
+    poll_id = Column(
+        Integer,
+        ForeignKey("polls.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    selection = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("poll_id", "user_id"),)
+
+
+class VoteChange(Base):
+    __tablename__ = "vote_changes"
+    id = Column(Integer, primary_key=True)
+    poll_id = Column(
+        Integer,
+        ForeignKey("polls.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    choice_id = Column(
+        Integer,
+        ForeignKey("choices.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    delta = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class ChoiceTally(Base):
+    __tablename__ = "choice_tallies"
+    choice_id = Column(
+        Integer,
+        ForeignKey("choices.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    poll_id = Column(
+        Integer,
+        ForeignKey("polls.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    score = Column(Integer, nullable=False, default=0)
+
+
+class ChangeLogCursor(Base):
+    __tablename__ = "change_log_cursors"
+    name = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+
+
+class ArchivedPoll(Base):
+    __tablename__ = "archived_polls"
+    poll_id = Column(Integer, primary_key=True)
+    close_date = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, nullable=False)
+    location = Column(String, nullable=False)
+    summary = Column(Text, nullable=False)
+    details = Column(Text, nullable=False)
+    results = Column(Text, nullable=False)
+
+
+class OnlineMigration(Base):
+    __tablename__ = "online_migrations"
+    name = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)
+    table_name = Column(String, nullable=False)
+    phase = Column(String, nullable=False)
+    last_id = Column(Integer, nullable=False, default=0)
+    rows_done = Column(Integer, nullable=False, default=0)
+    total_rows = Column(Integer, nullable=True)
+    started_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+    jti = Column(String, primary_key=True)
+    family = Column(String, nullable=False, index=True)
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, nullable=True, index=True)
+
+
+class LeaderLease(Base):
+    __tablename__ = "leader_leases"
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class CacheInvalidation(Base):
+    __tablename__ = "cache_invalidations"
+    id = Column(Integer, primary_key=True)
+    channel = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class PollShardOverride(Base):
+    __tablename__ = "poll_shard_overrides"
+    poll_id = Column(
+        Integer,
+        ForeignKey("polls.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    shard = Column(Integer, nullable=False)
+
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)
@@ -0,0 +1,530 @@
+"""Онлайн-миграции больших таблиц без долгих блокировок записи.
+
+`alembic upgrade head` выполняет DDL одной транзакцией, и создание индекса
+или пересборка таблицы votes держит блокировку записи все время работы.
+Здесь те же изменения выполняются отдельным процессом, пока приложение
+обслуживает запросы:
+
+* backfill - UPDATE столбцов пачками по диапазонам первичного ключа;
+* copy_and_swap (SQLite) - теневая таблица с новой схемой и индексами,
+  синхронизация изменений триггерами, копирование пачками и короткая
+  транзакция подмены, как в процедуре из документации SQLite по ALTER TABLE;
+* estimate - пробный прогон первой пачки с откатом и оценка размера
+  таблицы и времени всей миграции.
+
+Поддерживаются таблицы с целочисленным первичным ключом id. Каждая пачка
+выполняется отдельной транзакцией, в которой вместе с данными сдвигается
+позиция в таблице online_migrations, поэтому прерванная миграция
+продолжается с места остановки. Между пачками выдерживается пауза, чтобы
+миграция занимала не больше ONLINE_MIGRATION_DUTY_CYCLE времени записи.
+
+Запуск: python -m app.database.online_migrations {status,backfill,copy-swap}
+"""
+import argparse
+import logging
+import math
+import time
+from datetime import datetime, UTC
+
+from sqlalchemy import (
+    Index,
+    MetaData,
+    Table,
+    create_engine,
+    event,
+    insert,
+    inspect,
+    select,
+    text,
+    update
+)
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.config import get_settings
+from app.database.base import Base
+from app.database.models import OnlineMigration
+
+logger = logging.getLogger(__name__)
+
+BACKFILL = "backfill"
+COPY_SWAP = "copy_swap"
+
+RUNNING = "running"
+COPIED = "copied"
+DONE = "done"
+
+SHADOW_PREFIX = "_shadow_"
+TRIGGER_EVENTS = ("insert", "update", "delete")
+
+progress_table = OnlineMigration.__table__
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def migration_engine(database_url: str = None):
+    """Движок для онлайн-миграций.
+
+    pysqlite сам открывает транзакцию только перед DML, а DDL выполняет
+    вне ее. Здесь транзакции начинаются явным BEGIN IMMEDIATE: создание
+    теневой таблицы и подмена атомарны, а блокировка записи берется
+    сразу, без взаимоблокировки с воркерами при ее повышении.
+    """
+    engine = create_engine(database_url or get_settings().DATABASE_URL)
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+            dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+        @event.listens_for(engine, "begin")
+        def _on_begin(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+    return engine
+
+
+def _quote(conn, name: str) -> str:
+    return conn.dialect.identifier_preparer.quote(name)
+
+
+def get_progress(conn, name: str):
+    return conn.execute(
+        select(progress_table).where(progress_table.c.name == name)
+    ).first()
+
+
+def finished(conn, name: str) -> bool:
+    """Проверка для ревизий Alembic: изменение уже сделано онлайн-миграцией"""
+    if not inspect(conn).has_table(progress_table.name):
+        return False
+    progress = get_progress(conn, name)
+    return progress is not None and progress.phase == DONE
+
+
+def applied_online(name: str) -> bool:
+    """Для ревизий Alembic: DDL уже выполнен онлайн-миграцией name.
+
+    В offline-режиме (alembic upgrade --sql) базы нет, и DDL не пропускается.
+    """
+    from alembic import context, op
+
+    if context.is_offline_mode():
+        return False
+    return finished(op.get_bind(), name)
+
+
+def _start(conn, name: str, kind: str, table_name: str):
+    now = _utcnow()
+    conn.execute(insert(progress_table).values(
+        name=name,
+        kind=kind,
+        table_name=table_name,
+        phase=RUNNING,
+        last_id=0,
+        rows_done=0,
+        total_rows=_count_rows(conn, table_name),
+        started_at=now,
+        updated_at=now
+    ))
+
+
+def _advance(conn, name: str, last_id: int, rows: int, phase: str = RUNNING):
+    now = _utcnow()
+    values = {
+        "last_id": last_id,
+        "rows_done": progress_table.c.rows_done + rows,
+        "phase": phase,
+        "updated_at": now
+    }
+    if phase == DONE:
+        values["finished_at"] = now
+    conn.execute(
+        update(progress_table).where(progress_table.c.name == name).values(**values)
+    )
+
+
+def _count_rows(conn, table_name: str) -> int:
+    return conn.exec_driver_sql(
+        f"SELECT COUNT(*) FROM {_quote(conn, table_name)}"
+    ).scalar()
+
+
+def _table_bytes(conn, table_name: str) -> int | None:
+    """Размер таблицы с индексами по dbstat (если SQLite собран с ним)"""
+    if conn.dialect.name != "sqlite":
+        return None
+    try:
+        return conn.execute(text(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+            "(SELECT name FROM sqlite_schema WHERE tbl_name = :table_name)"
+        ), {"table_name": table_name}).scalar()
+    except DBAPIError:
+        return None
+
+
+def _next_batch(conn, table_name: str, last_id: int, batch_size: int) -> int | None:
+    """Верхняя граница id следующей пачки или None, если строк больше нет"""
+    ids = conn.execute(text(
+        f"SELECT id FROM {_quote(conn, table_name)} "
+        f"WHERE id > :last_id ORDER BY id LIMIT :limit"
+    ), {"last_id": last_id, "limit": batch_size}).scalars().all()
+    return ids[-1] if ids else None
+
+
+def _throttle(elapsed: float, duty_cycle: float):
+    """Пауза, после которой доля времени работы миграции равна duty_cycle"""
+    if 0 < duty_cycle < 1:
+        time.sleep(elapsed * (1 - duty_cycle) / duty_cycle)
+
+
+def _run_batches(
+        engine,
+        name: str,
+        table_name: str,
+        step,
+        final_phase: str,
+        batch_size: int,
+        duty_cycle: float,
+        max_batches: int = None
+) -> int:
+    """Пачки step(conn, low, high) -> rows от сохраненной позиции до конца"""
+    rows_done = 0
+    batches = 0
+    with engine.connect() as conn:
+        with conn.begin():
+            last_id = get_progress(conn, name).last_id
+        while max_batches is None or batches < max_batches:
+            started = time.perf_counter()
+            with conn.begin():
+                high = _next_batch(conn, table_name, last_id, batch_size)
+                if high is None:
+                    _advance(conn, name, last_id, 0, final_phase)
+                    break
+                rows = step(conn, last_id, high)
+                _advance(conn, name, high, rows)
+            rows_done += rows
+            batches += 1
+            last_id = high
+            logger.info(f"Online migration {name}: {rows_done} rows, id <= {high}")
+            _throttle(time.perf_counter() - started, duty_cycle)
+    return rows_done
+
+
+def _backfill_step(conn, table_name: str, assignments: str, where: str = None):
+    statement = text(
+        f"UPDATE {_quote(conn, table_name)} SET {assignments} "
+        f"WHERE id > :low AND id <= :high" + (f" AND ({where})" if where else "")
+    )
+
+    def step(step_conn, low: int, high: int) -> int:
+        return step_conn.execute(statement, {"low": low, "high": high}).rowcount
+
+    return step
+
+
+def backfill(
+        engine,
+        name: str,
+        table_name: str,
+        assignments: str,
+        where: str = None,
+        batch_size: int = None,
+        duty_cycle: float = None,
+        max_batches: int = None
+) -> int:
+    """Заполнение столбцов (SET assignments) пачками; возвращает число строк"""
+    settings = get_settings()
+    with engine.begin() as conn:
+        progress_table.create(conn, checkfirst=True)
+        progress = get_progress(conn, name)
+        if progress is None:
+            _start(conn, name, BACKFILL, table_name)
+        elif progress.phase == DONE:
+            return 0
+        step = _backfill_step(conn, table_name, assignments, where)
+    return _run_batches(
+        engine, name, table_name, step, DONE,
+        batch_size or settings.ONLINE_MIGRATION_BATCH_SIZE,
+        duty_cycle or settings.ONLINE_MIGRATION_DUTY_CYCLE,
+        max_batches
+    )
+
+
+def _shadow_table(target: Table) -> Table:
+    """Копия target под именем _shadow_<table> с итоговыми именами индексов"""
+    metadata = MetaData()
+    for foreign_key in target.foreign_keys:
+        referred = foreign_key.column.table
+        if referred is not target and referred.key not in metadata.tables:
+            referred.to_metadata(metadata)
+    shadow = target.to_metadata(metadata, name=SHADOW_PREFIX + target.name)
+    shadow.indexes.clear()
+    for index in target.indexes:
+        Index(
+            index.name,
+            *(shadow.c[column.name] for column in index.columns),
+            unique=index.unique
+        )
+    return shadow
+
+
+def _shared_columns(conn, target: Table) -> list[str]:
+    existing = {column["name"] for column in inspect(conn).get_columns(target.name)}
+    return [column.name for column in target.columns if column.name in existing]
+
+
+def _trigger_name(table_name: str, event_name: str) -> str:
+    return f"{SHADOW_PREFIX}{table_name}_{event_name}"
+
+
+def _prepare_shadow(conn, target: Table):
+    """Теневая таблица с индексами и триггеры, переносящие в нее изменения.
+
+    Имена индексов в SQLite общие для всей базы, поэтому неуникальные
+    индексы исходной таблицы с теми же именами удаляются: до подмены
+    запросы к ней обходятся без них. Уникальный индекс так перенести
+    нельзя - ему нужно новое имя.
+    """
+    shadow = _shadow_table(target)
+    existing = {
+        index["name"]: index for index in inspect(conn).get_indexes(target.name)
+    }
+    conn.execute(CreateTable(shadow))
+    for index in shadow.indexes:
+        if index.name in existing:
+            if index.unique or existing[index.name]["unique"]:
+                raise ValueError(
+                    f"Unique index {index.name} needs a new name to be built online"
+                )
+            conn.exec_driver_sql(f"DROP INDEX {_quote(conn, index.name)}")
+        conn.execute(CreateIndex(index))
+
+    columns = _shared_columns(conn, target)
+    table_name, shadow_name = _quote(conn, target.name), _quote(conn, shadow.name)
+    column_list = ", ".join(_quote(conn, column) for column in columns)
+    new_values = ", ".join(f"NEW.{_quote(conn, column)}" for column in columns)
+    upsert = (
+        f"INSERT OR REPLACE INTO {shadow_name} ({column_list}) VALUES ({new_values});"
+    )
+    remove = f"DELETE FROM {shadow_name} WHERE id = OLD.id;"
+    bodies = {
+        "insert": upsert,
+        "update": f"{remove} {upsert}",
+        "delete": remove
+    }
+    for event_name in TRIGGER_EVENTS:
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER {_quote(conn, _trigger_name(target.name, event_name))} "
+            f"AFTER {event_name.upper()} ON {table_name} "
+            f"BEGIN {bodies[event_name]} END"
+        )
+
+
+def _copy_step(conn, target: Table):
+    columns = ", ".join(
+        _quote(conn, column) for column in _shared_columns(conn, target)
+    )
+    statement = text(
+        f"INSERT OR IGNORE INTO {_quote(conn, SHADOW_PREFIX + target.name)} "
+        f"({columns}) SELECT {columns} FROM {_quote(conn, target.name)} "
+        f"WHERE id > :low AND id <= :high"
+    )
+
+    def step(step_conn, low: int, high: int) -> int:
+        return step_conn.execute(statement, {"low": low, "high": high}).rowcount
+
+    return step
+
+
+def _swap(conn, name: str, table_name: str):
+    """Подмена таблицы одной короткой транзакцией при выключенных FK.
+
+    С включенными внешними ключами DROP TABLE удалил бы каскадом строки
+    дочерних таблиц; целостность проверяется foreign_key_check до коммита.
+    """
+    driver_connection = conn.connection.driver_connection
+    driver_connection.execute("PRAGMA foreign_keys=OFF")
+    try:
+        with conn.begin():
+            for event_name in TRIGGER_EVENTS:
+                conn.exec_driver_sql(
+                    "DROP TRIGGER IF EXISTS "
+                    f"{_quote(conn, _trigger_name(table_name, event_name))}"
+                )
+            conn.exec_driver_sql(f"DROP TABLE {_quote(conn, table_name)}")
+            conn.exec_driver_sql(
+                f"ALTER TABLE {_quote(conn, SHADOW_PREFIX + table_name)} "
+                f"RENAME TO {_quote(conn, table_name)}"
+            )
+            violations = conn.exec_driver_sql(
+                f"PRAGMA foreign_key_check({_quote(conn, table_name)})"
+            ).fetchall()
+            if violations:
+                raise RuntimeError(
+                    f"{len(violations)} foreign key violations in {table_name}"
+                )
+            progress = get_progress(conn, name)
+            _advance(conn, name, progress.last_id, 0, DONE)
+    finally:
+        driver_connection.execute("PRAGMA foreign_keys=ON")
+    logger.info(f"Online migration {name}: {table_name} swapped")
+
+
+def copy_and_swap(
+        engine,
+        name: str,
+        target: Table,
+        batch_size: int = None,
+        duty_cycle: float = None,
+        max_batches: int = None
+) -> int:
+    """Пересборка таблицы SQLite под схему target; возвращает число строк"""
+    if engine.dialect.name != "sqlite":
+        raise ValueError("copy_and_swap is implemented for SQLite only")
+    settings = get_settings()
+    with engine.begin() as conn:
+        progress_table.create(conn, checkfirst=True)
+        progress = get_progress(conn, name)
+        if progress is None:
+            _prepare_shadow(conn, target)
+            _start(conn, name, COPY_SWAP, target.name)
+        elif progress.phase == DONE:
+            return 0
+        step = _copy_step(conn, target)
+    copied = _run_batches(
+        engine, name, target.name, step, COPIED,
+        batch_size or settings.ONLINE_MIGRATION_BATCH_SIZE,
+        duty_cycle or settings.ONLINE_MIGRATION_DUTY_CYCLE,
+        max_batches
+    )
+    with engine.connect() as conn:
+        with conn.begin():
+            phase = get_progress(conn, name).phase
+        if phase == COPIED:
+            _swap(conn, name, target.name)
+    return copied
+
+
+def estimate(
+        engine,
+        table_name: str,
+        target: Table = None,
+        assignments: str = None,
+        where: str = None,
+        batch_size: int = None,
+        duty_cycle: float = None
+) -> dict:
+    """Оценка миграции по пробной первой пачке, которая затем откатывается"""
+    settings = get_settings()
+    batch_size = batch_size or settings.ONLINE_MIGRATION_BATCH_SIZE
+    duty_cycle = duty_cycle or settings.ONLINE_MIGRATION_DUTY_CYCLE
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            rows = _count_rows(conn, table_name)
+            size = _table_bytes(conn, table_name)
+            if target is not None:
+                _prepare_shadow(conn, target)
+                step = _copy_step(conn, target)
+            else:
+                step = _backfill_step(conn, table_name, assignments, where)
+            high = _next_batch(conn, table_name, 0, batch_size)
+            started = time.perf_counter()
+            if high is not None:
+                step(conn, 0, high)
+            batch_seconds = time.perf_counter() - started
+        finally:
+            transaction.rollback()
+
+    batches = math.ceil(rows / batch_size)
+    return {
+        "table": table_name,
+        "rows": rows,
+        "bytes": size,
+        "batches": batches,
+        "batch_seconds": round(batch_seconds, 4),
+        "estimated_seconds": round(batches * batch_seconds / duty_cycle, 1)
+    }
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Online schema migrations")
+    parser.add_argument(
+        "--url", help="Database URL (default DATABASE_URL, e.g. a vote shard)"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="Show online migrations progress")
+    backfill_parser = subparsers.add_parser(
+        "backfill", help="Update columns in batches"
+    )
+    backfill_parser.add_argument("name")
+    backfill_parser.add_argument("table")
+    backfill_parser.add_argument(
+        "--set", dest="assignments", required=True, help="SQL SET clause"
+    )
+    backfill_parser.add_argument("--where", help="Extra SQL filter")
+    copy_parser = subparsers.add_parser(
+        "copy-swap", help="Rebuild a SQLite table to its model definition"
+    )
+    copy_parser.add_argument("name")
+    copy_parser.add_argument("table")
+    for subparser in (backfill_parser, copy_parser):
+        subparser.add_argument(
+            "--batch-size", type=int, default=settings.ONLINE_MIGRATION_BATCH_SIZE
+        )
+        subparser.add_argument(
+            "--duty-cycle", type=float, default=settings.ONLINE_MIGRATION_DUTY_CYCLE
+        )
+        subparser.add_argument("--max-batches", type=int)
+        subparser.add_argument(
+            "--dry-run", action="store_true", help="Only estimate size and time"
+        )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    engine = migration_engine(args.url)
+    try:
+        if args.command == "status":
+            with engine.begin() as conn:
+                progress_table.create(conn, checkfirst=True)
+                for row in conn.execute(select(progress_table)):
+                    print(
+                        f"{row.name}: {row.kind} {row.table_name} {row.phase}, "
+                        f"{row.rows_done}/{row.total_rows} rows, id <= {row.last_id}"
+                    )
+            return
+
+        target = None
+        if args.command == "copy-swap":
+            target = Base.metadata.tables[args.table]
+        if args.dry_run:
+            print(estimate(
+                engine,
+                args.table,
+                target=target,
+                assignments=getattr(args, "assignments", None),
+                where=getattr(args, "where", None),
+                batch_size=args.batch_size,
+                duty_cycle=args.duty_cycle
+            ))
+        elif target is not None:
+            rows = copy_and_swap(
+                engine, args.name, target,
+                args.batch_size, args.duty_cycle, args.max_batches
+            )
+            print(f"{args.name}: {rows} rows copied")
+        else:
+            rows = backfill(
+                engine, args.name, args.table, args.assignments, args.where,
+                args.batch_size, args.duty_cycle, args.max_batches
+            )
+            print(f"{args.name}: {rows} rows updated")
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Профилирование SQL-запросов через события движков SQLAlchemy.
+
+Включается настройкой QUERY_PROFILING: слушатели вешаются на класс Engine
+и видят основную базу, реплики и шарды. Для каждой формы запроса (текст
+с нормализованными списками параметров) копятся число вызовов, суммарное
+и наибольшее время и функции сервисов, из которых он выполнялся. Запросы
+дольше SLOW_QUERY_MS пишутся в отдельный лог logs/slow_queries.log вместе
+с планом (EXPLAIN QUERY PLAN для SQLite, EXPLAIN для остальных СУБД).
+
+Статистика хранится в памяти воркера.
+"""
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import get_settings
+from app.shared.logging import LOG_DIR
+
+SLOW_QUERY_LOG_FILE = "slow_queries.log"
+ORIGIN_PACKAGE = "app.modules."
+PLANNABLE = ("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")
+
+slow_query_logger = logging.getLogger("app.slow_queries")
+
+_PARAMETER_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Текст запроса без переносов строк и с IN (?, ?, ...) -> IN (?...)"""
+    return _PARAMETER_LIST.sub("(?...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def find_origin() -> str | None:
+    """Ближайшая по стеку функция из app.modules (voting.services.vote_in_poll)"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith(ORIGIN_PACKAGE):
+            return f"{module[len(ORIGIN_PACKAGE):]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class StatementStats:
+    __slots__ = ("calls", "total", "max", "origins", "plan")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.origins = set()
+        self.plan = None
+
+
+class QueryProfiler:
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+        self.enabled = False
+
+    def enable(self):
+        if self.enabled:
+            return
+        event.listen(Engine, "before_cursor_execute", self._before_execute)
+        event.listen(Engine, "after_cursor_execute", self._after_execute)
+        event.listen(Engine, "handle_error", self._on_error)
+        _configure_slow_query_log()
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        event.remove(Engine, "before_cursor_execute", self._before_execute)
+        event.remove(Engine, "after_cursor_execute", self._after_execute)
+        event.remove(Engine, "handle_error", self._on_error)
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def _before_execute(
+            self, conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    def _on_error(self, exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started_at"):
+            conn.info["query_started_at"].pop()
+
+    def _after_execute(
+            self, conn, cursor, statement, parameters, context, executemany
+    ):
+        started_at = conn.info.get("query_started_at")
+        if not started_at:
+            return
+        started = started_at.pop()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        shape = statement_shape(statement)
+        origin = find_origin()
+        with self._lock:
+            stats = self._stats.get(shape)
+            if stats is None:
+                stats = self._stats[shape] = StatementStats()
+            stats.calls += 1
+            stats.total += elapsed_ms
+            stats.max = max(stats.max, elapsed_ms)
+            if origin:
+                stats.origins.add(origin)
+
+        if elapsed_ms < get_settings().SLOW_QUERY_MS:
+            return
+        plan = None
+        if not executemany and shape.upper().startswith(PLANNABLE):
+            plan = explain(conn, statement, parameters)
+            with self._lock:
+                stats.plan = plan
+        slow_query_logger.warning(
+            f"{elapsed_ms:.1f} ms [{origin or '-'}] {shape}"
+            + (f"\n  plan: {plan}" if plan else "")
+        )
+
+    def top(self, limit: int = 20) -> list[dict]:
+        """Формы запросов с наибольшим суммарным временем"""
+        with self._lock:
+            items = sorted(
+                self._stats.items(), key=lambda item: item[1].total, reverse=True
+            )[:limit]
+            return [
+                {
+                    "statement": shape,
+                    "calls": stats.calls,
+                    "total_ms": round(stats.total, 3),
+                    "mean_ms": round(stats.total / stats.calls, 3),
+                    "max_ms": round(stats.max, 3),
+                    "origins": sorted(stats.origins),
+                    "plan": stats.plan
+                }
+                for shape, stats in items
+            ]
+
+
+def explain(conn, statement: str, parameters) -> str | None:
+    """План запроса отдельным курсором того же DBAPI-соединения"""
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        rows = cursor.fetchall()
+    except Exception as e:
+        return f"unavailable: {e}"
+    finally:
+        cursor.close()
+    return "; ".join(str(row[-1]) for row in rows)
+
+
+def _configure_slow_query_log():
+    if slow_query_logger.handlers:
+        return
+    os.makedirs(LOG_DIR, exist_ok=True)
+    handler = RotatingFileHandler(
+        os.path.join(LOG_DIR, SLOW_QUERY_LOG_FILE),
+        maxBytes=10 * 1024 * 1024,
+        backupCount=5
+    )
+    handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s"))
+    slow_query_logger.addHandler(handler)
+
+
+query_profiler = QueryProfiler()
@@ -1,16 +1,211 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.config import settings
+import itertools
+import threading
+import time
 
-SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from app.config import get_settings
+from app.shared.coordination import invalidation_bus
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+PRIMARY_STICKY_CHANNEL = "primary_sticky"
+
+_engine = None
+_session_factory = None
+_replica_engines = None
+_replica_factories = None
+
+
+def init_engine(database_url: str | None = None):
+    """Создание движка БД и фабрики сессий"""
+    global _engine, _session_factory
+    if database_url is None:
+        database_url = get_settings().DATABASE_URL
+    dispose_engine()
+    _engine = create_database_engine(database_url)
+    _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+    return _engine
+
+
+def init_replicas(database_urls: list[str] | None = None):
+    """Создание движков реплик только для чтения"""
+    global _replica_engines, _replica_factories
+    if database_urls is None:
+        database_urls = get_settings().REPLICA_DATABASE_URLS
+    dispose_replicas()
+    _replica_engines = [create_database_engine(url) for url in database_urls]
+    _replica_factories = itertools.cycle([
+        sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        for engine in _replica_engines
+    ]) if _replica_engines else None
+    return _replica_engines
+
+
+def create_database_engine(database_url: str):
+    """Движок с настройками SQLite (внешние ключи, режим журнала)"""
+    engine = create_engine(database_url)
+    if engine.dialect.name == "sqlite":
+        configure_sqlite_engine(engine, get_settings().SQLITE_JOURNAL_MODE)
+    return engine
+
+
+def configure_sqlite_engine(engine, journal_mode: str | None = None):
+    """Внешние ключи нужны для ON DELETE CASCADE, WAL - для читателей воркеров"""
+    file_based = engine.url.database not in (None, "", ":memory:")
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        if journal_mode and file_based:
+            cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        cursor.close()
+
+
+def dispose_engine():
+    """Закрытие пула соединений текущего движка"""
+    global _engine, _session_factory
+    if _engine is not None:
+        _engine.dispose()
+    _engine = None
+    _session_factory = None
+    dispose_replicas()
+
+
+def dispose_replicas():
+    global _replica_engines, _replica_factories
+    for engine in _replica_engines or []:
+        engine.dispose()
+    _replica_engines = None
+    _replica_factories = None
+
+
+def get_engine():
+    if _engine is None:
+        init_engine()
+    return _engine
+
+
+def get_session_factory():
+    if _session_factory is None:
+        init_engine()
+    return _session_factory
 
 
 def get_db():
-    db = SessionLocal()
+    db = get_session_factory()()
     try:
         yield db
     finally:
         db.close()
+
+
+def _replicas_enabled() -> bool:
+    if _replica_engines is None:
+        init_replicas()
+    return _replica_factories is not None
+
+
+def _next_replica_factory():
+    if not _replicas_enabled():
+        return None
+    return next(_replica_factories)
+
+
+class PrimaryStickiness:
+    """Пользователь -> момент, до которого его чтения идут в основную БД.
+
+    Отметка приходит событием PRIMARY_STICKY_CHANNEL: воркер, принявший
+    запись, ставит ее сразу после коммита, остальные - при следующем опросе
+    шины. Как и в InMemoryRateLimitBackend, просроченные отметки удаляются,
+    когда их число вдвое превышает число после прошлой чистки.
+    """
+
+    MIN_PRUNE_SIZE = 1024
+
+    def __init__(self):
+        self._until = {}
+        self._prune_size = self.MIN_PRUNE_SIZE
+        self._lock = threading.Lock()
+
+    def mark(self, email: str, now: float = None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._until[email] = now + get_settings().READ_YOUR_WRITES_SECONDS
+            if len(self._until) > self._prune_size:
+                self._until = {
+                    key: until for key, until in self._until.items() if until > now
+                }
+                self._prune_size = max(self.MIN_PRUNE_SIZE, 2 * len(self._until))
+
+    def is_sticky(self, email: str | None) -> bool:
+        return email is not None and self._until.get(email, 0) > time.monotonic()
+
+    def __len__(self):
+        return len(self._until)
+
+    def clear(self):
+        with self._lock:
+            self._until.clear()
+
+
+primary_sticky = PrimaryStickiness()
+invalidation_bus.subscribe_keyed(PRIMARY_STICKY_CHANNEL, primary_sticky.mark)
+
+
+def mark_primary_sticky(db: Session, email: str):
+    """После записи чтения пользователя идут в основную БД (read-your-writes).
+
+    Вызывается до коммита записи: отметка публикуется вместе с ним.
+    """
+    if _replicas_enabled():
+        invalidation_bus.publish(db, PRIMARY_STICKY_CHANNEL, email)
+
+
+def _request_email(request: Request) -> str | None:
+    """Пользователь запроса по токену (Bearer или устаревший ?token=).
+
+    Версия токена здесь не проверяется: от результата зависит только то,
+    какая база ответит на чтение.
+    """
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal["email"]
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer":
+        token = request.query_params.get("token")
+    if not token:
+        return None
+    from app.modules.auth.services import decode_access_token
+
+    payload = decode_access_token(token)
+    return payload.get("sub") if payload else None
+
+
+def is_primary_sticky(request: Request) -> bool:
+    """Недавно писавший пользователь читает только основную базу"""
+    return len(primary_sticky) > 0 and primary_sticky.is_sticky(
+        _request_email(request)
+    )
+
+
+def get_read_db(request: Request, db=Depends(get_db)):
+    """Сессия для чтения: реплика, если она настроена и нет недавней записи"""
+    replica_factory = _next_replica_factory()
+    if replica_factory is None or is_primary_sticky(request):
+        yield db
+        return
+
+    replica_db = replica_factory()
+    try:
+        yield replica_db
+    finally:
+        replica_db.close()
+
+
+def __getattr__(name: str):
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_session_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
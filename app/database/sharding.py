@@ -0,0 +1,268 @@
+"""Шардирование голосов по poll_id.
+
+Таблица votes опроса живет в одной из баз VOTE_SHARD_URLS, выбранной по
+crc32(poll_id). Перенесенные опросы записываются в poll_shard_overrides
+основной БД. Без настроенных шардов голоса хранятся в основной БД.
+"""
+import argparse
+import logging
+import zlib
+from contextlib import contextmanager
+
+from sqlalchemy import (
+    Column,
+    MetaData,
+    Table,
+    UniqueConstraint,
+    insert,
+    select
+)
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import get_settings
+from app.database.models import (
+    Ballot,
+    ChangeLogCursor,
+    Choice,
+    ChoiceTally,
+    PollShardOverride,
+    Vote,
+    VoteChange
+)
+from app.database.session import create_database_engine
+from app.shared.coordination import invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+SHARDS_CHANNEL = "shards"
+REBALANCE_BATCH_SIZE = 1000
+
+_shard_engines = None
+_shard_factories = []
+_overrides = None
+
+SHARDED_TABLES = [
+    Vote.__table__,
+    Ballot.__table__,
+    VoteChange.__table__,
+    ChoiceTally.__table__,
+    ChangeLogCursor.__table__
+]
+
+
+def _shard_metadata() -> MetaData:
+    """Таблицы голосов для баз шардов без внешних ключей.
+
+    users, polls и choices живут в основной базе, поэтому ссылки на них в
+    шарде создать нельзя; голоса удаляются явно при удалении опроса или
+    пользователя.
+    """
+    metadata = MetaData()
+    for table in SHARDED_TABLES:
+        Table(
+            table.name, metadata,
+            *(
+                Column(
+                    column.name, column.type,
+                    primary_key=column.primary_key,
+                    nullable=column.nullable,
+                    index=column.index,
+                    autoincrement=column.autoincrement
+                )
+                for column in table.columns
+            ),
+            *(
+                UniqueConstraint(*constraint.columns.keys())
+                for constraint in table.constraints
+                if isinstance(constraint, UniqueConstraint)
+            ),
+            **table.dialect_kwargs
+        )
+    return metadata
+
+
+def init_shards(database_urls: list[str] | None = None):
+    """Создание движков шардов и таблиц голосов в них"""
+    global _shard_engines, _shard_factories
+    if database_urls is None:
+        database_urls = get_settings().VOTE_SHARD_URLS
+    dispose_shards()
+    _shard_engines = [create_database_engine(url) for url in database_urls]
+    metadata = _shard_metadata()
+    for engine in _shard_engines:
+        metadata.create_all(bind=engine)
+    _shard_factories = [
+        sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        for engine in _shard_engines
+    ]
+    return _shard_engines
+
+
+def dispose_shards():
+    global _shard_engines, _shard_factories, _overrides
+    for engine in _shard_engines or []:
+        engine.dispose()
+    _shard_engines = None
+    _shard_factories = []
+    _overrides = None
+
+
+def shard_count() -> int:
+    if _shard_engines is None:
+        init_shards()
+    return len(_shard_factories)
+
+
+def _reset_overrides():
+    global _overrides
+    _overrides = None
+
+
+invalidation_bus.subscribe(SHARDS_CHANNEL, _reset_overrides)
+
+
+def shard_for_poll(db: Session, poll_id: int) -> int:
+    """Номер шарда опроса: явный перенос или crc32(poll_id) % N"""
+    global _overrides
+    count = shard_count()
+    if not count:
+        return 0
+    if _overrides is None:
+        _overrides = dict(
+            db.query(PollShardOverride.poll_id, PollShardOverride.shard).all()
+        )
+    shard = _overrides.get(poll_id)
+    if shard is not None and shard < count:
+        return shard
+    return zlib.crc32(str(poll_id).encode()) % count
+
+
+@contextmanager
+def shard_session(db: Session, shard: int):
+    if not shard_count():
+        yield db
+        return
+    session = _shard_factories[shard]()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@contextmanager
+def vote_session(db: Session, poll_id: int):
+    """Сессия базы, в которой лежат голоса опроса"""
+    with shard_session(db, shard_for_poll(db, poll_id)) as session:
+        yield session
+
+
+def group_by_shard(db: Session, poll_ids) -> dict[int, list[int]]:
+    groups = {}
+    for poll_id in poll_ids:
+        groups.setdefault(shard_for_poll(db, poll_id), []).append(poll_id)
+    return groups
+
+
+def _copy_rows(source: Session, target: Session, model, condition, batch_size):
+    """Копирование строк таблицы шарда пачками по возрастанию id"""
+    columns = [column for column in model.__table__.c if column.key != "id"]
+    copied = 0
+    last_id = 0
+    while True:
+        rows = source.execute(
+            select(model.id, *columns)
+            .where(condition, model.id > last_id)
+            .order_by(model.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return copied
+        target.execute(insert(model), [
+            {column.key: value for column, value in zip(columns, row[1:])}
+            for row in rows
+        ])
+        target.commit()
+        last_id = rows[-1].id
+        copied += len(rows)
+
+
+def rebalance_poll(
+        db: Session, poll_id: int,
+        target_shard: int,
+        batch_size: int = REBALANCE_BATCH_SIZE
+) -> int:
+    """Перенос голосов опроса в другой шард с копированием пачками.
+
+    Голоса, поданные во время переноса, могут остаться в старом шарде,
+    поэтому переносить стоит закрытые опросы или в окно обслуживания.
+    Журнал изменений копируется целиком и сворачивается в счетчики
+    целевого шарда заново.
+    """
+    count = shard_count()
+    if not 0 <= target_shard < count:
+        raise ValueError(f"Unknown shard: {target_shard}")
+
+    source_shard = shard_for_poll(db, poll_id)
+    if source_shard == target_shard:
+        return 0
+
+    choice_ids = [
+        choice_id for (choice_id,) in
+        db.query(Choice.id).filter(Choice.poll_id == poll_id).all()
+    ]
+    with shard_session(db, source_shard) as source, \
+            shard_session(db, target_shard) as target:
+        moved = _copy_rows(
+            source, target, Vote, Vote.choice_id.in_(choice_ids), batch_size
+        )
+        moved += _copy_rows(
+            source, target, Ballot, Ballot.poll_id == poll_id, batch_size
+        )
+        _copy_rows(
+            source, target, VoteChange, VoteChange.poll_id == poll_id, batch_size
+        )
+
+        override = db.get(PollShardOverride, poll_id)
+        if override is None:
+            db.add(PollShardOverride(poll_id=poll_id, shard=target_shard))
+        else:
+            override.shard = target_shard
+        invalidation_bus.publish(db, SHARDS_CHANNEL)
+        db.commit()
+
+        source.query(Vote).filter(Vote.choice_id.in_(choice_ids)).delete(
+            synchronize_session=False
+        )
+        for model in (Ballot, VoteChange, ChoiceTally):
+            source.query(model).filter(model.poll_id == poll_id).delete(
+                synchronize_session=False
+            )
+        source.commit()
+
+    logger.info(
+        f"Poll votes moved: poll_id={poll_id}, "
+        f"shard {source_shard} -> {target_shard}, votes={moved}"
+    )
+    return moved
+
+
+def main():
+    from app.database.session import get_session_factory
+
+    parser = argparse.ArgumentParser(description="Vote shard maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebalance = subparsers.add_parser("rebalance", help="Move a poll to a shard")
+    rebalance.add_argument("poll_id", type=int)
+    rebalance.add_argument("shard", type=int)
+    args = parser.parse_args()
+
+    db = get_session_factory()()
+    try:
+        moved = rebalance_poll(db, args.poll_id, args.shard)
+        print(f"Moved {moved} votes of poll {args.poll_id} to shard {args.shard}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,98 @@
-from fastapi import FastAPI, Request
+import asyncio
 import logging
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
+from app.config import Settings, configure_settings, get_settings
+from app.database.base import Base
+from app.database.profiling import query_profiler
+from app.database.session import init_engine, init_replicas, dispose_engine
+from app.database.sharding import init_shards, dispose_shards
 from app.modules.auth.routes import router as auth_router
 from app.modules.voting.routes import router as voting_router
 from app.modules.admin.routes import router as admin_router
+from app.shared.compression import CompressionMiddleware
 from app.shared.logging import setup_logging
+from app.shared.rate_limit import ConcurrencyLimitMiddleware
+from app.shared.sampling import RequestProfilingMiddleware
+from app.shared.scheduler import run_background_jobs
+from app.shared.tracing import TracingMiddleware, instrument_routes, tracer
 
-setup_logging()
+logger = logging.getLogger(__name__)
 
-app = FastAPI()
 
-app.include_router(auth_router)
-app.include_router(voting_router)
-app.include_router(admin_router)
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    """Однократная инициализация логирования и БД при старте приложения"""
+    started_at = time.perf_counter()
+    setup_logging()
+    settings = get_settings()
+    if settings.QUERY_PROFILING:
+        query_profiler.enable()
+    if settings.TRACING:
+        tracer.enable(settings)
+    engine = init_engine(settings.DATABASE_URL)
+    init_replicas(settings.REPLICA_DATABASE_URLS)
+    init_shards(settings.VOTE_SHARD_URLS)
+    if settings.CREATE_TABLES_ON_STARTUP:
+        Base.metadata.create_all(bind=engine)
 
+    background_jobs = asyncio.create_task(run_background_jobs())
 
-@app.get("/")
-def read_root():
-    return {"message": "Hello, SQR Voting System!"}
+    application.state.startup_time_ms = (time.perf_counter() - started_at) * 1000
+    logger.info(
+        f"Application startup completed in "
+        f"{application.state.startup_time_ms:.1f} ms"
+    )
+    yield
+    background_jobs.cancel()
+    try:
+        await background_jobs
+    except asyncio.CancelledError:
+        pass
+    dispose_shards()
+    dispose_engine()
 
 
-@app.middleware("http")
-async def skip_auth_for_docs(request: Request, call_next):
-    if request.url.path in ["/docs", "/redoc", "/openapi.json"]:
-        return await call_next(request)
-    response = await call_next(request)
-    return response
+def create_app(settings: Settings | None = None) -> FastAPI:
+    """Фабрика приложения без побочных эффектов при импорте"""
+    if settings is not None:
+        configure_settings(settings)
 
+    application = FastAPI(
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan
+    )
 
-logger = logging.getLogger(__name__)
+    application.add_middleware(ConcurrencyLimitMiddleware)
+    application.add_middleware(CompressionMiddleware)
+    application.add_middleware(RequestProfilingMiddleware)
+    application.add_middleware(TracingMiddleware)
+
+    application.include_router(auth_router)
+    application.include_router(voting_router)
+    application.include_router(admin_router)
+
+    @application.get("/")
+    def read_root():
+        return {"message": "Hello, SQR Voting System!"}
+
+    @application.middleware("http")
+    async def skip_auth_for_docs(request: Request, call_next):
+        if request.url.path in ["/docs", "/redoc", "/openapi.json"]:
+            return await call_next(request)
+        response = await call_next(request)
+        return response
+
+    @application.get("/test_log")
+    def test_log():
+        logger.info("Test log message triggered!")
+        return {"message": "Log written!"}
+
+    instrument_routes(application)
+    return application
 
 
-@app.get("/test_log")
-def test_log():
-    logger.info("Test log message triggered!")
-    return {"message": "Log written!"}
+app = create_app()
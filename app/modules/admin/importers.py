@@ -0,0 +1,87 @@
+import csv
+import json
+
+from pydantic import ValidationError
+
+from app.modules.admin.schemas import PollCreate
+
+CSV_CHOICES_SEPARATOR = "|"
+
+
+class PollImportError(ValueError):
+    """Ошибка разбора строки импорта с номером строки"""
+
+    def __init__(self, line_number: int, message: str):
+        super().__init__(f"Line {line_number}: {message}")
+
+
+def _decode_line(line_number: int, line: bytes) -> str:
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError as e:
+        raise PollImportError(line_number, "Invalid UTF-8") from e
+
+
+async def iter_lines(stream):
+    """Построчное чтение потока тела запроса без загрузки его целиком"""
+    buffer = b""
+    line_number = 0
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            yield _decode_line(line_number, line)
+    if buffer:
+        yield _decode_line(line_number + 1, buffer)
+
+
+def _validate(line_number: int, data: dict) -> PollCreate:
+    try:
+        return PollCreate.model_validate(data)
+    except ValidationError as e:
+        raise PollImportError(line_number, str(e)) from e
+
+
+async def iter_ndjson_polls(lines):
+    """Опросы из NDJSON: один JSON-объект PollCreate на строку"""
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise PollImportError(line_number, "Invalid JSON") from e
+        yield _validate(line_number, data)
+
+
+async def iter_csv_polls(lines):
+    """Опросы из CSV с заголовком; варианты ответа разделены символом '|'.
+
+    Каждая запись должна занимать одну строку.
+    """
+    header = None
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        row = next(csv.reader([line]))
+        if header is None:
+            header = row
+            continue
+        data = dict(zip(header, row))
+        data["choices"] = [
+            choice for choice in data.get("choices", "").split(CSV_CHOICES_SEPARATOR)
+            if choice
+        ]
+        if not data.get("description"):
+            data.pop("description", None)
+        if not data.get("close_date"):
+            data.pop("close_date", None)
+        data["is_multiple_choice"] = data.get("is_multiple_choice", "").lower() in (
+            "1", "true", "yes"
+        )
+        yield _validate(line_number, data)
@@ -1,39 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException
-from app.database.session import get_db
+import asyncio
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response
+)
+from fastapi.responses import PlainTextResponse
+from app.config import get_settings
+from app.database.profiling import query_profiler
+from app.database.session import get_db, get_read_db
 from app.modules.admin.schemas import (
     UserCreate,
+    UserUpdate,
     PollCreate,
     PollUpdate,
-    TokenParam
+    MessageResponse,
+    UserRead,
+    PollRead,
+    PollCreated,
+    ChoiceRead,
+    BulkImportResult,
+    ClosePollsResult,
+    QueryStat
+)
+from app.modules.admin.importers import (
+    PollImportError,
+    iter_lines,
+    iter_csv_polls,
+    iter_ndjson_polls
 )
 from app.modules.admin.services import (
+    UserNotFoundError,
     create_user,
     create_poll,
+    bulk_create_polls,
     update_poll,
     check_and_close_polls,
     delete_poll,
+    count_poll_votes,
+    schedule_poll_purge,
+    purge_poll_in_background,
+    update_user,
+    revoke_user_tokens,
     delete_user,
     get_all_choices,
 )
+from app.shared.sampling import (
+    COLLAPSED,
+    FORMATS,
+    StackSampler,
+    acquire_session,
+    get_profile,
+    release_session
+)
 from app.shared.security import get_current_admin
+from app.shared.tracing import tracer
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
 
-@router.post("/users")
+@router.post("/users", response_model=UserRead)
 async def admin_create_user(
         user_data: UserCreate,
         db=Depends(get_db),
         admin=Depends(get_current_admin)
 ):
     """Администратор создает нового пользователя"""
-    return await create_user(db, user_data.email, user_data.password, role="user")
+    return await create_user(db, user_data)
 
 
-@router.post("/polls")
+@router.post("/polls", response_model=PollCreated)
 async def admin_create_poll(
         poll_data: PollCreate,
-        token_param: TokenParam = Depends(),
         db=Depends(get_db),
         admin=Depends(get_current_admin)
 ):
@@ -41,11 +83,37 @@ async def admin_create_poll(
     return await create_poll(db, poll_data)
 
 
-@router.put("/polls/{poll_id}")
+@router.post("/polls/bulk", response_model=BulkImportResult)
+async def admin_bulk_create_polls(
+        request: Request,
+        db=Depends(get_db),
+        admin=Depends(get_current_admin)
+):
+    """Администратор импортирует опросы из потока NDJSON или CSV.
+
+    Пачки фиксируются по мере чтения; при ошибке в строке импорт
+    останавливается, ранее загруженные пачки сохраняются.
+    """
+    content_type = request.headers.get("content-type", "")
+    parse = iter_csv_polls if "csv" in content_type else iter_ndjson_polls
+    try:
+        created = await bulk_create_polls(
+            db,
+            parse(iter_lines(request.stream())),
+            admin["email"],
+            get_settings().BULK_IMPORT_BATCH_SIZE
+        )
+    except PollImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UserNotFoundError:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"created": created}
+
+
+@router.put("/polls/{poll_id}", response_model=PollRead)
 async def admin_update_poll(
         poll_id: int,
         poll_update_data: PollUpdate,
-        token_param: TokenParam = Depends(),
         db=Depends(get_db),
         admin=Depends(get_current_admin)
 ):
@@ -57,9 +125,8 @@ async def admin_update_poll(
         raise HTTPException(status_code=404, detail="Poll not found")
 
 
-@router.post("/polls/check-and-close")
+@router.post("/polls/check-and-close", response_model=ClosePollsResult)
 async def admin_check_and_close_polls(
-        token_param: TokenParam = Depends(),
         db=Depends(get_db),
         admin=Depends(get_current_admin)
 ):
@@ -67,24 +134,57 @@ async def admin_check_and_close_polls(
     return await check_and_close_polls(db)
 
 
-@router.delete("/polls/{poll_id}")
+@router.delete("/polls/{poll_id}", response_model=MessageResponse)
 async def admin_delete_poll(
         poll_id: int,
-        token_param: TokenParam = Depends(),
+        background_tasks: BackgroundTasks,
+        response: Response,
         db=Depends(get_db),
         admin=Depends(get_current_admin)
 ):
-    """Администратор удаляет опрос по ID"""
+    """Администратор удаляет опрос по ID (большие опросы - в фоне)"""
     try:
+        threshold = get_settings().POLL_PURGE_THRESHOLD
+        if await count_poll_votes(db, poll_id) > threshold:
+            result = await schedule_poll_purge(db, poll_id)
+            background_tasks.add_task(purge_poll_in_background, poll_id)
+            response.status_code = 202
+            return result
         return await delete_poll(db, poll_id)
     except ValueError:
         raise HTTPException(status_code=404, detail="Poll not found")
 
 
-@router.delete("/users/{user_id}")
+@router.patch("/users/{user_id}", response_model=UserRead)
+async def admin_update_user(
+        user_id: int,
+        user_update_data: UserUpdate,
+        db=Depends(get_db),
+        admin=Depends(get_current_admin)
+):
+    """Администратор меняет роль или активность пользователя"""
+    try:
+        return await update_user(db, user_id, user_update_data)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="User not found")
+
+
+@router.post("/users/{user_id}/revoke-tokens", response_model=MessageResponse)
+async def admin_revoke_user_tokens(
+        user_id: int,
+        db=Depends(get_db),
+        admin=Depends(get_current_admin)
+):
+    """Администратор отзывает все токены пользователя"""
+    try:
+        return await revoke_user_tokens(db, user_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="User not found")
+
+
+@router.delete("/users/{user_id}", response_model=MessageResponse)
 async def admin_delete_user(
         user_id: int,
-        token_param: TokenParam = Depends(),
         db=Depends(get_db),
         admin=Depends(get_current_admin)
 ):
@@ -95,11 +195,97 @@ async def admin_delete_user(
         raise HTTPException(status_code=404, detail="User not found")
 
 
-@router.get("/choices")
+@router.get("/choices", response_model=list[ChoiceRead])
 async def get_all_choices_route(
-        token_param: TokenParam = Depends(),
-        db=Depends(get_db),
+        db=Depends(get_read_db),
         admin=Depends(get_current_admin)
 ):
     """Получение списка всех вариантов ответов"""
     return await get_all_choices(db)
+
+
+@router.get("/query-stats", response_model=list[QueryStat])
+async def get_query_stats(
+        limit: int = Query(20, ge=1, le=500),
+        admin=Depends(get_current_admin)
+):
+    """Формы SQL-запросов с наибольшим суммарным временем (QUERY_PROFILING)"""
+    if not query_profiler.enabled:
+        raise HTTPException(status_code=404, detail="Query profiling is disabled")
+    return query_profiler.top(limit)
+
+
+@router.delete("/query-stats", response_model=MessageResponse)
+async def reset_query_stats(admin=Depends(get_current_admin)):
+    """Сброс накопленной статистики запросов"""
+    query_profiler.reset()
+    return {"message": "Query stats reset"}
+
+
+def _profile_response(sampler: StackSampler, output_format: str):
+    if output_format not in FORMATS:
+        raise HTTPException(status_code=400, detail="Unknown profile format")
+    if output_format == COLLAPSED:
+        return PlainTextResponse(sampler.collapsed())
+    return sampler.speedscope()
+
+
+@router.get("/profile")
+async def profile_worker(
+        seconds: float = Query(10, gt=0),
+        format: str = Query(COLLAPSED),
+        interval_ms: float = Query(None, gt=0),
+        include_idle: bool = False,
+        admin=Depends(get_current_admin)
+):
+    """Сэмплирование стеков воркера в течение seconds секунд"""
+    if seconds > get_settings().PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail="Profiling period is too long")
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail="Unknown profile format")
+    if not acquire_session():
+        raise HTTPException(status_code=409, detail="Profiler is already running")
+    sampler = StackSampler(interval_ms, include_idle)
+    sampler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        await asyncio.to_thread(sampler.stop)
+        release_session()
+    return _profile_response(sampler, format)
+
+
+@router.get("/profiles/{profile_id}")
+async def get_request_profile(
+        profile_id: str,
+        format: str = Query(COLLAPSED),
+        admin=Depends(get_current_admin)
+):
+    """Профиль запроса, снятый по заголовку X-Profile (PROFILE_REQUESTS)"""
+    sampler = get_profile(profile_id)
+    if sampler is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return _profile_response(sampler, format)
+
+
+@router.get("/traces")
+async def get_traces(
+        trace_id: str = None,
+        limit: int = Query(1000, ge=1),
+        admin=Depends(get_current_admin)
+):
+    """Завершенные спаны из памяти воркера в формате OTLP/JSON"""
+    if not tracer.enabled or tracer.memory is None:
+        raise HTTPException(status_code=404, detail="Trace memory exporter is disabled")
+    spans = tracer.memory.spans(trace_id)[-limit:]
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": "voting"}}
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "app.shared.tracing"},
+                "spans": [span.to_otlp() for span in spans]
+            }]
+        }]
+    }
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, ConfigDict, field_validator
 from datetime import datetime
 
 
@@ -8,6 +8,12 @@ class UserCreate(BaseModel):
     password: str
 
 
+class UserUpdate(BaseModel):
+    """Схема для изменения пользователя"""
+    role: str = None
+    is_active: bool = None
+
+
 class PollCreate(BaseModel):
     """Схема для создания опроса"""
     title: str
@@ -34,6 +40,66 @@ class PollUpdate(BaseModel):
     close_date: str = None
 
 
-class TokenParam(BaseModel):
-    """Схема для параметра токена"""
-    token: str
+class MessageResponse(BaseModel):
+    """Схема ответа с сообщением"""
+    message: str
+
+
+class UserRead(BaseModel):
+    """Схема созданного пользователя"""
+    id: int
+    email: str
+    role: str | None = None
+    is_active: bool | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PollRead(BaseModel):
+    """Схема опроса для ответа администратору"""
+    id: int
+    title: str
+    description: str | None = None
+    creator_id: int | None = None
+    creation_date: datetime | None = None
+    is_closed: bool | None = None
+    close_date: datetime | None = None
+    is_multiple_choice: bool | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PollCreated(BaseModel):
+    """Схема ответа на создание опроса"""
+    id: int
+    title: str
+    choices: list[str]
+
+
+class ChoiceRead(BaseModel):
+    """Схема варианта ответа с привязкой к опросу"""
+    id: int
+    text: str
+    poll_id: int
+
+
+class BulkImportResult(BaseModel):
+    """Схема результата массового импорта опросов"""
+    created: int
+
+
+class ClosePollsResult(BaseModel):
+    """Схема результата закрытия просроченных опросов"""
+    message: str
+    closed_ids: list[int]
+
+
+class QueryStat(BaseModel):
+    """Схема статистики формы SQL-запроса"""
+    statement: str
+    calls: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    origins: list[str]
+    plan: str | None = None
@@ -1,14 +1,35 @@
+from sqlalchemy import func, insert, select, update
 from sqlalchemy.orm import Session
-from app.database.models import User, Poll, Choice
-from app.modules.admin.schemas import UserCreate, PollCreate, PollUpdate
+from app.config import get_settings
+from app.database.models import User, Poll, Choice, Vote, Ballot, VoteChange
+from app.database.session import get_session_factory
+from app.database.sharding import shard_count, shard_session, vote_session
+from app.modules.admin.schemas import UserCreate, UserUpdate, PollCreate, PollUpdate
+from app.modules.voting.ballots import use_ballot_storage
+from app.modules.voting.changelog import (
+    change_log_enabled,
+    forget_poll,
+    record_user_removal
+)
 from datetime import datetime, timezone, UTC
 import logging
-from app.shared.logging import setup_logging
+from app.shared.cache import POLLS_CHANNEL, SNAPSHOTS_CHANNEL
+from app.shared.coordination import invalidation_bus
+from app.shared.principals import USERS_CHANNEL
+from app.shared.tracing import traced
 
-setup_logging()
 logger = logging.getLogger(__name__)
 
 
+class UserNotFoundError(LookupError):
+    """Пользователь, от имени которого выполняется операция, не найден"""
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+@traced
 async def create_user(db: Session, user_data: UserCreate):
     logger.info(f"Creating admin user: email={user_data.email}")
     hashed_password = (
@@ -19,12 +40,14 @@ async def create_user(db: Session, user_data: UserCreate):
                     is_active=True
                     )
     db.add(new_user)
+    invalidation_bus.publish(db, USERS_CHANNEL, user_data.email)
     db.commit()
     db.refresh(new_user)
     logger.info(f"Admin user created: id={new_user.id}")
     return new_user
 
 
+@traced
 async def create_poll(db: Session, poll_data: PollCreate):
     logger.info(f"Creating admin poll: title={poll_data.title}")
     new_poll = Poll(
@@ -32,28 +55,89 @@ async def create_poll(db: Session, poll_data: PollCreate):
         description=poll_data.description,
         creator_id=1,
         is_multiple_choice=poll_data.is_multiple_choice,
+        ballot_storage=use_ballot_storage(poll_data.is_multiple_choice),
         close_date=poll_data.close_date,
         is_closed=False,
         creation_date=datetime.now(timezone.utc)
     )
 
     db.add(new_poll)
-    db.commit()
-    db.refresh(new_poll)
+    db.flush()
 
     if not new_poll.id:
         logger.error("Admin poll creation failed: missing ID")
+        db.rollback()
         raise ValueError("Failed to create poll: poll ID is missing")
 
-    for choice_text in poll_data.choices:
-        new_choice = Choice(text=choice_text, poll_id=new_poll.id)
-        db.add(new_choice)
+    if poll_data.choices:
+        db.execute(insert(Choice), [
+            {"text": choice_text, "poll_id": new_poll.id}
+            for choice_text in poll_data.choices
+        ])
 
+    invalidation_bus.publish(db, POLLS_CHANNEL)
     db.commit()
     logger.info(f"Admin poll created successfully: id={new_poll.id}")
     return {"id": new_poll.id, "title": new_poll.title, "choices": poll_data.choices}
 
 
+@traced
+async def bulk_create_polls(
+        db: Session, polls,
+        creator_email: str,
+        batch_size: int
+) -> int:
+    """Импорт опросов пачками: один INSERT опросов и один INSERT вариантов"""
+    creator_id = db.query(User.id).filter(User.email == creator_email).scalar()
+    if creator_id is None:
+        logger.error(f"Bulk import creator not found: email={creator_email}")
+        raise UserNotFoundError(creator_email)
+
+    created = 0
+    batch = []
+    async for poll_data in polls:
+        batch.append(poll_data)
+        if len(batch) >= batch_size:
+            created += _insert_poll_batch(db, batch, creator_id)
+            batch = []
+    if batch:
+        created += _insert_poll_batch(db, batch, creator_id)
+
+    logger.info(f"Bulk import finished: polls={created}")
+    return created
+
+
+def _insert_poll_batch(db: Session, batch: list[PollCreate], creator_id: int) -> int:
+    creation_date = datetime.now(timezone.utc)
+    poll_ids = db.scalars(
+        insert(Poll).returning(Poll.id, sort_by_parameter_order=True),
+        [
+            {
+                "title": poll_data.title,
+                "description": poll_data.description,
+                "creator_id": creator_id,
+                "is_multiple_choice": poll_data.is_multiple_choice,
+                "ballot_storage": use_ballot_storage(poll_data.is_multiple_choice),
+                "close_date": poll_data.close_date,
+                "is_closed": False,
+                "creation_date": creation_date
+            }
+            for poll_data in batch
+        ]
+    ).all()
+    choice_rows = [
+        {"text": choice_text, "poll_id": poll_id}
+        for poll_id, poll_data in zip(poll_ids, batch)
+        for choice_text in poll_data.choices
+    ]
+    if choice_rows:
+        db.execute(insert(Choice), choice_rows)
+    invalidation_bus.publish(db, POLLS_CHANNEL)
+    db.commit()
+    return len(poll_ids)
+
+
+@traced
 async def update_poll(db: Session, poll_id: int, poll_update_data: PollUpdate):
     logger.info(f"Updating poll: poll_id={poll_id}")
     poll = db.query(Poll).filter(Poll.id == poll_id).first()
@@ -66,6 +150,10 @@ async def update_poll(db: Session, poll_id: int, poll_update_data: PollUpdate):
     if poll_update_data.description:
         poll.description = poll_update_data.description
     if poll_update_data.is_closed is not None:
+        if poll_update_data.is_closed and not poll.is_closed:
+            poll.closed_at = _utcnow()
+        elif not poll_update_data.is_closed:
+            poll.closed_at = None
         poll.is_closed = poll_update_data.is_closed
     if poll_update_data.close_date:
         poll.close_date = datetime.strptime(
@@ -73,58 +161,257 @@ async def update_poll(db: Session, poll_id: int, poll_update_data: PollUpdate):
             "%Y-%m-%d %H:%M:%S"
         )
 
+    invalidation_bus.publish(db, POLLS_CHANNEL)
+    invalidation_bus.publish(db, SNAPSHOTS_CHANNEL, poll_id)
     db.commit()
     db.refresh(poll)
     logger.info(f"Poll updated successfully: poll_id={poll_id}")
     return poll
 
 
-async def check_and_close_polls(db: Session):
-    """Проверяет все опросы и закрывает те, чья дата закрытия уже наступила"""
-    current_time = datetime.now(UTC)
-    polls_to_close = db.query(Poll).filter(
-        Poll.close_date.isnot(None),
-        Poll.close_date <= current_time,
-        Poll.is_closed.is_(False)
-    ).all()
+@traced
+async def check_and_close_polls(db: Session, batch_size: int = None):
+    """Проверяет все опросы и закрывает те, чья дата закрытия уже наступила.
 
-    for poll in polls_to_close:
-        poll.is_closed = True
+    Опросы закрываются пачками через UPDATE ... RETURNING, каждая пачка -
+    отдельная короткая транзакция.
+    """
+    batch_size = batch_size or get_settings().EXPIRY_SWEEP_BATCH_SIZE
+    current_time = datetime.now(UTC)
+    closed_ids = []
+    while True:
+        due_ids = select(Poll.id).where(
+            Poll.is_closed.is_(False),
+            Poll.close_date.isnot(None),
+            Poll.close_date <= current_time
+        ).limit(batch_size).scalar_subquery()
+        batch_ids = db.scalars(
+            update(Poll)
+            .where(Poll.id.in_(due_ids), Poll.is_closed.is_(False))
+            .values(is_closed=True, closed_at=_utcnow())
+            .returning(Poll.id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if not batch_ids:
+            break
+        invalidation_bus.publish(db, POLLS_CHANNEL)
         db.commit()
-        db.refresh(poll)
-    logger.info(f"{len(polls_to_close)} polls have been closed successfully.")
-    return {"message": f"{len(polls_to_close)} polls have been closed."}
+        closed_ids.extend(batch_ids)
+        if len(batch_ids) < batch_size:
+            break
+
+    logger.info(f"{len(closed_ids)} polls have been closed successfully.")
+    return {
+        "message": f"{len(closed_ids)} polls have been closed.",
+        "closed_ids": closed_ids
+    }
 
 
+@traced
 async def delete_poll(db: Session, poll_id: int):
     """Удаление опроса по ID"""
     poll = db.query(Poll).filter(Poll.id == poll_id).first()
     if not poll:
+        # Импорт внутри функции: модуль архива сам зависит от admin.services
+        from app.modules.voting.archive import delete_archived_poll
+
+        if delete_archived_poll(db, poll_id):
+            logger.info(f"Archived poll deleted: poll_id={poll_id}")
+            return {"message": "Poll deleted successfully"}
         logger.error(f"Poll not found for delete: poll_id={poll_id}")
         raise ValueError("Poll not found")
 
+    if shard_count():
+        choice_ids = [choice.id for choice in poll.choices]
+        with vote_session(db, poll_id) as vote_db:
+            vote_db.query(Vote).filter(Vote.choice_id.in_(choice_ids)).delete(
+                synchronize_session=False
+            )
+            vote_db.query(Ballot).filter(Ballot.poll_id == poll_id).delete(
+                synchronize_session=False
+            )
+            forget_poll(vote_db, poll_id)
+            vote_db.commit()
+
     db.delete(poll)
+    invalidation_bus.publish(db, POLLS_CHANNEL)
+    invalidation_bus.publish(db, SNAPSHOTS_CHANNEL, poll_id)
     db.commit()
     logger.info(f"Poll deleted successfully: poll_id={poll_id}")
     return {"message": "Poll deleted successfully"}
 
 
+def _poll_choice_ids(db: Session, poll_id: int) -> list[int]:
+    return [
+        choice_id for (choice_id,) in
+        db.query(Choice.id).filter(Choice.poll_id == poll_id).all()
+    ]
+
+
+@traced
+async def count_poll_votes(db: Session, poll_id: int) -> int:
+    """Количество голосов опроса (для выбора способа удаления)"""
+    choice_ids = _poll_choice_ids(db, poll_id)
+    with vote_session(db, poll_id) as vote_db:
+        votes = vote_db.query(func.count(Vote.id)).filter(
+            Vote.choice_id.in_(choice_ids)
+        ).scalar()
+        ballots = vote_db.query(func.count(Ballot.id)).filter(
+            Ballot.poll_id == poll_id
+        ).scalar()
+    return votes + ballots
+
+
+@traced
+async def schedule_poll_purge(db: Session, poll_id: int):
+    """Закрытие опроса перед фоновым удалением, чтобы остановить голосование"""
+    poll = db.query(Poll).filter(Poll.id == poll_id).first()
+    if not poll:
+        logger.error(f"Poll not found for purge: poll_id={poll_id}")
+        raise ValueError("Poll not found")
+
+    if not poll.is_closed:
+        poll.is_closed = True
+        poll.closed_at = _utcnow()
+    invalidation_bus.publish(db, POLLS_CHANNEL)
+    invalidation_bus.publish(db, SNAPSHOTS_CHANNEL, poll_id)
+    db.commit()
+    logger.info(f"Poll purge scheduled: poll_id={poll_id}")
+    return {"message": "Poll deletion scheduled"}
+
+
+def _delete_in_batches(vote_db: Session, model, condition, batch_size: int) -> int:
+    deleted = 0
+    while True:
+        row_ids = [
+            row_id for (row_id,) in
+            vote_db.query(model.id).filter(condition).limit(batch_size).all()
+        ]
+        if not row_ids:
+            return deleted
+        vote_db.query(model).filter(model.id.in_(row_ids)).delete(
+            synchronize_session=False
+        )
+        vote_db.commit()
+        deleted += len(row_ids)
+
+
+@traced
+def purge_poll(db: Session, poll_id: int, batch_size: int) -> int:
+    """Удаление голосов опроса короткими транзакциями, затем самого опроса"""
+    choice_ids = _poll_choice_ids(db, poll_id)
+    with vote_session(db, poll_id) as vote_db:
+        purged = _delete_in_batches(
+            vote_db, Vote, Vote.choice_id.in_(choice_ids), batch_size
+        )
+        purged += _delete_in_batches(
+            vote_db, Ballot, Ballot.poll_id == poll_id, batch_size
+        )
+        _delete_in_batches(
+            vote_db, VoteChange, VoteChange.poll_id == poll_id, batch_size
+        )
+        forget_poll(vote_db, poll_id)
+        vote_db.commit()
+
+    db.query(Poll).filter(Poll.id == poll_id).delete(synchronize_session=False)
+    invalidation_bus.publish(db, POLLS_CHANNEL)
+    invalidation_bus.publish(db, SNAPSHOTS_CHANNEL, poll_id)
+    db.commit()
+    logger.info(f"Poll purged: poll_id={poll_id}, votes={purged}")
+    return purged
+
+
+@traced
+def purge_poll_in_background(poll_id: int):
+    settings = get_settings()
+    db = get_session_factory()()
+    try:
+        purge_poll(db, poll_id, settings.POLL_PURGE_BATCH_SIZE)
+    except Exception:
+        logger.exception(f"Poll purge failed: poll_id={poll_id}")
+    finally:
+        db.close()
+
+
+@traced
+async def update_user(db: Session, user_id: int, user_update_data: UserUpdate):
+    """Изменение роли или активности пользователя с отзывом его токенов"""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        logger.error(f"User not found for update: user_id={user_id}")
+        raise ValueError("User not found")
+
+    if user_update_data.role is not None:
+        user.role = user_update_data.role
+    if user_update_data.is_active is not None:
+        user.is_active = user_update_data.is_active
+    _bump_token_version(db, user)
+    db.refresh(user)
+    logger.info(f"User updated successfully: user_id={user_id}")
+    return user
+
+
+@traced
+async def revoke_user_tokens(db: Session, user_id: int):
+    """Отзыв всех выданных пользователю токенов"""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        logger.error(f"User not found for token revoke: user_id={user_id}")
+        raise ValueError("User not found")
+
+    _bump_token_version(db, user)
+    logger.info(f"User tokens revoked: user_id={user_id}")
+    return {"message": "User tokens revoked"}
+
+
+def _bump_token_version(db: Session, user: User):
+    user.token_version = (user.token_version or 0) + 1
+    invalidation_bus.publish(db, USERS_CHANNEL)
+    db.commit()
+
+
+@traced
 async def delete_user(db: Session, user_id: int):
-    """Удаление пользователя по ID"""
+    """Удаление пользователя по ID.
+
+    Опросы пользователя удаляются каскадом, но голоса в шардах каскад не
+    достает, поэтому сначала каждый опрос удаляется через purge_poll.
+    """
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         logger.error(f"User not found for delete: user_id={user_id}")
         raise ValueError("User not found")
 
+    batch_size = get_settings().POLL_PURGE_BATCH_SIZE
+    for (poll_id,) in db.query(Poll.id).filter(Poll.creator_id == user_id).all():
+        purge_poll(db, poll_id, batch_size)
+
+    if change_log_enabled():
+        record_user_removal(db, user_id)
+
+    for shard in range(shard_count()):
+        with shard_session(db, shard) as vote_db:
+            vote_db.query(Vote).filter(Vote.user_id == user_id).delete(
+                synchronize_session=False
+            )
+            vote_db.query(Ballot).filter(Ballot.user_id == user_id).delete(
+                synchronize_session=False
+            )
+            vote_db.commit()
+
     db.delete(user)
+    invalidation_bus.publish(db, POLLS_CHANNEL)
+    invalidation_bus.publish(db, SNAPSHOTS_CHANNEL)
+    invalidation_bus.publish(db, USERS_CHANNEL)
     db.commit()
     logger.info(f"User deleted successfully: user_id={user_id}")
     return {"message": "User deleted successfully"}
 
 
+@traced
 async def get_all_choices(db: Session):
     """Получение списка всех вариантов ответов (choices)"""
-    choices = db.query(Choice).all()
+    choices = db.query(Choice.id, Choice.text, Choice.poll_id).all()
     return [
         {
             "id": choice.id,
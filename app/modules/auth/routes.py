@@ -1,22 +1,47 @@
 from datetime import timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.modules.auth.schemas import UserCreate, UserLogin, Token
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
+from app.modules.auth.schemas import (
+    UserCreate,
+    UserLogin,
+    RefreshTokenRequest,
+    Token,
+    MessageResponse
+)
 from app.modules.auth.services import (
     create_user,
     authenticate_user,
     create_access_token,
-    create_refresh_token,
-    decode_access_token
+    decode_refresh_token
+)
+from app.modules.auth.tokens import (
+    issue_refresh_token,
+    revoke_family,
+    rotate_refresh_token
 )
 from app.database.session import get_db
 from app.database.models import User
-from app.config import settings
+from app.config import get_settings
+from app.shared.principals import current_token_version
+from app.shared.rate_limit import limit_by_client
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 
-@router.post("/register", response_model=dict)
+def get_refresh_token(
+        body: RefreshTokenRequest | None = Body(None),
+        refresh_token: str | None = Query(
+            None,
+            deprecated=True,
+            description="Устаревший способ передачи refresh-токена, "
+                        "передавайте его в теле запроса"
+        )
+) -> str | None:
+    """Refresh-токен из JSON-тела; параметр запроса оставлен для старых клиентов"""
+    return body.refresh_token if body else refresh_token
+
+
+@router.post("/register", response_model=MessageResponse)
 async def register(user_data: UserCreate, db=Depends(get_db)):
     """Регистрация нового пользователя"""
     existing_user = db.query(User).filter(User.email == user_data.email).first()
@@ -29,7 +54,15 @@ async def register(user_data: UserCreate, db=Depends(get_db)):
     return {"message": "User registered successfully"}
 
 
-@router.post("/login", response_model=Token)
+@router.post(
+    "/login",
+    response_model=Token,
+    dependencies=[Depends(limit_by_client(
+        "login",
+        "RATE_LIMIT_LOGIN_PER_CLIENT_PER_MINUTE",
+        email_limit_setting="RATE_LIMIT_LOGIN_PER_MINUTE"
+    ))]
+)
 async def login(user_data: UserLogin, db=Depends(get_db)):
     """Логин пользователя"""
     user = await authenticate_user(db, user_data.email, user_data.password)
@@ -39,23 +72,19 @@ async def login(user_data: UserLogin, db=Depends(get_db)):
             detail="Invalid credentials"
         )
 
+    settings = get_settings()
     access_token_data = {
         "sub": user.email,
-        "role": user.role
-    }
-    refresh_token_data = {
-        "sub": user.email,
-        "role": user.role
+        "role": user.role,
+        "ver": user.token_version or 0
     }
 
     access_token = create_access_token(
         data=access_token_data,
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    refresh_token = create_refresh_token(
-        data=refresh_token_data,
-        expires_delta=timedelta(days=7)
-    )
+    refresh_token = issue_refresh_token(db, user)
+    db.commit()
 
     return {
         "access_token": access_token,
@@ -64,40 +93,53 @@ async def login(user_data: UserLogin, db=Depends(get_db)):
     }
 
 
-@router.post("/logout", response_model=dict)
-async def logout():
-    """Выход из аккаунта (необходимо очистить токен на клиенте)"""
+@router.post("/logout", response_model=MessageResponse)
+async def logout(
+        refresh_token: str | None = Depends(get_refresh_token),
+        db=Depends(get_db)
+):
+    """Выход из аккаунта: отзыв цепочки refresh-токенов, если он передан"""
+    payload = decode_refresh_token(refresh_token) if refresh_token else None
+    if payload and payload.get("fam"):
+        revoke_family(db, payload["fam"])
     return {"message": "Logout successful"}
 
 
 @router.post("/token/refresh", response_model=Token)
-async def refresh_token(refresh_token: str):
-    """Обновление access token с использованием refresh token"""
-    payload = decode_access_token(refresh_token)
+async def refresh_token(
+        refresh_token: str | None = Depends(get_refresh_token),
+        db=Depends(get_db)
+):
+    """Ротация refresh token и выдача нового access token"""
+    payload = decode_refresh_token(refresh_token) if refresh_token else None
     if not payload or "sub" not in payload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid refresh token"
         )
 
+    token_version = current_token_version(db, payload)
+    user = db.query(User).filter(User.email == payload["sub"]).first()
+    new_refresh_token = None
+    if token_version is not None and user:
+        new_refresh_token = rotate_refresh_token(db, payload, user)
+    if not new_refresh_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token"
+        )
+
+    settings = get_settings()
     new_access_token = create_access_token(
         data={
-            "sub": payload["sub"],
-            "role": payload["role"]
+            "sub": user.email,
+            "role": user.role,
+            "ver": token_version
         },
         expires_delta=timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
     )
-    new_refresh_token = create_refresh_token(
-        data={
-            "sub": payload["sub"],
-            "role": payload["role"]
-        },
-        expires_delta=timedelta(
-            days=settings.REFRESH_TOKEN_EXPIRE_DAYS
-        )
-    )
 
     return {
         "access_token": new_access_token,
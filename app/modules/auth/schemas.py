@@ -13,8 +13,18 @@ class UserLogin(BaseModel):
     password: str
 
 
+class RefreshTokenRequest(BaseModel):
+    """Схема тела запроса с refresh-токеном"""
+    refresh_token: str
+
+
 class Token(BaseModel):
     """Схема для ответа с токеном"""
     access_token: str
     refresh_token: str
     token_type: str
+
+
+class MessageResponse(BaseModel):
+    """Схема ответа с сообщением"""
+    message: str
@@ -1,23 +1,43 @@
 import logging
 from sqlalchemy.orm import Session
 from app.database.models import User
-from passlib.context import CryptContext
-from jose import jwt
 from datetime import timedelta, datetime, UTC
-from app.config import settings
+from app.config import get_settings
+from app.shared.coordination import invalidation_bus
+from app.shared.principals import USERS_CHANNEL
+from app.shared.tracing import traced, tracer
 
 logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+REFRESH_TOKEN_TYPE = "refresh"
 
+_pwd_context = None
 
+
+def get_pwd_context():
+    """Ленивая загрузка passlib/bcrypt при первом хешировании пароля"""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+
+def __getattr__(name: str):
+    if name == "pwd_context":
+        return get_pwd_context()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@traced
 async def create_user(
         db: Session, email: str,
         password: str,
         role: str = "user"
 ):
     logger.info(f"Creating user: email={email}, role={role}")
-    hashed_password = pwd_context.hash(password)
+    with tracer.start_span("bcrypt.hash"):
+        hashed_password = get_pwd_context().hash(password)
     new_user = User(
         email=email,
         hashed_password=hashed_password,
@@ -25,27 +45,35 @@ async def create_user(
         role=role
     )
     db.add(new_user)
+    invalidation_bus.publish(db, USERS_CHANNEL, email)
     db.commit()
     db.refresh(new_user)
     logger.info(f"User created successfully: id={new_user.id}")
     return new_user
 
 
+@traced
 async def authenticate_user(db: Session, email: str, password: str):
     logger.info(f"Authenticating user: email={email}")
     user = db.query(User).filter(User.email == email).first()
     if not user:
         logger.warning(f"Authentication failed: user not found for email={email}")
         return None
-    if not pwd_context.verify(password, user.hashed_password):
+    with tracer.start_span("bcrypt.verify"):
+        verified = get_pwd_context().verify(password, user.hashed_password)
+    if not verified:
         logger.warning(f"Authentication failed: wrong password for email={email}")
         return None
     logger.info(f"User authenticated: id={user.id}")
     return user
 
 
+@traced("jwt.encode")
 def create_access_token(data: dict, expires_delta: timedelta = None):
     logger.info("Creating access token")
+    from jose import jwt
+
+    settings = get_settings()
     to_encode = data.copy()
     expire = datetime.now(UTC) + (expires_delta or timedelta(minutes=15))
     to_encode.update({"exp": expire})
@@ -58,7 +86,11 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return encoded_jwt
 
 
+@traced("jwt.decode")
 def decode_access_token(token: str):
+    from jose import jwt
+
+    settings = get_settings()
     logger.info("Decoding access token")
     try:
         payload = jwt.decode(
@@ -73,15 +105,27 @@ def decode_access_token(token: str):
         return None
 
 
+def decode_refresh_token(token: str):
+    """Декодирование токена, выданного как refresh-токен"""
+    payload = decode_access_token(token)
+    if not payload or payload.get("typ") != REFRESH_TOKEN_TYPE:
+        return None
+    return payload
+
+
+@traced("jwt.encode")
 def create_refresh_token(
         data: dict,
         expires_delta:
         timedelta = None
 ):
     logger.info("Creating refresh token")
+    from jose import jwt
+
+    settings = get_settings()
     to_encode = data.copy()
     expire = datetime.now(UTC) + (expires_delta or timedelta(days=7))
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "typ": REFRESH_TOKEN_TYPE})
     encoded_jwt = jwt.encode(
         to_encode,
         settings.SECRET_KEY,
@@ -0,0 +1,240 @@
+"""Хранилище refresh-токенов с ротацией и обнаружением повторного использования.
+
+Каждый refresh-токен имеет jti и family (цепочку ротаций от одного входа)
+и записан в таблицу refresh_tokens. При обновлении старый jti отзывается,
+а новый выдается в той же family. Предъявление уже отозванного jti
+считается кражей токена и отзывает всю family.
+
+Отозванные jti держатся в памяти воркера в bloom-фильтре и точном
+словаре jti -> срок действия: проверка занимает O(1), а для большинства
+неотозванных токенов ограничивается фильтром. Другие воркеры подгружают
+новые отзывы после события REFRESH_TOKENS_CHANNEL.
+"""
+import hashlib
+import logging
+import math
+import threading
+import uuid
+from datetime import datetime, timedelta, UTC
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database.models import RefreshToken, User
+from app.modules.auth.services import create_refresh_token
+from app.shared.coordination import invalidation_bus
+from app.shared.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+REFRESH_TOKENS_CHANNEL = "refresh_tokens"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+class BloomFilter:
+    """Bloom-фильтр на bytearray с двойным хешированием blake2b"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[position >> 3] >> (position & 7) & 1
+            for position in self._positions(key)
+        )
+
+
+class RevokedTokens:
+    """Отозванные jti в памяти воркера: bloom-фильтр плюс точный словарь"""
+
+    def __init__(self, capacity: int = None, error_rate: float = None):
+        settings = get_settings()
+        self._capacity = capacity or settings.REFRESH_TOKEN_FILTER_CAPACITY
+        self._error_rate = error_rate or settings.REFRESH_TOKEN_FILTER_ERROR_RATE
+        self._filter = BloomFilter(self._capacity, self._error_rate)
+        self._expires = {}
+        self._watermark = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def add(self, jti: str, expires_at: datetime):
+        with self._lock:
+            self._filter.add(jti)
+            self._expires[jti] = expires_at
+
+    def __contains__(self, jti: str) -> bool:
+        return jti in self._filter and jti in self._expires
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def mark_stale(self):
+        self._stale = True
+
+    def sync(self, db: Session):
+        """Подгрузка отзывов, сделанных после последней синхронизации"""
+        if not self._stale:
+            return
+        self._stale = False
+        query = db.query(
+            RefreshToken.jti, RefreshToken.expires_at, RefreshToken.revoked_at
+        ).filter(RefreshToken.expires_at > _utcnow())
+        if self._watermark is None:
+            query = query.filter(RefreshToken.revoked_at.isnot(None))
+        else:
+            query = query.filter(RefreshToken.revoked_at >= self._watermark)
+        for jti, expires_at, revoked_at in query:
+            self.add(jti, expires_at)
+            if self._watermark is None or revoked_at > self._watermark:
+                self._watermark = revoked_at
+        if self._watermark is None:
+            self._watermark = _utcnow()
+
+    def prune(self, now: datetime = None) -> int:
+        """Удаление истекших jti и пересборка фильтра"""
+        now = now or _utcnow()
+        with self._lock:
+            expired = [jti for jti, expires in self._expires.items() if expires <= now]
+            if not expired:
+                return 0
+            for jti in expired:
+                del self._expires[jti]
+            self._filter = BloomFilter(
+                max(self._capacity, len(self._expires)), self._error_rate
+            )
+            for jti in self._expires:
+                self._filter.add(jti)
+        return len(expired)
+
+
+_revoked_tokens = None
+
+
+def get_revoked_tokens() -> RevokedTokens:
+    global _revoked_tokens
+    if _revoked_tokens is None:
+        _revoked_tokens = RevokedTokens()
+    return _revoked_tokens
+
+
+def _mark_revoked_tokens_stale():
+    get_revoked_tokens().mark_stale()
+
+
+invalidation_bus.subscribe(REFRESH_TOKENS_CHANNEL, _mark_revoked_tokens_stale)
+
+
+@traced
+def issue_refresh_token(db: Session, user: User, family: str = None) -> str:
+    """Выдача refresh-токена с записью его jti в хранилище"""
+    settings = get_settings()
+    expires_delta = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    jti = uuid.uuid4().hex
+    family = family or uuid.uuid4().hex
+    db.add(RefreshToken(
+        jti=jti,
+        family=family,
+        user_id=user.id,
+        expires_at=_utcnow() + expires_delta
+    ))
+    return create_refresh_token(
+        data={
+            "sub": user.email,
+            "role": user.role,
+            "ver": user.token_version or 0,
+            "jti": jti,
+            "fam": family
+        },
+        expires_delta=expires_delta
+    )
+
+
+@traced
+def revoke_family(db: Session, family: str) -> int:
+    """Отзыв всех действующих токенов цепочки"""
+    now = _utcnow()
+    tokens = db.query(RefreshToken.jti, RefreshToken.expires_at).filter(
+        RefreshToken.family == family,
+        RefreshToken.revoked_at.is_(None)
+    ).all()
+    db.query(RefreshToken).filter(
+        RefreshToken.family == family,
+        RefreshToken.revoked_at.is_(None)
+    ).update({"revoked_at": now}, synchronize_session=False)
+    invalidation_bus.publish(db, REFRESH_TOKENS_CHANNEL)
+    db.commit()
+    revoked_tokens = get_revoked_tokens()
+    for jti, expires_at in tokens:
+        revoked_tokens.add(jti, expires_at)
+    return len(tokens)
+
+
+@traced
+def rotate_refresh_token(db: Session, payload: dict, user: User) -> str | None:
+    """Отзыв предъявленного токена и выдача следующего в той же цепочке.
+
+    Возвращает None, если токен неизвестен, истек или уже использован;
+    в последнем случае отзывается вся цепочка.
+    """
+    jti, family = payload.get("jti"), payload.get("fam")
+    if not jti or not family:
+        return None
+
+    revoked_tokens = get_revoked_tokens()
+    revoked_tokens.sync(db)
+    if jti in revoked_tokens:
+        _report_reuse(db, jti, family)
+        return None
+
+    now = _utcnow()
+    claimed = db.query(RefreshToken).filter(
+        RefreshToken.jti == jti,
+        RefreshToken.family == family,
+        RefreshToken.revoked_at.is_(None),
+        RefreshToken.expires_at > now
+    ).update({"revoked_at": now}, synchronize_session=False)
+    if not claimed:
+        db.rollback()
+        if db.get(RefreshToken, jti) is not None:
+            _report_reuse(db, jti, family)
+        return None
+
+    expires_at = db.query(RefreshToken.expires_at).filter(
+        RefreshToken.jti == jti
+    ).scalar()
+    token = issue_refresh_token(db, user, family)
+    invalidation_bus.publish(db, REFRESH_TOKENS_CHANNEL)
+    db.commit()
+    revoked_tokens.add(jti, expires_at)
+    return token
+
+
+def _report_reuse(db: Session, jti: str, family: str):
+    logger.warning(f"Refresh token reuse detected: jti={jti}, family={family}")
+    revoke_family(db, family)
+
+
+@traced
+def prune_refresh_tokens(db: Session) -> int:
+    """Удаление истекших записей из таблицы refresh_tokens"""
+    deleted = db.query(RefreshToken).filter(
+        RefreshToken.expires_at <= _utcnow()
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
@@ -0,0 +1,383 @@
+"""Архивирование давно закрытых опросов.
+
+Опросы, закрытые больше ARCHIVE_AFTER_DAYS дней назад, вместе с
+вариантами, голосами и бюллетенями переносятся из рабочих таблиц в архив:
+каталог сжатых NDJSON-файлов (файл на опрос) или отдельную базу, если
+ARCHIVE_URL - URL SQLAlchemy. В рабочей базе остается строка
+archived_polls с замороженными снимками: элемент списка опросов, детали
+и итоги. Чтение списка, деталей и итогов прозрачно переходит на эти
+снимки, а restore возвращает опрос из архива в рабочие таблицы.
+Возраст опроса считается от closed_at - момента фактического закрытия.
+
+Запуск: python -m app.modules.voting.archive {run,restore} ...
+"""
+import argparse
+import asyncio
+import base64
+import gzip
+import json
+import logging
+import os
+from collections import Counter
+from datetime import datetime, timedelta, UTC
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    LargeBinary,
+    MetaData,
+    Table,
+    create_engine,
+    delete,
+    insert,
+    select
+)
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database.models import ArchivedPoll, Ballot, Choice, Poll, Vote
+from app.database.sharding import vote_session
+from app.modules.admin.services import purge_poll
+from app.modules.voting import tally
+from app.modules.voting.changelog import (
+    ballot_deltas,
+    change_log_enabled,
+    is_additive,
+    record_changes
+)
+from app.modules.voting.services import (
+    count_closed_poll_votes,
+    get_poll_details,
+    get_poll_results
+)
+from app.shared.cache import ARCHIVE_CHANNEL, POLLS_CHANNEL, SNAPSHOTS_CHANNEL
+from app.shared.coordination import invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_TABLES = {
+    table.name: table for table in (
+        Poll.__table__, Choice.__table__, Vote.__table__, Ballot.__table__
+    )
+}
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    return value
+
+
+def _decode(column, value):
+    if value is None:
+        return None
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, LargeBinary):
+        return base64.b64decode(value)
+    return value
+
+
+class FileArchive:
+    """Файл poll-<id>.ndjson.gz на опрос: строки {"table": ..., "row": {...}}"""
+
+    def __init__(self, directory: str):
+        self.url = directory
+
+    def path(self, poll_id: int) -> str:
+        return os.path.join(self.url, f"poll-{poll_id}.ndjson.gz")
+
+    def write(self, poll_id: int, records: dict) -> str:
+        os.makedirs(self.url, exist_ok=True)
+        path = self.path(poll_id)
+        temporary = f"{path}.tmp"
+        with gzip.open(temporary, "wt", encoding="utf-8") as file:
+            for table_name, rows in records.items():
+                for row in rows:
+                    file.write(json.dumps({
+                        "table": table_name,
+                        "row": {key: _encode(value) for key, value in row.items()}
+                    }) + "\n")
+        os.replace(temporary, path)
+        return path
+
+    def read(self, poll_id: int) -> dict:
+        records = {table_name: [] for table_name in ARCHIVED_TABLES}
+        with gzip.open(self.path(poll_id), "rt", encoding="utf-8") as file:
+            for line in file:
+                item = json.loads(line)
+                table = ARCHIVED_TABLES[item["table"]]
+                records[table.name].append({
+                    key: _decode(table.c[key], value)
+                    for key, value in item["row"].items()
+                })
+        return records
+
+    def remove(self, poll_id: int):
+        try:
+            os.remove(self.path(poll_id))
+        except FileNotFoundError:
+            pass
+
+
+class DatabaseArchive:
+    """Архивная база с таблицами polls, choices, votes и ballots без FK"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = create_engine(url)
+        metadata = MetaData()
+        self.tables = {
+            name: Table(name, metadata, *(
+                Column(column.name, column.type, primary_key=column.primary_key)
+                for column in table.columns
+            ))
+            for name, table in ARCHIVED_TABLES.items()
+        }
+        metadata.create_all(self.engine)
+
+    def _conditions(self, poll_id: int) -> dict:
+        polls, choices = self.tables["polls"], self.tables["choices"]
+        choice_ids = select(choices.c.id).where(choices.c.poll_id == poll_id)
+        return {
+            "votes": self.tables["votes"].c.choice_id.in_(choice_ids),
+            "ballots": self.tables["ballots"].c.poll_id == poll_id,
+            "choices": choices.c.poll_id == poll_id,
+            "polls": polls.c.id == poll_id
+        }
+
+    def _delete(self, conn, poll_id: int):
+        for table_name, condition in self._conditions(poll_id).items():
+            conn.execute(delete(self.tables[table_name]).where(condition))
+
+    def write(self, poll_id: int, records: dict) -> str:
+        with self.engine.begin() as conn:
+            self._delete(conn, poll_id)
+            for table_name, rows in records.items():
+                if rows:
+                    conn.execute(insert(self.tables[table_name]), rows)
+        return self.engine.url.render_as_string(hide_password=True)
+
+    def read(self, poll_id: int) -> dict:
+        with self.engine.connect() as conn:
+            return {
+                table_name: [
+                    dict(row._mapping) for row in conn.execute(
+                        select(self.tables[table_name]).where(condition)
+                    )
+                ]
+                for table_name, condition in self._conditions(poll_id).items()
+            }
+
+    def remove(self, poll_id: int):
+        with self.engine.begin() as conn:
+            self._delete(conn, poll_id)
+
+
+_archive_store = None
+
+
+def get_archive_store():
+    """Архив по ARCHIVE_URL: URL базы ("...://...") или каталог файлов"""
+    global _archive_store
+    url = get_settings().ARCHIVE_URL
+    if _archive_store is None or _archive_store.url != url:
+        _archive_store = DatabaseArchive(url) if "://" in url else FileArchive(url)
+    return _archive_store
+
+
+def _rows(session: Session, table: Table, condition) -> list[dict]:
+    return [dict(row._mapping) for row in session.execute(
+        select(table).where(condition)
+    )]
+
+
+def _poll_rows(db: Session, poll_id: int) -> dict:
+    records = {
+        "polls": _rows(db, Poll.__table__, Poll.id == poll_id),
+        "choices": _rows(db, Choice.__table__, Choice.poll_id == poll_id)
+    }
+    choice_ids = [row["id"] for row in records["choices"]]
+    with vote_session(db, poll_id) as vote_db:
+        records["votes"] = _rows(
+            vote_db, Vote.__table__, Vote.choice_id.in_(choice_ids)
+        )
+        records["ballots"] = _rows(
+            vote_db, Ballot.__table__, Ballot.poll_id == poll_id
+        )
+    return records
+
+
+async def archive_poll(db: Session, poll_id: int, store=None) -> int:
+    """Перенос закрытого опроса в архив; возвращает число голосов и бюллетеней.
+
+    Сначала архив записывается целиком и фиксируются снимки, затем опрос
+    удаляется из рабочих таблиц теми же короткими транзакциями, что и при
+    фоновом удалении. Прерванное архивирование безопасно повторить.
+    """
+    store = store or get_archive_store()
+    poll = db.query(
+        Poll.is_closed, Poll.close_date
+    ).filter(Poll.id == poll_id).first()
+    if poll is None or not poll.is_closed:
+        raise ValueError("Only closed polls can be archived")
+
+    details = await get_poll_details(db, poll_id)
+    results = await get_poll_results(db, poll_id)
+    vote_counts = count_closed_poll_votes(db, [poll_id])
+    summary = {
+        "id": poll_id,
+        "title": details["title"],
+        "description": details["description"],
+        "close_date": details["close_date"],
+        "is_closed": True,
+        "results": {
+            choice["text"]: vote_counts.get(choice["id"], 0)
+            for choice in details["choices"]
+        }
+    }
+
+    records = _poll_rows(db, poll_id)
+    location = store.write(poll_id, records)
+    db.merge(ArchivedPoll(
+        poll_id=poll_id,
+        close_date=poll.close_date,
+        archived_at=_utcnow(),
+        location=location,
+        summary=json.dumps(summary),
+        details=json.dumps(details),
+        results=json.dumps(results)
+    ))
+    invalidation_bus.publish(db, ARCHIVE_CHANNEL)
+    db.commit()
+    archived = purge_poll(db, poll_id, get_settings().POLL_PURGE_BATCH_SIZE)
+    logger.info(f"Poll archived: poll_id={poll_id}, votes={archived}, to {location}")
+    return archived
+
+
+async def archive_closed_polls(
+        db: Session, older_than_days: int = None, limit: int = None,
+        keep_going=None
+) -> list[int]:
+    """Архивирование опросов, закрытых больше older_than_days дней назад.
+
+    keep_going() проверяется перед каждым опросом: планировщик продлевает
+    в нем аренду лидера и останавливается, если ее перехватили.
+    """
+    settings = get_settings()
+    if older_than_days is None:
+        older_than_days = settings.ARCHIVE_AFTER_DAYS
+    if older_than_days <= 0:
+        return []
+    cutoff = _utcnow() - timedelta(days=older_than_days)
+    poll_ids = [
+        poll_id for (poll_id,) in db.query(Poll.id).filter(
+            Poll.is_closed.is_(True),
+            Poll.closed_at < cutoff
+        ).order_by(Poll.id).limit(limit or settings.ARCHIVE_BATCH_SIZE)
+    ]
+    store = get_archive_store()
+    archived = []
+    for poll_id in poll_ids:
+        if keep_going is not None and not keep_going():
+            break
+        await archive_poll(db, poll_id, store)
+        archived.append(poll_id)
+    return archived
+
+
+def _restored_deltas(records: dict) -> Counter:
+    """Дельты журнала изменений для возвращаемых голосов"""
+    poll = records["polls"][0]
+    method = poll["voting_method"] or tally.PLURALITY
+    choice_ids = sorted(row["id"] for row in records["choices"])
+    deltas = Counter(row["choice_id"] for row in records["votes"])
+    if is_additive(method):
+        for row in records["ballots"]:
+            deltas.update(ballot_deltas(method, choice_ids, None, row["selection"]))
+    return deltas
+
+
+def restore_poll(db: Session, poll_id: int, store=None) -> int:
+    """Возврат опроса из архива в рабочие таблицы"""
+    store = store or get_archive_store()
+    archived = db.get(ArchivedPoll, poll_id)
+    if archived is None:
+        raise ValueError("Poll is not archived")
+
+    records = store.read(poll_id)
+    db.execute(insert(Poll.__table__), records["polls"])
+    if records["choices"]:
+        db.execute(insert(Choice.__table__), records["choices"])
+    with vote_session(db, poll_id) as vote_db:
+        for model, table_name in ((Vote, "votes"), (Ballot, "ballots")):
+            rows = [
+                {key: value for key, value in row.items() if key != "id"}
+                for row in records[table_name]
+            ]
+            if rows:
+                vote_db.execute(insert(model.__table__), rows)
+        if change_log_enabled():
+            record_changes(vote_db, poll_id, _restored_deltas(records))
+        vote_db.commit()
+
+    db.delete(archived)
+    invalidation_bus.publish(db, ARCHIVE_CHANNEL)
+    invalidation_bus.publish(db, POLLS_CHANNEL)
+    invalidation_bus.publish(db, SNAPSHOTS_CHANNEL, poll_id)
+    db.commit()
+    store.remove(poll_id)
+    restored = len(records["votes"]) + len(records["ballots"])
+    logger.info(f"Poll restored from archive: poll_id={poll_id}, votes={restored}")
+    return restored
+
+
+def delete_archived_poll(db: Session, poll_id: int, store=None) -> bool:
+    """Удаление опроса из архива: строки archived_polls и записей хранилища"""
+    archived = db.query(ArchivedPoll).filter(ArchivedPoll.poll_id == poll_id).first()
+    if archived is None:
+        return False
+
+    store = store or get_archive_store()
+    db.delete(archived)
+    invalidation_bus.publish(db, ARCHIVE_CHANNEL)
+    invalidation_bus.publish(db, POLLS_CHANNEL)
+    invalidation_bus.publish(db, SNAPSHOTS_CHANNEL, poll_id)
+    db.commit()
+    store.remove(poll_id)
+    logger.info(f"Poll deleted from archive: poll_id={poll_id}")
+    return True
+
+
+def main():
+    from app.database.session import get_session_factory
+
+    parser = argparse.ArgumentParser(description="Closed poll archive")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run = subparsers.add_parser("run", help="Archive polls closed long ago")
+    run.add_argument("--days", type=int, help="Default ARCHIVE_AFTER_DAYS")
+    run.add_argument("--limit", type=int, help="Default ARCHIVE_BATCH_SIZE")
+    restore = subparsers.add_parser("restore", help="Move polls back from archive")
+    restore.add_argument("poll_ids", type=int, nargs="+")
+    args = parser.parse_args()
+
+    db = get_session_factory()()
+    try:
+        if args.command == "run":
+            poll_ids = asyncio.run(archive_closed_polls(db, args.days, args.limit))
+            print(f"Archived {len(poll_ids)} polls: {poll_ids}")
+        else:
+            for poll_id in args.poll_ids:
+                print(f"Poll {poll_id}: {restore_poll(db, poll_id)} votes restored")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
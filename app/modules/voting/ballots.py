@@ -0,0 +1,285 @@
+"""Хранение голосов опросов в виде бюллетеней.
+
+Один бюллетень - одна строка (poll_id, user_id) с упакованным выбором,
+позиция i соответствует i-му варианту опроса в порядке Choice.id:
+    * множественный выбор и approval - битовая маска, бит i - вариант i;
+    * irv и borda - позиции вариантов в порядке предпочтения, uint16;
+    * weighted - вес каждого варианта, uint16.
+"""
+import argparse
+import logging
+from typing import TYPE_CHECKING
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database.models import Ballot, Choice, Poll, Vote
+from app.database.sharding import vote_session
+from app.modules.voting import tally
+from app.shared.cache import POLLS_CHANNEL
+from app.shared.coordination import invalidation_bus
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def use_ballot_storage(
+        is_multiple_choice: bool,
+        voting_method: str = tally.PLURALITY
+) -> bool:
+    """Хранить ли голоса нового опроса бюллетенями"""
+    if voting_method != tally.PLURALITY:
+        return True
+    return bool(is_multiple_choice) and get_settings().MULTIPLE_CHOICE_BALLOTS
+
+
+def encode_selection(positions, n_choices: int) -> bytes:
+    """Битовая маска выбранных позиций вариантов, little-endian"""
+    mask = 0
+    for position in positions:
+        mask |= 1 << position
+    return mask.to_bytes((n_choices + 7) // 8, "little")
+
+
+def decode_selection(selection: bytes) -> list[int]:
+    mask = int.from_bytes(selection, "little")
+    return [position for position in range(mask.bit_length()) if mask >> position & 1]
+
+
+def encode_ranking(positions) -> bytes:
+    import numpy as np
+    return np.asarray(positions, dtype="<u2").tobytes()
+
+
+def encode_weights(weights_by_position: dict, n_choices: int) -> bytes:
+    import numpy as np
+    weights = np.zeros(n_choices, dtype="<u2")
+    for position, weight in weights_by_position.items():
+        weights[position] = weight
+    return weights.tobytes()
+
+
+def encode_ballot(
+        voting_method: str, positions: list[int],
+        n_choices: int,
+        weights: list[int] | None = None
+) -> bytes:
+    if voting_method in tally.RANKED_METHODS:
+        return encode_ranking(positions)
+    if voting_method == tally.WEIGHTED:
+        return encode_weights(dict(zip(positions, weights)), n_choices)
+    return encode_selection(positions, n_choices)
+
+
+def unpack_bitmasks(selections: list[bytes], n_choices: int) -> "np.ndarray":
+    import numpy as np
+    width = (n_choices + 7) // 8
+    if not selections or not width:
+        return np.zeros((len(selections), n_choices), dtype=np.uint8)
+    packed = np.frombuffer(
+        b"".join(selection.ljust(width, b"\0")[:width] for selection in selections),
+        dtype=np.uint8
+    ).reshape(-1, width)
+    return np.unpackbits(packed, axis=1, count=n_choices, bitorder="little")
+
+
+def _unpack_uint16(selections: list[bytes], n_choices: int, fill: bytes):
+    import numpy as np
+    width = 2 * n_choices
+    if not selections or not width:
+        return np.zeros((len(selections), n_choices), dtype=np.int64)
+    return np.frombuffer(
+        b"".join(selection.ljust(width, fill)[:width] for selection in selections),
+        dtype="<u2"
+    ).reshape(-1, n_choices).astype(np.int64)
+
+
+def unpack_rankings(selections: list[bytes], n_choices: int) -> "np.ndarray":
+    """Матрица ранжирований; пустые места заполнены значением n_choices"""
+    import numpy as np
+    return np.minimum(_unpack_uint16(selections, n_choices, b"\xff"), n_choices)
+
+
+def unpack_weights(selections: list[bytes], n_choices: int) -> "np.ndarray":
+    return _unpack_uint16(selections, n_choices, b"\0")
+
+
+def ballot_positions(voting_method: str, selection: bytes, n_choices: int):
+    """Позиции вариантов, отмеченных в бюллетене"""
+    import numpy as np
+    if voting_method in tally.RANKED_METHODS:
+        return [
+            position for position in unpack_rankings([selection], n_choices)[0].tolist()
+            if position < n_choices
+        ]
+    if voting_method == tally.WEIGHTED:
+        return np.flatnonzero(unpack_weights([selection], n_choices)[0]).tolist()
+    return [
+        position for position in decode_selection(selection) if position < n_choices
+    ]
+
+
+def tally_selections(selections: list[bytes], n_choices: int) -> "np.ndarray":
+    """Число голосов за каждый вариант: векторный подсчет битов всех масок"""
+    return tally.approval(unpack_bitmasks(selections, n_choices))
+
+
+def tally_ballots(voting_method: str, selections: list[bytes], n_choices: int):
+    """Итоги опроса по бюллетеням: счет, раунды (для irv) и победитель"""
+    rounds = []
+    if voting_method == tally.INSTANT_RUNOFF:
+        rounds, winner = tally.instant_runoff(
+            unpack_rankings(selections, n_choices), n_choices
+        )
+        return {"scores": rounds[-1], "rounds": rounds, "winner": winner}
+    if voting_method == tally.BORDA:
+        scores = tally.borda(unpack_rankings(selections, n_choices), n_choices)
+    elif voting_method == tally.WEIGHTED:
+        scores = tally.weighted(unpack_weights(selections, n_choices))
+    else:
+        scores = tally_selections(selections, n_choices)
+    return {"scores": scores, "rounds": rounds, "winner": tally.leader(scores)}
+
+
+def poll_choice_ids(db: Session, poll_id: int) -> list[int]:
+    """Идентификаторы вариантов опроса в порядке битов маски"""
+    return [
+        choice_id for (choice_id,) in
+        db.query(Choice.id).filter(Choice.poll_id == poll_id).order_by(Choice.id)
+    ]
+
+
+def save_ballot(
+        vote_db: Session, poll_id: int,
+        user_id: int,
+        choice_ids: list[int],
+        ordered_choice_ids: list[int],
+        voting_method: str = tally.PLURALITY,
+        weights: list[int] | None = None
+):
+    """Создание или замена бюллетеня; возвращает (прежний выбор, новый выбор)"""
+    positions = {choice_id: i for i, choice_id in enumerate(ordered_choice_ids)}
+    selection = encode_ballot(
+        voting_method,
+        [positions[choice_id] for choice_id in choice_ids],
+        len(ordered_choice_ids),
+        weights
+    )
+    ballot = vote_db.query(Ballot).filter(
+        Ballot.poll_id == poll_id,
+        Ballot.user_id == user_id
+    ).first()
+    if ballot:
+        previous = ballot.selection
+        ballot.selection = selection
+        return previous, selection
+    vote_db.add(Ballot(poll_id=poll_id, user_id=user_id, selection=selection))
+    return None, selection
+
+
+def count_ballot_votes(db: Session, vote_db: Session, poll_ids) -> dict:
+    """Счет вариантов из бюллетеней опросов: {choice_id: score}"""
+    if not poll_ids:
+        return {}
+    selections = {}
+    for poll_id, selection in vote_db.query(Ballot.poll_id, Ballot.selection).filter(
+        Ballot.poll_id.in_(poll_ids)
+    ):
+        selections.setdefault(poll_id, []).append(selection)
+    if not selections:
+        return {}
+
+    choice_ids = {}
+    for choice_id, poll_id in db.query(Choice.id, Choice.poll_id).filter(
+        Choice.poll_id.in_(list(selections))
+    ).order_by(Choice.id):
+        choice_ids.setdefault(poll_id, []).append(choice_id)
+    methods = dict(
+        db.query(Poll.id, Poll.voting_method).filter(Poll.id.in_(list(selections)))
+    )
+
+    vote_counts = {}
+    for poll_id, poll_selections in selections.items():
+        ordered = choice_ids.get(poll_id, [])
+        result = tally_ballots(
+            methods.get(poll_id) or tally.PLURALITY, poll_selections, len(ordered)
+        )
+        vote_counts.update(zip(ordered, result["scores"].tolist()))
+    return vote_counts
+
+
+def migrate_poll_to_ballots(db: Session, poll_id: int) -> int:
+    """Перевод голосов опроса из таблицы votes в бюллетени.
+
+    Без шардов перенос выполняется одной транзакцией. С шардами голоса,
+    поданные во время переноса, могут потеряться, поэтому переводить стоит
+    закрытые опросы или в окно обслуживания.
+    """
+    poll = db.get(Poll, poll_id)
+    if poll is None:
+        raise ValueError("Poll not found")
+    if poll.ballot_storage:
+        return 0
+
+    ordered = poll_choice_ids(db, poll_id)
+    positions = {choice_id: i for i, choice_id in enumerate(ordered)}
+    with vote_session(db, poll_id) as vote_db:
+        selections = {}
+        for user_id, choice_id in vote_db.query(Vote.user_id, Vote.choice_id).filter(
+            Vote.choice_id.in_(ordered)
+        ):
+            selections.setdefault(user_id, []).append(positions[choice_id])
+        if selections:
+            vote_db.execute(insert(Ballot), [
+                {
+                    "poll_id": poll_id,
+                    "user_id": user_id,
+                    "selection": encode_selection(user_positions, len(ordered))
+                }
+                for user_id, user_positions in selections.items()
+            ])
+        vote_db.query(Vote).filter(Vote.choice_id.in_(ordered)).delete(
+            synchronize_session=False
+        )
+        if vote_db is not db:
+            vote_db.commit()
+
+        poll.ballot_storage = True
+        invalidation_bus.publish(db, POLLS_CHANNEL)
+        db.commit()
+
+    logger.info(f"Poll moved to ballots: poll_id={poll_id}, ballots={len(selections)}")
+    return len(selections)
+
+
+def main():
+    from app.database.session import get_session_factory
+
+    parser = argparse.ArgumentParser(description="Ballot storage maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate = subparsers.add_parser(
+        "migrate", help="Move multiple-choice poll votes into ballots"
+    )
+    migrate.add_argument("poll_ids", type=int, nargs="*")
+    args = parser.parse_args()
+
+    db = get_session_factory()()
+    try:
+        poll_ids = args.poll_ids or [
+            poll_id for (poll_id,) in db.query(Poll.id).filter(
+                Poll.is_multiple_choice.is_(True),
+                Poll.ballot_storage.isnot(True)
+            )
+        ]
+        for poll_id in poll_ids:
+            ballots = migrate_poll_to_ballots(db, poll_id)
+            print(f"Poll {poll_id}: {ballots} ballots")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
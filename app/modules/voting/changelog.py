@@ -0,0 +1,338 @@
+"""Журнал изменений голосов и инкрементальные счетчики результатов.
+
+vote_in_poll в той же транзакции, что и голос, дописывает в vote_changes
+дельты (poll_id, choice_id, delta). Потребитель сворачивает новые записи
+в choice_tallies и сдвигает курсор change_log_cursors, поэтому стоимость
+обновления результатов пропорциональна числу изменений, а не голосов.
+Журнал и счетчики живут в базе голосов опроса (в шарде, если он есть).
+
+Для irv счетчики не ведутся: результат не складывается из дельт.
+Курсор полагается на то, что id записей фиксируются по возрастанию, как
+при сериализованной записи SQLite.
+"""
+import argparse
+import logging
+from collections import Counter
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database.models import (
+    Ballot,
+    ChangeLogCursor,
+    Choice,
+    ChoiceTally,
+    Poll,
+    Vote,
+    VoteChange
+)
+from app.database.sharding import shard_count, shard_session
+from app.modules.voting import tally
+from app.modules.voting.ballots import tally_ballots
+from app.shared.cache import POLLS_CHANNEL
+from app.shared.coordination import invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+TALLY_CONSUMER = "tallies"
+
+_subscribers = []
+
+
+def change_log_enabled() -> bool:
+    return get_settings().VOTE_CHANGE_LOG
+
+
+def is_additive(voting_method: str | None) -> bool:
+    """Складывается ли результат метода из дельт по вариантам"""
+    return voting_method != tally.INSTANT_RUNOFF
+
+
+def subscribe(handler):
+    """Подписка на свернутые изменения: handler(set[poll_id])"""
+    _subscribers.append(handler)
+
+
+def record_changes(vote_db: Session, poll_id: int, deltas: dict):
+    """Добавление ненулевых дельт {choice_id: delta} в журнал"""
+    rows = [
+        {"poll_id": poll_id, "choice_id": choice_id, "delta": delta}
+        for choice_id, delta in deltas.items() if delta
+    ]
+    if rows:
+        vote_db.execute(insert(VoteChange), rows)
+
+
+def ballot_deltas(
+        voting_method: str, ordered_choice_ids: list[int],
+        old_selection: bytes | None,
+        new_selection: bytes | None
+) -> dict:
+    """Разница вкладов двух бюллетеней в счет вариантов"""
+    deltas = Counter()
+    for selection, sign in ((old_selection, -1), (new_selection, 1)):
+        if selection is None:
+            continue
+        scores = tally_ballots(
+            voting_method, [selection], len(ordered_choice_ids)
+        )["scores"]
+        for choice_id, score in zip(ordered_choice_ids, scores.tolist()):
+            deltas[choice_id] += sign * score
+    return deltas
+
+
+def _vote_sessions(db: Session):
+    for shard in range(shard_count() or 1):
+        with shard_session(db, shard) as vote_db:
+            yield vote_db
+
+
+def record_user_removal(db: Session, user_id: int):
+    """Отрицательные дельты для всех голосов удаляемого пользователя"""
+    for vote_db in _vote_sessions(db):
+        choice_votes = dict(
+            vote_db.query(Vote.choice_id, func.count(Vote.id))
+            .filter(Vote.user_id == user_id)
+            .group_by(Vote.choice_id)
+            .all()
+        )
+        ballots = vote_db.query(Ballot.poll_id, Ballot.selection).filter(
+            Ballot.user_id == user_id
+        ).all()
+        poll_ids = {poll_id for poll_id, _ in ballots}
+
+        choices = db.query(Choice.id, Choice.poll_id).filter(
+            (Choice.id.in_(list(choice_votes))) | (Choice.poll_id.in_(poll_ids))
+        ).order_by(Choice.id).all()
+        methods = dict(
+            db.query(Poll.id, Poll.voting_method).filter(
+                Poll.id.in_({poll_id for _, poll_id in choices})
+            )
+        )
+        deltas = {}
+        for choice_id, poll_id in choices:
+            votes = choice_votes.get(choice_id)
+            if votes:
+                deltas.setdefault(poll_id, Counter())[choice_id] -= votes
+        for poll_id, selection in ballots:
+            method = methods.get(poll_id) or tally.PLURALITY
+            if not is_additive(method):
+                continue
+            ordered = [
+                choice_id for choice_id, choice_poll_id in choices
+                if choice_poll_id == poll_id
+            ]
+            deltas.setdefault(poll_id, Counter()).update(
+                ballot_deltas(method, ordered, selection, None)
+            )
+
+        for poll_id, poll_deltas in deltas.items():
+            record_changes(vote_db, poll_id, poll_deltas)
+        if vote_db is not db:
+            vote_db.commit()
+
+
+def forget_poll(vote_db: Session, poll_id: int):
+    """Удаление журнала и счетчиков опроса (для баз без каскадных FK)"""
+    for model in (VoteChange, ChoiceTally):
+        vote_db.query(model).filter(model.poll_id == poll_id).delete(
+            synchronize_session=False
+        )
+
+
+def _claim_batch(vote_db: Session, batch_size: int):
+    """Захват следующей пачки журнала сдвигом курсора (compare-and-set)"""
+    cursor = vote_db.get(ChangeLogCursor, TALLY_CONSUMER)
+    if cursor is None:
+        try:
+            with vote_db.begin_nested():
+                vote_db.add(ChangeLogCursor(name=TALLY_CONSUMER, last_id=0))
+        except IntegrityError:
+            pass
+        last_id = 0
+    else:
+        last_id = cursor.last_id
+
+    changes = vote_db.query(
+        VoteChange.id, VoteChange.poll_id, VoteChange.choice_id, VoteChange.delta
+    ).filter(VoteChange.id > last_id).order_by(VoteChange.id).limit(batch_size).all()
+    if not changes:
+        return []
+
+    claimed = vote_db.query(ChangeLogCursor).filter(
+        ChangeLogCursor.name == TALLY_CONSUMER,
+        ChangeLogCursor.last_id == last_id
+    ).update({"last_id": changes[-1].id}, synchronize_session=False)
+    if not claimed:
+        vote_db.rollback()
+        return []
+    return changes
+
+
+def fold_changes(vote_db: Session, batch_size: int = None) -> set[int]:
+    """Сворачивание новых записей журнала в счетчики одной базы"""
+    batch_size = batch_size or get_settings().CHANGE_LOG_BATCH_SIZE
+    changed_polls = set()
+    while True:
+        changes = _claim_batch(vote_db, batch_size)
+        if not changes:
+            vote_db.commit()
+            return changed_polls
+
+        deltas = Counter()
+        poll_of = {}
+        for _, poll_id, choice_id, delta in changes:
+            deltas[choice_id] += delta
+            poll_of[choice_id] = poll_id
+        current = dict(
+            vote_db.query(ChoiceTally.choice_id, ChoiceTally.score).filter(
+                ChoiceTally.choice_id.in_(list(deltas))
+            )
+        )
+        updates = [
+            {"choice_id": choice_id, "score": current[choice_id] + delta}
+            for choice_id, delta in deltas.items() if choice_id in current
+        ]
+        inserts = [
+            {"choice_id": choice_id, "poll_id": poll_of[choice_id], "score": delta}
+            for choice_id, delta in deltas.items() if choice_id not in current
+        ]
+        if updates:
+            vote_db.execute(update(ChoiceTally), updates)
+        if inserts:
+            vote_db.execute(insert(ChoiceTally), inserts)
+        vote_db.commit()
+        changed_polls.update(poll_of.values())
+        if len(changes) < batch_size:
+            return changed_polls
+
+
+def fold_all(db: Session) -> set[int]:
+    """Сворачивание журналов всех баз голосов и уведомление подписчиков"""
+    changed_polls = set()
+    for vote_db in _vote_sessions(db):
+        changed_polls |= fold_changes(vote_db)
+    if changed_polls:
+        invalidation_bus.publish(db, POLLS_CHANNEL)
+        db.commit()
+        for handler in _subscribers:
+            handler(changed_polls)
+    return changed_polls
+
+
+def compact_changes(vote_db: Session) -> int:
+    """Схлопывание свернутой части журнала до одной записи на вариант.
+
+    Запись получает наибольший id своей группы, поэтому остается за
+    курсором, а повторное сворачивание журнала дает те же счетчики.
+    """
+    cursor = vote_db.get(ChangeLogCursor, TALLY_CONSUMER)
+    if cursor is None or not cursor.last_id:
+        return 0
+    groups = vote_db.query(
+        VoteChange.poll_id,
+        VoteChange.choice_id,
+        func.sum(VoteChange.delta),
+        func.max(VoteChange.id),
+        func.count(VoteChange.id)
+    ).filter(VoteChange.id <= cursor.last_id).group_by(
+        VoteChange.poll_id, VoteChange.choice_id
+    ).all()
+    removed = sum(count for *_, count in groups)
+    vote_db.query(VoteChange).filter(VoteChange.id <= cursor.last_id).delete(
+        synchronize_session=False
+    )
+    rows = [
+        {"id": max_id, "poll_id": poll_id, "choice_id": choice_id, "delta": delta}
+        for poll_id, choice_id, delta, max_id, _ in groups if delta
+    ]
+    if rows:
+        vote_db.execute(insert(VoteChange), rows)
+    vote_db.commit()
+    logger.info(f"Vote change log compacted: {removed} -> {len(rows)} rows")
+    return removed - len(rows)
+
+
+def compact_all(db: Session) -> int:
+    return sum(compact_changes(vote_db) for vote_db in _vote_sessions(db))
+
+
+def rebuild_tallies(vote_db: Session) -> set[int]:
+    """Пересборка счетчиков повторным сворачиванием всего журнала"""
+    vote_db.query(ChoiceTally).delete(synchronize_session=False)
+    vote_db.query(ChangeLogCursor).filter(
+        ChangeLogCursor.name == TALLY_CONSUMER
+    ).delete(synchronize_session=False)
+    vote_db.commit()
+    return fold_changes(vote_db)
+
+
+def seed_changes(db: Session) -> int:
+    """Начальные записи журнала из текущих голосов (при включении журнала)"""
+    methods = dict(db.query(Poll.id, Poll.voting_method))
+    choices = {}
+    for choice_id, poll_id in db.query(Choice.id, Choice.poll_id).order_by(Choice.id):
+        choices.setdefault(poll_id, []).append(choice_id)
+    poll_of = {
+        choice_id: poll_id
+        for poll_id, choice_ids in choices.items() for choice_id in choice_ids
+    }
+
+    seeded = 0
+    for vote_db in _vote_sessions(db):
+        deltas = {}
+        for choice_id, votes in vote_db.query(
+            Vote.choice_id, func.count(Vote.id)
+        ).group_by(Vote.choice_id):
+            if choice_id in poll_of:
+                deltas.setdefault(poll_of[choice_id], Counter())[choice_id] += votes
+        for poll_id, selection in vote_db.query(Ballot.poll_id, Ballot.selection):
+            method = methods.get(poll_id) or tally.PLURALITY
+            if poll_id in choices and is_additive(method):
+                deltas.setdefault(poll_id, Counter()).update(
+                    ballot_deltas(method, choices[poll_id], None, selection)
+                )
+        for poll_id, poll_deltas in deltas.items():
+            record_changes(vote_db, poll_id, poll_deltas)
+            seeded += len(poll_deltas)
+        vote_db.commit()
+    return seeded
+
+
+def get_tallies(vote_db: Session, poll_ids) -> dict:
+    """Свернутые счетчики опросов: {choice_id: score}"""
+    return dict(
+        vote_db.query(ChoiceTally.choice_id, ChoiceTally.score).filter(
+            ChoiceTally.poll_id.in_(poll_ids)
+        ).all()
+    )
+
+
+def main():
+    from app.database.session import get_session_factory
+
+    parser = argparse.ArgumentParser(description="Vote change log maintenance")
+    parser.add_argument("command", choices=["fold", "compact", "rebuild", "seed"])
+    args = parser.parse_args()
+
+    db = get_session_factory()()
+    try:
+        if args.command == "seed":
+            print(f"Seeded {seed_changes(db)} changes")
+        elif args.command == "fold":
+            print(f"Folded changes of {len(fold_all(db))} polls")
+        elif args.command == "compact":
+            print(f"Removed {compact_all(db)} change rows")
+        else:
+            changed = set()
+            for vote_db in _vote_sessions(db):
+                changed |= rebuild_tallies(vote_db)
+            print(f"Rebuilt tallies of {len(changed)} polls")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
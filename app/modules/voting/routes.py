@@ -1,41 +1,122 @@
-from fastapi import APIRouter, Depends, HTTPException
-from app.database.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import TypeAdapter
+
+from app.config import get_settings
+from app.database.session import (
+    get_db,
+    get_read_db,
+    is_primary_sticky,
+    mark_primary_sticky
+)
 from app.modules.voting.services import (
     get_active_polls,
     vote_in_poll,
     get_poll_details,
+    get_polls_details,
+    get_user_votes,
+    get_poll_results,
     close_poll
 )
 from app.modules.voting.services import create_poll
 from app.modules.voting.schemas import (
     PollCreate,
-    TokenParam,
     VoteCreate,
-    ClosePollRequest
+    ClosePollRequest,
+    MessageResponse,
+    PollSummary,
+    PollDetails,
+    PollCreated,
+    PollResults
 )
+from app.shared.cache import closed_poll_snapshots, polls_cache, user_votes_cache
+from app.shared.compression import make_snapshot, snapshot_response
+from app.shared.etag import etag_response
+from app.shared.rate_limit import limit_by_user
 from app.shared.security import get_current_user
 
 router = APIRouter(prefix="/polls", tags=["Polls"])
 
+poll_list_adapter = TypeAdapter(list[PollSummary])
+poll_details_adapter = TypeAdapter(list[PollDetails])
+
+
+def _parse_ids(ids: list[str]) -> list[int]:
+    """Идентификаторы из ?ids=1,2,3 и/или повторяющегося ?ids=1&ids=2"""
+    try:
+        poll_ids = [int(part) for value in ids for part in value.split(",") if part]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be integers")
+    if len(poll_ids) > get_settings().POLL_DETAILS_MAX_IDS:
+        raise HTTPException(status_code=422, detail="Too many ids")
+    return poll_ids
+
+
+async def _load_poll_list(db, precompress: bool = False):
+    """Снимок списка опросов: тело, ETag и сжатые варианты"""
+    polls = poll_list_adapter.validate_python(await get_active_polls(db))
+    return make_snapshot(poll_list_adapter.dump_json(polls), precompress)
+
+
+@router.get("/", response_model=list[PollSummary])
+async def get_all_active_polls(request: Request, db=Depends(get_read_db)):
+    """Получение списка всех опросов с результатами (поддерживает ETag).
+
+    Общий кеш могли заполнить по отстающей реплике, поэтому недавно
+    писавший пользователь читает основную базу мимо кеша.
+    """
+    if get_settings().CACHE_TTL_SECONDS > 0 and not is_primary_sticky(request):
+        snapshot = await polls_cache.get_or_load(
+            "all", lambda: _load_poll_list(db, precompress=True)
+        )
+    else:
+        snapshot = await _load_poll_list(db)
+    return snapshot_response(request, snapshot)
+
 
-@router.get("/", response_model=list[dict])
-async def get_all_active_polls(db=Depends(get_db)):
-    """Получение списка всех опросов с результатами"""
-    return await get_active_polls(db)
+@router.get("/details", response_model=list[PollDetails])
+async def get_polls_choices(
+        request: Request,
+        ids: list[str] = Query(..., description="ID опросов: ids=1,2,3"),
+        db=Depends(get_read_db)
+):
+    """Детали и варианты ответов нескольких опросов одним запросом"""
+    polls = await get_polls_details(db, _parse_ids(ids))
+    return etag_response(
+        request,
+        poll_details_adapter.dump_json(poll_details_adapter.validate_python(polls))
+    )
+
+
+@router.get("/my-votes", response_model=dict[int, list[int]])
+async def get_my_votes(
+        request: Request,
+        db=Depends(get_read_db),
+        user: dict = Depends(get_current_user)
+):
+    """Варианты, выбранные текущим пользователем: {poll_id: [choice_id]}"""
+    if is_primary_sticky(request):
+        return await get_user_votes(db, user["email"])
+    return await user_votes_cache.get_or_load(
+        user["email"], lambda: get_user_votes(db, user["email"])
+    )
 
 
-@router.post("/polls")
+@router.post("/polls", response_model=PollCreated)
 async def user_create_poll(
         poll_data: PollCreate,
-        token_param: TokenParam = Depends(),
         db=Depends(get_db),
         user: dict = Depends(get_current_user)
 ):
     """Пользователь создает новый опрос"""
+    mark_primary_sticky(db, user["email"])
     return await create_poll(db, poll_data, user["email"])
 
 
-@router.post("/{poll_id}/vote")
+@router.post(
+    "/{poll_id}/vote",
+    response_model=MessageResponse,
+    dependencies=[Depends(limit_by_user("vote", "RATE_LIMIT_VOTE_PER_MINUTE"))]
+)
 async def user_vote_in_poll(
         poll_id: int,
         vote_data: VoteCreate,
@@ -43,27 +124,53 @@ async def user_vote_in_poll(
         user=Depends(get_current_user)
 ):
     """Авторизованный пользователь голосует в опросе"""
-    await vote_in_poll(db, poll_id, vote_data.choice_ids, user["email"])
+    mark_primary_sticky(db, user["email"])
+    await vote_in_poll(
+        db, poll_id, vote_data.choice_ids, user["email"], vote_data.weights
+    )
     return {"message": "Vote successful"}
 
 
-@router.get("/{poll_id}", response_model=dict)
-async def get_poll_choices(poll_id: int, db=Depends(get_db)):
-    """Получение деталей опроса и его вариантов ответов"""
+@router.get("/{poll_id}/results", response_model=PollResults)
+async def get_results(poll_id: int, request: Request, db=Depends(get_db)):
+    """Итоги закрытого опроса: счет, победитель и раунды IRV.
+
+    Итоги закрытого опроса не меняются, поэтому хранятся снимком с
+    заранее сжатыми вариантами. Снимок строится по основной базе, чтобы
+    отставание реплики не попало в кеш.
+    """
+    snapshot = closed_poll_snapshots.get(poll_id)
+    if snapshot is None:
+        results = await get_poll_results(db, poll_id)
+        snapshot = make_snapshot(
+            PollResults.model_validate(results).model_dump_json().encode(),
+            precompress=True
+        )
+        closed_poll_snapshots.set(poll_id, snapshot)
+    return snapshot_response(request, snapshot)
+
+
+@router.get("/{poll_id}", response_model=PollDetails)
+async def get_poll_choices(
+        poll_id: int, request: Request, db=Depends(get_read_db)
+):
+    """Получение деталей опроса и его вариантов ответов (поддерживает ETag)"""
     poll_details = await get_poll_details(db, poll_id)
     if not poll_details:
         raise HTTPException(status_code=404, detail="Poll not found")
-    return poll_details
+    return etag_response(
+        request, PollDetails.model_validate(poll_details).model_dump_json().encode()
+    )
 
 
-@router.post("/{poll_id}/close")
+@router.post("/{poll_id}/close", response_model=MessageResponse)
 async def user_close_poll(
         poll_id: int,
         close_data: ClosePollRequest,
-        token_param: TokenParam = Depends(),
         db=Depends(get_db),
         user=Depends(get_current_user)
 ):
     """Создатель опроса может закрыть его или установить новую дату закрытия"""
+    mark_primary_sticky(db, user["email"])
     await close_poll(db, poll_id, user["email"], close_data.new_close_date)
     return {"message": "Poll closed successfully"}
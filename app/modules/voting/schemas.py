@@ -1,10 +1,19 @@
-from pydantic import BaseModel, field_validator
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
 
+VotingMethod = Literal["plurality", "approval", "irv", "borda", "weighted"]
+
 
 class VoteCreate(BaseModel):
-    """Схема для голосования"""
+    """Схема для голосования.
+
+    Для irv и borda choice_ids перечисляются в порядке предпочтения,
+    для weighted weights задает вес каждого из choice_ids.
+    """
     choice_ids: list[int]
+    weights: list[Annotated[int, Field(ge=0, le=65535)]] | None = None
 
 
 class PollCreate(BaseModel):
@@ -12,6 +21,7 @@ class PollCreate(BaseModel):
     description: str = None
     choices: list[str]
     is_multiple_choice: bool = False
+    voting_method: VotingMethod = "plurality"
     close_date: datetime = None
 
     @field_validator('close_date', mode='before')
@@ -24,11 +34,55 @@ class PollCreate(BaseModel):
         return value
 
 
-class TokenParam(BaseModel):
-    """Схема для параметра токена"""
-    token: str
-
-
 class ClosePollRequest(BaseModel):
     """Схема для закрытия опроса"""
     new_close_date: str = None
+
+
+class MessageResponse(BaseModel):
+    """Схема ответа с сообщением"""
+    message: str
+
+
+class PollSummary(BaseModel):
+    """Схема опроса в общем списке с результатами"""
+    id: int
+    title: str
+    description: str | None = None
+    close_date: str | None = None
+    is_closed: bool | None = None
+    results: dict[str, int]
+
+
+class ChoiceOut(BaseModel):
+    """Схема варианта ответа"""
+    id: int
+    text: str
+
+
+class PollDetails(BaseModel):
+    """Схема деталей опроса"""
+    id: int
+    title: str
+    description: str | None = None
+    is_multiple_choice: bool | None = None
+    voting_method: str | None = None
+    close_date: str | None = None
+    is_closed: bool | None = None
+    choices: list[ChoiceOut]
+
+
+class PollCreated(BaseModel):
+    """Схема ответа на создание опроса"""
+    id: int
+    title: str
+    choices: list[str]
+
+
+class PollResults(BaseModel):
+    """Схема итогов закрытого опроса"""
+    poll_id: int
+    voting_method: str
+    results: dict[str, int]
+    winner: str | None = None
+    rounds: list[dict[str, int]] = []
@@ -1,48 +1,165 @@
+import json
 import logging
+from collections import Counter
 from datetime import timezone, datetime
+
 from fastapi import HTTPException
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
-from app.database.models import Poll, Choice, Vote, User
-from collections import Counter
+from app.database.models import ArchivedPoll, Poll, Choice, Vote, User, Ballot
+from app.database.sharding import (
+    group_by_shard,
+    shard_count,
+    shard_session,
+    vote_session
+)
+from app.modules.voting import tally
+from app.modules.voting.changelog import (
+    ballot_deltas,
+    change_log_enabled,
+    get_tallies,
+    is_additive,
+    record_changes
+)
+from app.modules.voting.ballots import (
+    ballot_positions,
+    count_ballot_votes,
+    poll_choice_ids,
+    save_ballot,
+    tally_ballots,
+    use_ballot_storage
+)
 from app.modules.voting.schemas import PollCreate
+from app.shared.cache import (
+    POLLS_CHANNEL,
+    SNAPSHOTS_CHANNEL,
+    USER_VOTES_CHANNEL,
+    archived_summaries
+)
+from app.shared.coordination import invalidation_bus
+from app.shared.tracing import traced
 
 logger = logging.getLogger(__name__)
 
 
+@traced
 async def get_active_polls(db: Session):
     logger.info("Fetching active polls")
-    all_polls = db.query(Poll).all()
-    result = []
-
-    for poll in all_polls:
-        poll_data = {
-            "id": poll.id,
-            "title": poll.title,
-            "description": poll.description,
-            "close_date": poll.close_date.isoformat() if poll.close_date else None,
-            "is_closed": poll.is_closed,
-            "results": {}
+    polls = db.query(
+        Poll.id,
+        Poll.title,
+        Poll.description,
+        Poll.close_date,
+        Poll.is_closed
+    ).order_by(Poll.id).all()
+    choices = db.query(
+        Choice.id,
+        Choice.text,
+        Choice.poll_id
+    ).order_by(Choice.id).all()
+    vote_counts = count_closed_poll_votes(db, [
+        poll_id for poll_id, _, _, _, is_closed in polls if is_closed
+    ])
+
+    results = {}
+    for choice_id, text, poll_id in choices:
+        results.setdefault(poll_id, {})[text] = vote_counts.get(choice_id, 0)
+
+    result = [
+        {
+            "id": poll_id,
+            "title": title,
+            "description": description,
+            "close_date": close_date.isoformat() if close_date else None,
+            "is_closed": is_closed,
+            "results": results.get(poll_id, {})
         }
-
-        if poll.is_closed:
-            votes = (db.query(Vote.choice_id).
-                     filter(Vote.choice_id.in_([c.id for c in poll.choices])).all())
-            vote_counts = Counter(vote.choice_id for vote in votes)
-            poll_data["results"] = {
-                choice.text:
-                    vote_counts.get(choice.id, 0) for choice in poll.choices
-            }
-        else:
-            poll_data["results"] = {
-                choice.text: 0 for choice in poll.choices
-            }
-
-        result.append(poll_data)
+        for poll_id, title, description, close_date, is_closed in polls
+    ]
+    hot_ids = {poll["id"] for poll in result}
+    result.extend(
+        summary for summary in _archived_summaries(db)
+        if summary["id"] not in hot_ids
+    )
+    result.sort(key=lambda poll: poll["id"])
 
     logger.info(f"Fetched {len(result)} polls")
     return result
 
 
+def _archived_summaries(db: Session) -> tuple:
+    """Элементы списка для архивированных опросов.
+
+    Снимки не меняются, поэтому разбираются один раз и хранятся в кеше,
+    который сбрасывают только архивирование и восстановление опросов.
+    """
+    summaries = archived_summaries.get("all")
+    if summaries is None:
+        summaries = tuple(_archived_snapshots(db, ArchivedPoll.summary))
+        archived_summaries.set("all", summaries)
+    return summaries
+
+
+def _archived_snapshots(db: Session, column, poll_ids: list[int] = None) -> list:
+    """Замороженные снимки архивированных опросов (см. voting.archive)"""
+    query = db.query(column)
+    if poll_ids is not None:
+        query = query.filter(ArchivedPoll.poll_id.in_(poll_ids))
+    return [json.loads(snapshot) for (snapshot,) in query]
+
+
+def count_closed_poll_votes(db: Session, closed_poll_ids: list[int]) -> dict:
+    """Подсчет голосов закрытых опросов с обходом всех шардов"""
+    if change_log_enabled():
+        return _closed_poll_tallies(db, closed_poll_ids)
+    if not shard_count():
+        vote_counts = dict(
+            db.query(Vote.choice_id, func.count(Vote.id))
+            .join(Choice, Choice.id == Vote.choice_id)
+            .join(Poll, Poll.id == Choice.poll_id)
+            .filter(Poll.is_closed.is_(True))
+            .group_by(Vote.choice_id)
+            .all()
+        )
+        vote_counts.update(count_ballot_votes(db, db, closed_poll_ids))
+        return vote_counts
+
+    vote_counts = {}
+    for shard, poll_ids in group_by_shard(db, closed_poll_ids).items():
+        choice_ids = [
+            choice_id for (choice_id,) in
+            db.query(Choice.id).filter(Choice.poll_id.in_(poll_ids)).all()
+        ]
+        with shard_session(db, shard) as shard_db:
+            vote_counts.update(
+                shard_db.query(Vote.choice_id, func.count(Vote.id))
+                .filter(Vote.choice_id.in_(choice_ids))
+                .group_by(Vote.choice_id)
+                .all()
+            )
+            vote_counts.update(count_ballot_votes(db, shard_db, poll_ids))
+    return vote_counts
+
+
+def _closed_poll_tallies(db: Session, closed_poll_ids: list[int]) -> dict:
+    """Результаты закрытых опросов из счетчиков журнала изменений"""
+    runoff_ids = {
+        poll_id for (poll_id,) in db.query(Poll.id).filter(
+            Poll.id.in_(closed_poll_ids),
+            Poll.voting_method == tally.INSTANT_RUNOFF
+        )
+    }
+    vote_counts = {}
+    for shard, poll_ids in group_by_shard(db, closed_poll_ids).items():
+        with shard_session(db, shard) as vote_db:
+            vote_counts.update(get_tallies(vote_db, poll_ids))
+            vote_counts.update(count_ballot_votes(
+                db, vote_db, [poll_id for poll_id in poll_ids if poll_id in runoff_ids]
+            ))
+    return vote_counts
+
+
+@traced
 async def create_poll(db: Session, poll_data: PollCreate, user_email: str):
     """Создание опроса с корректным creator_id"""
     logger.info(f"Creating new poll: {poll_data.title} by {user_email}")
@@ -53,35 +170,48 @@ async def create_poll(db: Session, poll_data: PollCreate, user_email: str):
         logger.error(f"User with email {user_email} not found")
         raise HTTPException(status_code=404, detail="User not found")
 
+    # Все методы, кроме plurality, принимают несколько вариантов в бюллетене
+    is_multiple_choice = (
+        poll_data.is_multiple_choice or poll_data.voting_method != tally.PLURALITY
+    )
+
     # Создаем новый опрос
     new_poll = Poll(
         title=poll_data.title,
         description=poll_data.description,
         creator_id=db_user.id,  # Теперь это реальный ID пользователя
-        is_multiple_choice=poll_data.is_multiple_choice,
+        is_multiple_choice=is_multiple_choice,
+        voting_method=poll_data.voting_method,
+        ballot_storage=use_ballot_storage(
+            is_multiple_choice, poll_data.voting_method
+        ),
         close_date=poll_data.close_date,
         is_closed=False,
         creation_date=datetime.now(timezone.utc)
     )
 
     db.add(new_poll)
-    db.commit()
-    db.refresh(new_poll)
+    db.flush()
 
-    # Добавляем варианты ответов
-    for choice_text in poll_data.choices:
-        new_choice = Choice(text=choice_text, poll_id=new_poll.id)
-        db.add(new_choice)
+    # Добавляем варианты ответов одним INSERT в той же транзакции
+    if poll_data.choices:
+        db.execute(insert(Choice), [
+            {"text": choice_text, "poll_id": new_poll.id}
+            for choice_text in poll_data.choices
+        ])
 
+    invalidation_bus.publish(db, POLLS_CHANNEL)
     db.commit()
 
     return {"id": new_poll.id, "title": new_poll.title, "choices": poll_data.choices}
 
 
+@traced
 async def vote_in_poll(
         db: Session, poll_id: int,
         choice_ids: list[int],
-        user_email: str
+        user_email: str,
+        weights: list[int] | None = None
 ):
     logger.info(
         f"User voting: email={user_email}, "
@@ -125,65 +255,273 @@ async def vote_in_poll(
             detail="Single-choice poll cannot have multiple selections"
         )
 
+    voting_method = poll.voting_method or tally.PLURALITY
+    if voting_method == tally.WEIGHTED and (
+        weights is None or len(weights) != len(choice_ids)
+    ):
+        logger.warning(f"Invalid weights for poll_id={poll_id}: {weights}")
+        raise HTTPException(
+            status_code=400,
+            detail="Weighted poll requires one weight per choice"
+        )
+
     user = db.query(User).filter(User.email == user_email).first()
     if not user:
         logger.error(f"User not found: email={user_email}")
         raise HTTPException(status_code=404, detail="User not found")
 
-    existing_votes = db.query(Vote).filter(
-        Vote.user_id == user.id,
-        Vote.choice_id.in_([c.id for c in poll.choices])
-    ).all()
-
-    if existing_votes:
-        logger.info(f"Removing existing votes for user_id={user.id}")
-        for vote in existing_votes:
-            db.delete(vote)
-
-    new_votes = [Vote(user_id=user.id, choice_id=choice_id) for choice_id in choice_ids]
-    db.add_all(new_votes)
-    db.commit()
+    with vote_session(db, poll_id) as vote_db:
+        if poll.ballot_storage:
+            ordered_choice_ids = sorted(choice.id for choice in poll.choices)
+            previous, selection = save_ballot(
+                vote_db, poll_id, user.id, choice_ids,
+                ordered_choice_ids, voting_method, weights
+            )
+            if change_log_enabled() and is_additive(voting_method):
+                record_changes(vote_db, poll_id, ballot_deltas(
+                    voting_method, ordered_choice_ids, previous, selection
+                ))
+            _commit_vote(db, vote_db, user_email)
+            logger.info(f"Ballot submitted successfully: user_id={user.id}")
+            return {"message": "Vote processed successfully"}
+
+        existing_votes = vote_db.query(Vote).filter(
+            Vote.user_id == user.id,
+            Vote.choice_id.in_([c.id for c in poll.choices])
+        ).all()
+
+        if existing_votes:
+            logger.info(f"Removing existing votes for user_id={user.id}")
+            for vote in existing_votes:
+                vote_db.delete(vote)
+
+        new_votes = [
+            Vote(user_id=user.id, choice_id=choice_id) for choice_id in choice_ids
+        ]
+        vote_db.add_all(new_votes)
+        if change_log_enabled():
+            deltas = Counter(choice_ids)
+            deltas.subtract(vote.choice_id for vote in existing_votes)
+            record_changes(vote_db, poll_id, deltas)
+        _commit_vote(db, vote_db, user_email)
 
     logger.info(f"Vote submitted successfully: user_id={user.id}")
     return {"message": "Vote processed successfully"}
 
 
+def _commit_vote(db: Session, vote_db: Session, user_email: str):
+    """Коммит голоса со сбросом кеша голосов пользователя во всех воркерах"""
+    invalidation_bus.publish(db, USER_VOTES_CHANNEL, user_email)
+    vote_db.commit()
+    if vote_db is not db:
+        db.commit()
+
+
+@traced
+async def get_user_votes(db: Session, user_email: str) -> dict[int, list[int]]:
+    """Выбор пользователя по опросам: {poll_id: [choice_id, ...]}.
+
+    В каждой базе голосов - по одному запросу к votes и ballots
+    по индексу user_id.
+    """
+    user_id = db.query(User.id).filter(User.email == user_email).scalar()
+    if user_id is None:
+        return {}
+
+    vote_choice_ids, ballots = [], []
+    for shard in range(shard_count() or 1):
+        with shard_session(db, shard) as vote_db:
+            vote_choice_ids += [
+                choice_id for (choice_id,) in vote_db.query(Vote.choice_id).filter(
+                    Vote.user_id == user_id
+                ).order_by(Vote.id)
+            ]
+            ballots += vote_db.query(Ballot.poll_id, Ballot.selection).filter(
+                Ballot.user_id == user_id
+            ).all()
+
+    ballot_poll_ids = [poll_id for poll_id, _ in ballots]
+    choices = db.query(Choice.id, Choice.poll_id).filter(
+        Choice.id.in_(vote_choice_ids) | Choice.poll_id.in_(ballot_poll_ids)
+    ).order_by(Choice.id).all()
+    poll_of = dict(choices)
+
+    user_votes = {}
+    for choice_id in vote_choice_ids:
+        if choice_id in poll_of:
+            user_votes.setdefault(poll_of[choice_id], []).append(choice_id)
+
+    if ballots:
+        methods = dict(
+            db.query(Poll.id, Poll.voting_method).filter(
+                Poll.id.in_(ballot_poll_ids)
+            )
+        )
+        ordered = {}
+        for choice_id, poll_id in choices:
+            ordered.setdefault(poll_id, []).append(choice_id)
+        for poll_id, selection in ballots:
+            poll_choices = ordered.get(poll_id, [])
+            user_votes[poll_id] = [
+                poll_choices[position] for position in ballot_positions(
+                    methods.get(poll_id) or tally.PLURALITY,
+                    selection,
+                    len(poll_choices)
+                )
+            ]
+    return user_votes
+
+
+@traced
+async def get_polls_details(db: Session, poll_ids: list[int]) -> list[dict]:
+    """Детали нескольких опросов: два запроса с IN вместо двух на опрос.
+
+    Опросы возвращаются в порядке poll_ids, несуществующие пропускаются;
+    для архивированных опросов берется снимок из archived_polls.
+    """
+    poll_ids = list(dict.fromkeys(poll_ids))
+    if not poll_ids:
+        return []
+    polls = {
+        poll.id: poll for poll in db.query(
+            Poll.id,
+            Poll.title,
+            Poll.description,
+            Poll.is_multiple_choice,
+            Poll.voting_method,
+            Poll.close_date,
+            Poll.is_closed
+        ).filter(Poll.id.in_(poll_ids))
+    }
+    choices = {}
+    if polls:
+        for choice_id, text, poll_id in db.query(
+            Choice.id, Choice.text, Choice.poll_id
+        ).filter(Choice.poll_id.in_(list(polls))).order_by(Choice.id):
+            choices.setdefault(poll_id, []).append({"id": choice_id, "text": text})
+
+    missing = [poll_id for poll_id in poll_ids if poll_id not in polls]
+    archived = {}
+    if missing:
+        archived = {
+            details["id"]: details
+            for details in _archived_snapshots(db, ArchivedPoll.details, missing)
+        }
+
+    details = {
+        poll.id: {
+            "id": poll.id,
+            "title": poll.title,
+            "description": poll.description,
+            "is_multiple_choice": poll.is_multiple_choice,
+            "voting_method": poll.voting_method or tally.PLURALITY,
+            "close_date": poll.close_date.isoformat() if poll.close_date else None,
+            "is_closed": poll.is_closed,
+            "choices": choices.get(poll.id, [])
+        }
+        for poll in polls.values()
+    }
+    details.update(archived)
+    return [details[poll_id] for poll_id in poll_ids if poll_id in details]
+
+
+@traced
 async def get_poll_details(db: Session, poll_id: int):
     logger.info(f"Fetching poll details: poll_id={poll_id}")
-    poll = db.query(Poll).filter(Poll.id == poll_id).first()
-    if not poll:
+    details = await get_polls_details(db, [poll_id])
+    if not details:
         logger.warning(f"Poll not found: poll_id={poll_id}")
         return None
-
-    choices = db.query(Choice).filter(Choice.poll_id == poll_id).all()
     logger.info(f"Poll details fetched successfully: poll_id={poll_id}")
+    return details[0]
+
+
+@traced
+async def get_poll_results(db: Session, poll_id: int):
+    """Итоги закрытого опроса по его методу голосования"""
+    logger.info(f"Fetching poll results: poll_id={poll_id}")
+    poll = db.query(
+        Poll.is_closed,
+        Poll.ballot_storage,
+        Poll.voting_method
+    ).filter(Poll.id == poll_id).first()
+    if not poll:
+        archived = _archived_snapshots(db, ArchivedPoll.results, [poll_id])
+        if archived:
+            return archived[0]
+        logger.warning(f"Poll not found: poll_id={poll_id}")
+        raise HTTPException(status_code=404, detail="Poll not found")
+    if not poll.is_closed:
+        raise HTTPException(
+            status_code=400,
+            detail="Results are available after the poll is closed"
+        )
+
+    voting_method = poll.voting_method or tally.PLURALITY
+    choice_ids = poll_choice_ids(db, poll_id)
+    texts = dict(
+        db.query(Choice.id, Choice.text).filter(Choice.poll_id == poll_id).all()
+    )
+    with vote_session(db, poll_id) as vote_db:
+        if poll.ballot_storage:
+            selections = [
+                selection for (selection,) in
+                vote_db.query(Ballot.selection).filter(Ballot.poll_id == poll_id)
+            ]
+            result = tally_ballots(voting_method, selections, len(choice_ids))
+        else:
+            import numpy as np
+
+            counts = dict(
+                vote_db.query(Vote.choice_id, func.count(Vote.id))
+                .filter(Vote.choice_id.in_(choice_ids))
+                .group_by(Vote.choice_id)
+                .all()
+            )
+            scores = np.array(
+                [counts.get(choice_id, 0) for choice_id in choice_ids],
+                dtype=np.int64
+            )
+            result = {"scores": scores, "rounds": [], "winner": tally.leader(scores)}
+
+    winner = result["winner"]
+    return {
+        "poll_id": poll_id,
+        "voting_method": voting_method,
+        "results": _scores_by_text(choice_ids, texts, result["scores"]),
+        "winner": texts[choice_ids[winner]] if winner is not None else None,
+        "rounds": [
+            _scores_by_text(choice_ids, texts, counts) for counts in result["rounds"]
+        ]
+    }
+
+
+def _scores_by_text(choice_ids: list[int], texts: dict, scores) -> dict:
     return {
-        "id": poll.id,
-        "title": poll.title,
-        "description": poll.description,
-        "is_multiple_choice": poll.is_multiple_choice,
-        "close_date": poll.close_date.isoformat() if poll.close_date else None,
-        "is_closed": poll.is_closed,
-        "choices": [{"id": choice.id, "text": choice.text} for choice in choices]
+        texts[choice_id]: int(score)
+        for choice_id, score in zip(choice_ids, scores)
     }
 
 
+@traced
 async def close_poll(
         db: Session, poll_id: int,
         user_email: str,
         new_close_date: str = None
 ):
     logger.info(f"Closing poll: poll_id={poll_id} by user_email={user_email}")
-    poll = db.query(Poll).filter(Poll.id == poll_id).first()
-    if not poll:
+    row = db.query(Poll, User.email).outerjoin(
+        User, User.id == Poll.creator_id
+    ).filter(Poll.id == poll_id).first()
+    if not row:
         logger.error(f"Poll not found: poll_id={poll_id}")
         raise HTTPException(
             status_code=404,
             detail="Poll not found"
         )
 
-    print(poll.creator.email)
-    if poll.creator.email != user_email:
+    poll, creator_email = row
+    if creator_email != user_email:
         logger.warning(f"Unauthorized poll close attempt: poll_id={poll_id}")
         raise HTTPException(
             status_code=403,
@@ -210,6 +548,9 @@ async def close_poll(
             )
 
     poll.is_closed = True
+    poll.closed_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    invalidation_bus.publish(db, POLLS_CHANNEL)
+    invalidation_bus.publish(db, SNAPSHOTS_CHANNEL, poll_id)
     db.commit()
     db.refresh(poll)
 
@@ -0,0 +1,104 @@
+"""Подсчет результатов опросов на массивах NumPy.
+
+Бюллетени передаются матрицами (ballots x choices):
+    * битовые - 0/1 за каждый вариант (approval, множественный выбор);
+    * ранжированные - позиции вариантов по убыванию предпочтения,
+      хвост заполнен значением n_choices;
+    * взвешенные - вес каждого варианта.
+
+NumPy импортируется внутри функций, чтобы импорт приложения его не загружал.
+"""
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+PLURALITY = "plurality"
+APPROVAL = "approval"
+INSTANT_RUNOFF = "irv"
+BORDA = "borda"
+WEIGHTED = "weighted"
+
+VOTING_METHODS = (PLURALITY, APPROVAL, INSTANT_RUNOFF, BORDA, WEIGHTED)
+RANKED_METHODS = (INSTANT_RUNOFF, BORDA)
+
+
+def approval(bits: "np.ndarray") -> "np.ndarray":
+    """Число отметок каждого варианта"""
+    import numpy as np
+    return bits.sum(axis=0, dtype=np.int64)
+
+
+def weighted(weights: "np.ndarray") -> "np.ndarray":
+    """Сумма весов каждого варианта"""
+    import numpy as np
+    return weights.sum(axis=0, dtype=np.int64)
+
+
+def borda(rankings: "np.ndarray", n_choices: int) -> "np.ndarray":
+    """Очки Борда: n - 1 за первое место, 0 за последнее и неранжированные"""
+    import numpy as np
+    points = np.broadcast_to(
+        n_choices - 1 - np.arange(rankings.shape[1]), rankings.shape
+    )
+    ranked = rankings < n_choices
+    return np.bincount(
+        rankings[ranked], weights=points[ranked], minlength=n_choices
+    ).astype(np.int64)
+
+
+def instant_runoff(rankings: "np.ndarray", n_choices: int):
+    """Мгновенный второй тур (IRV) с инкрементальным пересчетом.
+
+    В каждом раунде выбывает вариант с наименьшим числом голосов (при
+    равенстве - с меньшей позицией), и пересчитываются только бюллетени,
+    отданные за него. Возвращает (счет по раундам, позиция победителя).
+    """
+    import numpy as np
+    n_ballots = len(rankings)
+    exhausted = n_choices
+    ranks = np.concatenate(
+        [rankings, np.full((n_ballots, 1), exhausted, dtype=rankings.dtype)], axis=1
+    )
+    active = np.ones(n_choices + 1, dtype=bool)
+    active[exhausted] = False
+    pointer = np.zeros(n_ballots, dtype=np.intp)
+    current = ranks[:, 0].astype(np.intp)
+    counts = np.bincount(current, minlength=n_choices + 1)[:n_choices]
+    rounds = [counts.copy()]
+
+    while True:
+        remaining = np.flatnonzero(active[:n_choices])
+        total = counts.sum()
+        if not total or not remaining.size:
+            return rounds, None
+        leader = remaining[np.argmax(counts[remaining])]
+        if counts[leader] * 2 > total or remaining.size == 1:
+            return rounds, int(leader)
+
+        loser = remaining[np.argmin(counts[remaining])]
+        active[loser] = False
+        transferred = np.flatnonzero(current == loser)
+        pending = transferred
+        while pending.size:
+            pointer[pending] += 1
+            current[pending] = ranks[pending, pointer[pending]]
+            next_choice = current[pending]
+            pending = pending[~active[next_choice] & (next_choice != exhausted)]
+
+        counts = counts + np.bincount(
+            current[transferred], minlength=n_choices + 1
+        )[:n_choices]
+        counts[loser] = 0
+        rounds.append(counts.copy())
+
+
+def leader(scores: "np.ndarray"):
+    """Позиция варианта с единственным наибольшим положительным счетом"""
+    import numpy as np
+    if not scores.size:
+        return None
+    best = scores.max()
+    if best <= 0 or np.count_nonzero(scores == best) > 1:
+        return None
+    return int(np.argmax(scores))
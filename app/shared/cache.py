@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import get_settings
+from app.shared.coordination import invalidation_bus
+
+POLLS_CHANNEL = "polls"
+USER_VOTES_CHANNEL = "user_votes"
+SNAPSHOTS_CHANNEL = "snapshots"
+ARCHIVE_CHANNEL = "archive"
+
+
+class TTLCache:
+    """Кеш процесса воркера, сбрасываемый событиями InvalidationBus"""
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self._entries = {}
+        invalidation_bus.subscribe(channel, self.clear)
+        invalidation_bus.subscribe_keyed(channel, self.discard)
+
+    def get(self, key, ttl: float):
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > ttl:
+            return None
+        return entry[1]
+
+    def set(self, key, value):
+        self._entries[key] = (time.monotonic(), value)
+
+    def discard(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def get_or_load(self, key, loader):
+        ttl = get_settings().CACHE_TTL_SECONDS
+        if ttl <= 0:
+            return await loader()
+        value = self.get(key, ttl)
+        if value is None:
+            value = await loader()
+            self.set(key, value)
+        return value
+
+
+class SnapshotCache:
+    """LRU неизменяемых ответов без срока жизни.
+
+    Запись сбрасывается только событием канала: с ключом - одна запись,
+    без ключа - весь кеш.
+    """
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        invalidation_bus.subscribe(channel, self.clear)
+        invalidation_bus.subscribe_keyed(channel, self.discard)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(str(key))
+            if value is not None:
+                self._entries.move_to_end(str(key))
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[str(key)] = value
+            self._entries.move_to_end(str(key))
+            while len(self._entries) > get_settings().SNAPSHOT_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(str(key), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+polls_cache = TTLCache(POLLS_CHANNEL)
+user_votes_cache = TTLCache(USER_VOTES_CHANNEL)
+closed_poll_snapshots = SnapshotCache(SNAPSHOTS_CHANNEL)
+archived_summaries = SnapshotCache(ARCHIVE_CHANNEL)
@@ -0,0 +1,184 @@
+"""Сжатие ответов gzip и brotli.
+
+CompressionMiddleware выбирает кодировку по Accept-Encoding (brotli - если
+установлен пакет brotli) и сжимает ответы не меньше порога. Потоковые
+ответы сжимаются по частям со сбросом буфера после каждой, чтобы клиент
+получал данные без задержки. Ответы, у которых уже есть Content-Encoding
+(предсжатые снимки), пропускаются без изменений.
+"""
+import gzip
+import zlib
+from dataclasses import dataclass, field
+
+from fastapi import Request, Response
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+
+from app.config import get_settings
+from app.shared.etag import compute_etag, if_none_match
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP = "gzip"
+BROTLI = "br"
+
+EXCLUDED_CONTENT_TYPES = (
+    "text/event-stream",
+    "application/gzip",
+    "application/zip",
+    "image/",
+    "video/",
+    "audio/"
+)
+
+
+def available_encodings() -> tuple:
+    return (BROTLI, GZIP) if brotli is not None else (GZIP,)
+
+
+def preferred_encoding(accept_encoding: str, encodings=None) -> str | None:
+    """Первая из поддерживаемых кодировок, принимаемых клиентом (q > 0)"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in encodings or available_encodings():
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    settings = get_settings()
+    if encoding == BROTLI:
+        return brotli.compress(body, quality=settings.BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.GZIP_COMPRESS_LEVEL, mtime=0)
+
+
+class _ExcludedTypesMixin:
+    async def send_with_compression(self, message):
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            await super().send_with_compression(message)
+            self.content_type_is_excluded = content_type.startswith(
+                EXCLUDED_CONTENT_TYPES
+            )
+            return
+        await super().send_with_compression(message)
+
+
+class _IdentityResponder(_ExcludedTypesMixin, IdentityResponder):
+    pass
+
+
+class _GZipResponder(_ExcludedTypesMixin, GZipResponder):
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if more_body:
+            self.gzip_file.write(body)
+            self.gzip_file.flush(zlib.Z_SYNC_FLUSH)
+            body = self.gzip_buffer.getvalue()
+            self.gzip_buffer.seek(0)
+            self.gzip_buffer.truncate()
+            return body
+        return super().apply_compression(body, more_body=False)
+
+
+class _BrotliResponder(_ExcludedTypesMixin, IdentityResponder):
+    content_encoding = BROTLI
+
+    def __init__(self, app, minimum_size: int, quality: int):
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        compressed = self.compressor.process(body)
+        if more_body:
+            return compressed + self.compressor.flush()
+        return compressed + self.compressor.finish()
+
+
+class CompressionMiddleware:
+    """Сжатие ответов от COMPRESSION_MINIMUM_SIZE байт (0 - выключено)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        settings = get_settings()
+        if scope["type"] != "http" or settings.COMPRESSION_MINIMUM_SIZE <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        minimum_size = settings.COMPRESSION_MINIMUM_SIZE
+        encoding = preferred_encoding(
+            Headers(scope=scope).get("accept-encoding", "")
+        )
+        if encoding == BROTLI:
+            responder = _BrotliResponder(
+                self.app, minimum_size, settings.BROTLI_QUALITY
+            )
+        elif encoding == GZIP:
+            responder = _GZipResponder(
+                self.app, minimum_size, settings.GZIP_COMPRESS_LEVEL
+            )
+        else:
+            responder = _IdentityResponder(self.app, minimum_size)
+        await responder(scope, receive, send)
+
+
+@dataclass
+class Snapshot:
+    """Тело JSON-ответа с ETag и сжатыми вариантами.
+
+    Варианты сжимаются по требованию и запоминаются в снимке; заранее,
+    всеми доступными кодировками, сжимаются только снимки, которые
+    кладутся в кеш.
+    """
+    body: bytes
+    etag: str
+    encoded: dict = field(default_factory=dict)
+
+    @property
+    def compressible(self) -> bool:
+        return len(self.body) >= get_settings().COMPRESSION_MINIMUM_SIZE > 0
+
+    def encode(self, encoding: str) -> bytes:
+        body = self.encoded.get(encoding)
+        if body is None:
+            body = self.encoded[encoding] = compress(self.body, encoding)
+        return body
+
+
+def make_snapshot(body: bytes, precompress: bool = False) -> Snapshot:
+    snapshot = Snapshot(body=body, etag=compute_etag(body))
+    if precompress and snapshot.compressible:
+        for encoding in available_encodings():
+            snapshot.encode(encoding)
+    return snapshot
+
+
+def snapshot_response(request: Request, snapshot: Snapshot) -> Response:
+    """Ответ из снимка: 304 по ETag или вариант в согласованной кодировке"""
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if if_none_match(request, snapshot.etag):
+        return Response(status_code=304, headers=headers)
+
+    response = Response(snapshot.body, media_type="application/json", headers=headers)
+    if snapshot.compressible:
+        response.headers.add_vary_header("Accept-Encoding")
+        encoding = preferred_encoding(request.headers.get("accept-encoding", ""))
+        if encoding:
+            response.body = snapshot.encode(encoding)
+            response.headers["Content-Encoding"] = encoding
+            response.headers["Content-Length"] = str(len(response.body))
+    return response
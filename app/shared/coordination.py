@@ -0,0 +1,142 @@
+import logging
+import os
+import socket
+from collections import defaultdict
+from datetime import datetime, timedelta, UTC
+
+from sqlalchemy import event, func, insert, or_
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database.models import LeaderLease, CacheInvalidation
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def try_acquire_leadership(
+        db: Session, name: str,
+        lease_seconds: int,
+        owner: str = WORKER_ID
+) -> bool:
+    """Захват или продление аренды лидера через строку в таблице leader_leases"""
+    now = _utcnow()
+    expires_at = now + timedelta(seconds=lease_seconds)
+    updated = db.query(LeaderLease).filter(
+        LeaderLease.name == name,
+        or_(LeaderLease.owner == owner, LeaderLease.expires_at < now)
+    ).update(
+        {"owner": owner, "expires_at": expires_at},
+        synchronize_session=False
+    )
+    if updated:
+        db.commit()
+        return True
+
+    try:
+        with db.begin_nested():
+            db.add(LeaderLease(name=name, owner=owner, expires_at=expires_at))
+    except IntegrityError:
+        db.commit()
+        return False
+    db.commit()
+    logger.info(f"Leadership acquired: name={name}, owner={owner}")
+    return True
+
+
+def release_leadership(db: Session, name: str, owner: str = WORKER_ID):
+    db.query(LeaderLease).filter(
+        LeaderLease.name == name,
+        LeaderLease.owner == owner
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+class InvalidationBus:
+    """Межворкерная инвалидация кешей через таблицу cache_invalidations.
+
+    Локальные подписчики уведомляются сразу после коммита, остальные
+    воркеры получают событие при следующем вызове poll(). Событие с ключом
+    хранится как "channel:key" и сбрасывает только запись с этим ключом.
+    """
+
+    def __init__(self):
+        self._handlers = defaultdict(list)
+        self._keyed_handlers = defaultdict(list)
+        self._last_id = None
+
+    def subscribe(self, channel: str, handler):
+        self._handlers[channel].append(handler)
+
+    def subscribe_keyed(self, channel: str, handler):
+        """Подписка на события канала с ключом: handler(key)"""
+        self._keyed_handlers[channel].append(handler)
+
+    def publish(self, db: Session, channel: str, key=None):
+        """Отложенная публикация: событие уходит только после коммита сессии"""
+        if key is not None:
+            channel = f"{channel}:{key}"
+        db.info.setdefault("pending_invalidations", set()).add(channel)
+
+    def _dispatch(self, channel: str):
+        for handler in self._handlers.get(channel, []):
+            handler()
+        channel, _, key = channel.partition(":")
+        if key:
+            for handler in self._keyed_handlers.get(channel, []):
+                handler(key)
+
+    def _flush(self, session: Session):
+        channels = session.info.pop("pending_invalidations", None)
+        if not channels:
+            return
+        rows = [{"channel": channel, "created_at": _utcnow()} for channel in channels]
+        bind = session.get_bind()
+        if isinstance(bind, Connection):
+            bind.execute(insert(CacheInvalidation), rows)
+        else:
+            with bind.begin() as connection:
+                connection.execute(insert(CacheInvalidation), rows)
+        for channel in channels:
+            self._dispatch(channel)
+
+    def poll(self, db: Session) -> int:
+        """Применение событий, опубликованных другими воркерами"""
+        if self._last_id is None:
+            self._last_id = db.query(func.max(CacheInvalidation.id)).scalar() or 0
+            return 0
+
+        events = db.query(CacheInvalidation.id, CacheInvalidation.channel).filter(
+            CacheInvalidation.id > self._last_id
+        ).order_by(CacheInvalidation.id).all()
+        for event_id, channel in events:
+            self._last_id = event_id
+            self._dispatch(channel)
+        return len(events)
+
+    def prune(self, db: Session, max_age_seconds: int = 3600):
+        db.query(CacheInvalidation).filter(
+            CacheInvalidation.created_at < _utcnow() - timedelta(
+                seconds=max_age_seconds
+            )
+        ).delete(synchronize_session=False)
+        db.commit()
+
+
+invalidation_bus = InvalidationBus()
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_invalidations(session: Session):
+    invalidation_bus._flush(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_invalidations(session: Session):
+    session.info.pop("pending_invalidations", None)
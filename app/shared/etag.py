@@ -0,0 +1,26 @@
+"""Условные GET-запросы: ETag по содержимому ответа и ответ 304"""
+import hashlib
+
+from fastapi import Request, Response
+
+
+def compute_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """Совпадает ли ETag с заголовком If-None-Match запроса"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def etag_response(request: Request, body: bytes, etag: str = None) -> Response:
+    """JSON-ответ с ETag или 304, если клиент прислал тот же ETag"""
+    headers = {"ETag": etag or compute_etag(body), "Cache-Control": "no-cache"}
+    if if_none_match(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
@@ -1,14 +1,34 @@
 import logging
 from logging.handlers import RotatingFileHandler
 import os
+import re
 
 LOG_DIR = "logs"
 LOG_FILE = "sqr_voting_system.log"
 
-os.makedirs(LOG_DIR, exist_ok=True)
+_configured = False
+
+_QUERY_TOKEN = re.compile(r"([?&](?:token|refresh_token)=)[^&\s]*")
+
+
+class QueryTokenFilter(logging.Filter):
+    """Маскирует токены из строки запроса в access-логах uvicorn"""
+
+    def filter(self, record):
+        if isinstance(record.args, tuple):
+            record.args = tuple(
+                _QUERY_TOKEN.sub(r"\1***", arg) if isinstance(arg, str) else arg
+                for arg in record.args
+            )
+        return True
 
 
 def setup_logging():
+    global _configured
+    if _configured:
+        return
+    os.makedirs(LOG_DIR, exist_ok=True)
+
     log_formatter = logging.Formatter(
         "[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s"
     )
@@ -27,3 +47,5 @@ def setup_logging():
         level=logging.INFO,
         handlers=[file_handler, console_handler]
     )
+    logging.getLogger("uvicorn.access").addFilter(QueryTokenFilter())
+    _configured = True
@@ -0,0 +1,72 @@
+"""Версии токенов пользователей.
+
+Токены содержат token_version пользователя в поле "ver". Версии хранятся
+в памяти воркера (LRU на TOKEN_VERSION_CACHE_SIZE записей) и читаются из
+БД только при первом обращении к пользователю. Смена версии, роли,
+деактивация и удаление публикуют USERS_CHANNEL, после чего кеш
+сбрасывается во всех воркерах. Неизвестный email тоже кешируется, поэтому
+регистрация публикует USERS_CHANNEL с ключом - email нового пользователя.
+"""
+import threading
+from collections import OrderedDict
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database.models import User
+from app.shared.coordination import invalidation_bus
+
+USERS_CHANNEL = "users"
+
+_MISSING = object()
+
+
+class TokenVersionCache:
+    """email -> token_version; None для неактивного или неизвестного"""
+
+    def __init__(self):
+        self._versions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, email: str) -> int | None:
+        with self._lock:
+            version = self._versions.get(email, _MISSING)
+            if version is not _MISSING:
+                self._versions.move_to_end(email)
+                return version
+
+        row = db.query(User.token_version, User.is_active).filter(
+            User.email == email
+        ).first()
+        version = None
+        if row is not None and row.is_active is not False:
+            version = row.token_version or 0
+        with self._lock:
+            self._versions[email] = version
+            while len(self._versions) > get_settings().TOKEN_VERSION_CACHE_SIZE:
+                self._versions.popitem(last=False)
+        return version
+
+    def __len__(self):
+        return len(self._versions)
+
+    def discard(self, email: str):
+        with self._lock:
+            self._versions.pop(email, None)
+
+    def clear(self):
+        with self._lock:
+            self._versions.clear()
+
+
+token_versions = TokenVersionCache()
+invalidation_bus.subscribe(USERS_CHANNEL, token_versions.clear)
+invalidation_bus.subscribe_keyed(USERS_CHANNEL, token_versions.discard)
+
+
+def current_token_version(db: Session, payload: dict) -> int | None:
+    """Версия пользователя, если токен не отозван, иначе None"""
+    version = token_versions.get(db, payload.get("sub"))
+    if version is None or payload.get("ver", 0) != version:
+        return None
+    return version
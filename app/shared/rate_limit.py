@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import case, select
+
+from app.config import get_settings
+from app.database.models import RateLimitBucket
+from app.shared.security import get_current_user
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryRateLimitBackend:
+    """Token bucket в памяти процесса.
+
+    Полный бакет ничем не отличается от отсутствующего, поэтому, когда
+    число ключей вдвое превышает число ключей после прошлой чистки, полные
+    бакеты удаляются. Память ограничена ключами, активными за время
+    наполнения бакета.
+    """
+
+    MIN_PRUNE_SIZE = 1024
+
+    def __init__(self):
+        self._buckets = {}
+        self._prune_size = self.MIN_PRUNE_SIZE
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, capacity: float, now: float = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated_at, _ = self._buckets.get(key, (capacity, now, now))
+            tokens, allowed, retry_after = _refill_and_take(
+                tokens, updated_at, rate, capacity, now
+            )
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            if len(self._buckets) > self._prune_size:
+                self._prune(now)
+        return allowed, retry_after
+
+    def _prune(self, now: float):
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items() if bucket[2] > now
+        }
+        self._prune_size = max(self.MIN_PRUNE_SIZE, 2 * len(self._buckets))
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class DatabaseRateLimitBackend:
+    """Token bucket в таблице rate_limit_buckets, общий для всех воркеров.
+
+    Списание токена - один атомарный INSERT ... ON CONFLICT DO UPDATE с
+    условием "после пополнения есть токен": SQLite не поддерживает SELECT
+    FOR UPDATE, а первый запрос по ключу из двух воркеров иначе мог бы
+    закончиться конфликтом вставки. Поддерживаются SQLite и PostgreSQL.
+    """
+
+    def __init__(self, engine=None):
+        self._engine = engine
+
+    def _get_engine(self):
+        from app.database.session import get_engine
+
+        return self._engine or get_engine()
+
+    def take(self, key: str, rate: float, capacity: float, now: float = None):
+        now = time.time() if now is None else now
+        table = RateLimitBucket.__table__
+        engine = self._get_engine()
+        if engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        elapsed = case(
+            (table.c.updated_at < now, now - table.c.updated_at), else_=0.0
+        )
+        refill = table.c.tokens + elapsed * rate
+        refilled = case((refill < capacity, refill), else_=capacity)
+        statement = insert(table).values(
+            key=key, tokens=capacity - 1, updated_at=now
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={"tokens": refilled - 1, "updated_at": now},
+            where=refilled >= 1
+        ).returning(table.c.tokens)
+        with engine.begin() as connection:
+            if connection.execute(statement).first() is not None:
+                return True, 0.0
+            row = connection.execute(
+                select(table.c.tokens, table.c.updated_at).where(table.c.key == key)
+            ).first()
+        _, _, retry_after = _refill_and_take(*row, rate, capacity, now)
+        return False, retry_after
+
+    def reset(self):
+        with self._get_engine().begin() as connection:
+            connection.execute(RateLimitBucket.__table__.delete())
+
+
+def _refill_and_take(tokens, updated_at, rate, capacity, now):
+    tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate)
+    if tokens >= 1:
+        return tokens - 1, True, 0.0
+    return tokens, False, (1 - tokens) / rate
+
+
+_backends = {
+    "memory": InMemoryRateLimitBackend,
+    "database": DatabaseRateLimitBackend,
+}
+_backend = None
+
+
+def get_rate_limit_backend():
+    global _backend
+    if _backend is None:
+        _backend = _backends[get_settings().RATE_LIMIT_BACKEND]()
+    return _backend
+
+
+def set_rate_limit_backend(backend):
+    global _backend
+    _backend = backend
+
+
+def _enforce(scope: str, identity: str, limit_setting: str):
+    per_minute = getattr(get_settings(), limit_setting)
+    if per_minute <= 0:
+        return
+    allowed, retry_after = get_rate_limit_backend().take(
+        f"{scope}:{identity}", rate=per_minute / 60, capacity=per_minute
+    )
+    if not allowed:
+        logger.warning(f"Rate limit exceeded: scope={scope}, key={identity}")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+
+async def _login_identity(request: Request) -> str:
+    """email из JSON-тела запроса (тело уже прочитано и закешировано FastAPI)"""
+    try:
+        body = await request.json()
+    except ValueError:
+        return ""
+    email = body.get("email") if isinstance(body, dict) else None
+    return email.strip().lower() if isinstance(email, str) else ""
+
+
+def limit_by_client(
+        scope: str, limit_setting: str, email_limit_setting: str = None
+):
+    """Ограничение частоты запросов по IP клиента.
+
+    Фронтенд обращается к API со своего сервера, и у всех его
+    пользователей один IP, поэтому лимит по IP задается с запасом. С
+    email_limit_setting действует и более строгий лимит на пару IP и email
+    из тела запроса: перебор одного email упирается в него, а перебор
+    разных email с одного адреса - в общий лимит IP.
+    """
+    async def dependency(request: Request):
+        client = request.client.host if request.client else "unknown"
+        _enforce(scope, client, limit_setting)
+        if email_limit_setting:
+            identity = f"{client}:{await _login_identity(request)}"
+            _enforce(f"{scope}:email", identity, email_limit_setting)
+    return dependency
+
+
+def limit_by_user(scope: str, limit_setting: str):
+    """Ограничение частоты запросов по пользователю из токена"""
+    async def dependency(user=Depends(get_current_user)):
+        _enforce(scope, user["email"], limit_setting)
+    return dependency
+
+
+class ConcurrencyLimitMiddleware:
+    """Глобальный лимит одновременных запросов с ограниченной очередью"""
+
+    def __init__(self, app):
+        self.app = app
+        self._semaphore = None
+        self._waiting = 0
+
+    async def __call__(self, scope, receive, send):
+        settings = get_settings()
+        if scope["type"] != "http" or settings.MAX_CONCURRENT_REQUESTS <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_REQUESTS)
+
+        if self._semaphore.locked():
+            if self._waiting >= settings.MAX_QUEUED_REQUESTS:
+                await self._reject(scope, receive, send)
+                return
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(
+                    self._semaphore.acquire(),
+                    timeout=settings.QUEUE_TIMEOUT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                await self._reject(scope, receive, send)
+                return
+            finally:
+                self._waiting -= 1
+        else:
+            await self._semaphore.acquire()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._semaphore.release()
+
+    async def _reject(self, scope, receive, send):
+        logger.warning(f"Request shed under load: path={scope['path']}")
+        response = ORJSONResponse(
+            {"detail": "Server is overloaded"},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": "1"}
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,225 @@
+"""Сэмплирующий профилировщик CPU для диагностики работающего воркера.
+
+Отдельный поток каждые PROFILER_INTERVAL_MS снимает стеки всех потоков
+процесса через sys._current_frames(): цикла событий, пула потоков
+(bcrypt, синхронные обработчики) и фоновых задач. Одинаковые стеки
+сворачиваются в счетчики, результат отдается в формате collapsed stacks
+(flamegraph.pl, speedscope) или в JSON-формате speedscope.
+
+Стеки простаивающих потоков (ожидание в selectors и threading.wait)
+по умолчанию отбрасываются. Одновременно работает только один сеанс
+профилирования на воркер.
+"""
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import get_settings
+from app.database.session import get_session_factory
+from app.modules.auth.services import REFRESH_TOKEN_TYPE, decode_access_token
+from app.shared.principals import current_token_version
+
+COLLAPSED = "collapsed"
+SPEEDSCOPE = "speedscope"
+FORMATS = (COLLAPSED, SPEEDSCOPE)
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+_THREAD_NUMBER = re.compile(r"[-_]\d+")
+_SITE_PACKAGES = f"site-packages{os.sep}"
+
+_session_lock = threading.Lock()
+_recent_profiles = OrderedDict()
+
+
+def _frame_label(code) -> tuple:
+    filename = code.co_filename
+    if _SITE_PACKAGES in filename:
+        filename = filename.split(_SITE_PACKAGES, 1)[1]
+    elif filename.startswith(os.getcwd()):
+        filename = os.path.relpath(filename)
+    return code.co_qualname, filename, code.co_firstlineno
+
+
+def _is_idle(frame) -> bool:
+    filename = frame.f_code.co_filename
+    return filename.endswith("selectors.py") or (
+        filename.endswith("threading.py") and frame.f_code.co_name == "wait"
+    )
+
+
+class StackSampler:
+    """Сбор свернутых стеков всех потоков, кроме собственного"""
+
+    def __init__(self, interval_ms: float = None, include_idle: bool = False):
+        self.interval_ms = interval_ms or get_settings().PROFILER_INTERVAL_MS
+        self.include_idle = include_idle
+        self.counts = Counter()
+        self.samples = 0
+        self.duration_ms = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._started_at = None
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration_ms = (time.perf_counter() - self._started_at) * 1000
+
+    def _run(self):
+        interval = self.interval_ms / 1000
+        while not self._stop.wait(interval):
+            self.sample()
+
+    def sample(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        self.samples += 1
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (not self.include_idle and _is_idle(frame)):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            thread = _THREAD_NUMBER.sub("", names.get(ident, str(ident)))
+            self.counts[thread, tuple(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """Строки "поток;функция;...;функция количество" """
+        lines = []
+        for (thread, stack), count in self.counts.most_common():
+            frames = ";".join(f"{name} ({filename})" for name, filename, _ in stack)
+            lines.append(f"{thread};{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str = "voting") -> dict:
+        """Профиль в формате speedscope: по одному sampled-профилю на поток"""
+        frames, frame_index, profiles = [], {}, {}
+        for (thread, stack), count in self.counts.items():
+            indexes = []
+            for label in stack:
+                if label not in frame_index:
+                    frame_index[label] = len(frames)
+                    frames.append(
+                        {"name": label[0], "file": label[1], "line": label[2]}
+                    )
+                indexes.append(frame_index[label])
+            profile = profiles.setdefault(thread, {
+                "type": "sampled",
+                "name": thread,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(self.duration_ms, 3),
+                "samples": [],
+                "weights": []
+            })
+            profile["samples"].append(indexes)
+            profile["weights"].append(count * self.interval_ms)
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "voting",
+            "shared": {"frames": frames},
+            "profiles": list(profiles.values())
+        }
+
+    def render(self, output_format: str):
+        if output_format == SPEEDSCOPE:
+            return self.speedscope()
+        return self.collapsed()
+
+
+def acquire_session() -> bool:
+    """Захват единственного сеанса профилирования воркера"""
+    return _session_lock.acquire(blocking=False)
+
+
+def release_session():
+    _session_lock.release()
+
+
+def store_profile(profile_id: str, sampler: StackSampler):
+    """Сохранение завершенного профиля (PROFILER_HISTORY_SIZE последних)"""
+    _recent_profiles[profile_id] = sampler
+    while len(_recent_profiles) > get_settings().PROFILER_HISTORY_SIZE:
+        _recent_profiles.popitem(last=False)
+
+
+def get_profile(profile_id: str) -> StackSampler | None:
+    return _recent_profiles.get(profile_id)
+
+
+def _is_admin_request(headers: Headers) -> bool:
+    """Действующий токен администратора: роль и версия, как в get_current_user"""
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    payload = decode_access_token(token)
+    if (
+        not payload
+        or payload.get("typ") == REFRESH_TOKEN_TYPE
+        or payload.get("role") != "admin"
+    ):
+        return False
+    db = get_session_factory()()
+    try:
+        return current_token_version(db, payload) is not None
+    finally:
+        db.close()
+
+
+class RequestProfilingMiddleware:
+    """Профилирование отдельных запросов по заголовку X-Profile: 1.
+
+    Работает при PROFILE_REQUESTS=true и только для запросов с неотозванным
+    токеном администратора. Сэмплер снимает стеки всего процесса на время
+    обработки запроса; в ответ добавляется X-Profile-Id, по которому
+    профиль забирается через GET /admin/profiles/{profile_id}. Если
+    воркер уже профилируется, запрос обрабатывается без профиля.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not get_settings().PROFILE_REQUESTS:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if headers.get(PROFILE_HEADER) != "1" or not _is_admin_request(headers):
+            await self.app(scope, receive, send)
+            return
+        if not acquire_session():
+            await self.app(scope, receive, send)
+            return
+
+        sampler = StackSampler()
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[PROFILE_ID_HEADER] = profile_id
+            await send(message)
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stop()
+            release_session()
+            store_profile(profile_id, sampler)
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import time
+
+from app.config import get_settings
+from app.database.session import get_session_factory
+from app.modules.admin.services import check_and_close_polls
+from app.modules.auth.tokens import get_revoked_tokens, prune_refresh_tokens
+from app.modules.voting.archive import archive_closed_polls
+from app.modules.voting.changelog import change_log_enabled, compact_all, fold_all
+from app.shared.coordination import (
+    invalidation_bus,
+    try_acquire_leadership,
+    release_leadership
+)
+
+logger = logging.getLogger(__name__)
+
+EXPIRY_SWEEP_LEADER = "expiry-sweep"
+
+_is_leader = False
+
+
+def renew_leadership(db) -> bool:
+    """Захват или продление аренды лидера; результат запоминается воркером"""
+    global _is_leader
+    _is_leader = try_acquire_leadership(
+        db, EXPIRY_SWEEP_LEADER, get_settings().LEADER_LEASE_SECONDS
+    )
+    return _is_leader
+
+
+async def run_expiry_sweep_if_leader(db) -> bool:
+    """Закрытие просроченных опросов выполняет только воркер-лидер.
+
+    Аренда продлевается между этапами: если sweep затянулся и аренду
+    перехватил другой воркер, оставшиеся этапы пропускаются.
+    """
+    if not renew_leadership(db):
+        return False
+    settings = get_settings()
+    await check_and_close_polls(db)
+    if change_log_enabled() and renew_leadership(db):
+        compact_all(db)
+    if settings.ARCHIVE_AFTER_DAYS > 0:
+        await archive_closed_polls(
+            db,
+            limit=settings.ARCHIVE_POLLS_PER_SWEEP,
+            keep_going=lambda: renew_leadership(db)
+        )
+    if renew_leadership(db):
+        prune_refresh_tokens(db)
+        invalidation_bus.prune(db)
+    return True
+
+
+def run_background_tick(session_factory, sweep_due: bool):
+    """Одна итерация фонового цикла. Работа с БД синхронная, поэтому
+    итерация выполняется в отдельном потоке, а не в цикле событий воркера.
+    Лидер продлевает аренду на каждой итерации, а не только при sweep.
+    """
+    db = session_factory()
+    try:
+        invalidation_bus.poll(db)
+        if change_log_enabled():
+            fold_all(db)
+        if sweep_due:
+            get_revoked_tokens().prune()
+            asyncio.run(run_expiry_sweep_if_leader(db))
+        elif _is_leader:
+            renew_leadership(db)
+    except Exception:
+        logger.exception("Background job iteration failed")
+        db.rollback()
+    finally:
+        db.close()
+
+
+async def run_background_jobs():
+    """Фоновый цикл воркера: опрос шины инвалидации и периодический sweep"""
+    global _is_leader
+    settings = get_settings()
+    poll_interval = settings.INVALIDATION_POLL_SECONDS
+    sweep_interval = settings.EXPIRY_SWEEP_INTERVAL_SECONDS
+    next_sweep = time.monotonic()
+    session_factory = get_session_factory()
+    try:
+        while True:
+            sweep_due = sweep_interval > 0 and time.monotonic() >= next_sweep
+            await asyncio.to_thread(run_background_tick, session_factory, sweep_due)
+            if sweep_due:
+                next_sweep = time.monotonic() + sweep_interval
+            await asyncio.sleep(poll_interval)
+    finally:
+        _is_leader = False
+        db = session_factory()
+        try:
+            release_leadership(db, EXPIRY_SWEEP_LEADER)
+        except Exception:
+            logger.exception("Failed to release scheduler leadership")
+        finally:
+            db.close()
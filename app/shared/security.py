@@ -1,33 +1,61 @@
-from fastapi import Depends, HTTPException, status
-from app.modules.admin.schemas import TokenParam
-from app.modules.auth.services import decode_access_token
+from fastapi import Depends, HTTPException, Query, Request, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
+from app.database.session import get_db
+from app.modules.auth.services import REFRESH_TOKEN_TYPE, decode_access_token
+from app.shared.principals import current_token_version
 
-async def get_current_user(token_param: TokenParam = Depends()):
-    """Проверка JWT-токена из параметра запроса"""
-    token = token_param.token
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+
+
+async def get_current_user(
+        request: Request,
+        credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+        token: str | None = Query(
+            None,
+            deprecated=True,
+            description="Устаревший способ передачи токена, "
+                        "используйте заголовок Authorization"
+        ),
+        db=Depends(get_db)
+):
+    """Проверка JWT-токена и его версии.
+
+    Токен берется из заголовка Authorization: Bearer, параметр запроса
+    token оставлен для старых клиентов. Токен разбирается один раз за
+    запрос: результат сохраняется в request.state.principal.
+    """
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal
+
+    token = credentials.credentials if credentials else token
     if not token:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token is missing"
-        )
+        raise _unauthorized("Token is missing")
 
     payload = decode_access_token(token)
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token"
-        )
+    if not payload or payload.get("typ") == REFRESH_TOKEN_TYPE:
+        raise _unauthorized("Invalid token")
 
     email = payload.get("sub")
     role = payload.get("role")
     if not email or not role:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token"
-        )
+        raise _unauthorized("Invalid token")
+
+    if current_token_version(db, payload) is None:
+        raise _unauthorized("Token has been revoked")
 
-    return {"email": email, "role": role}
+    principal = {"email": email, "role": role}
+    request.state.principal = principal
+    return principal
 
 
 async def get_current_admin(user=Depends(get_current_user)):
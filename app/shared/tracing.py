@@ -0,0 +1,355 @@
+"""Трассировка запросов в модели OpenTelemetry без внешних зависимостей.
+
+Включается настройкой TRACING. Спаны создаются для каждого HTTP-запроса
+(TracingMiddleware), обработчика маршрута (instrument_routes), функции
+сервиса (декоратор traced), SQL-запроса (события Engine) и операций
+bcrypt/JWT. Родитель определяется через contextvars, поэтому вложенность
+сохраняется и в цикле событий, и в пуле потоков.
+
+Контекст принимается и возвращается в заголовке W3C traceparent, так что
+запросы фронтенда и спаны бэкенда попадают в одну трассу. Завершенные
+спаны в формате OTLP/JSON отдаются экспортерам из TRACE_EXPORTERS:
+memory (кольцевой буфер, GET /admin/traces) и file (NDJSON в TRACE_FILE).
+"""
+import functools
+import inspect
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import NamedTuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import get_settings
+
+TRACEPARENT = "traceparent"
+SERVICE_NAME = "voting"
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+_current_span = ContextVar("current_span", default=None)
+
+
+class SpanContext(NamedTuple):
+    trace_id: str
+    span_id: str
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None = None
+    kind: int = SPAN_KIND_INTERNAL
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    attributes: dict = field(default_factory=dict)
+    status: int = STATUS_UNSET
+    status_message: str = ""
+
+    @property
+    def context(self) -> SpanContext:
+        return SpanContext(self.trace_id, self.span_id)
+
+    def record_exception(self, exc: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = str(exc)
+        self.attributes["exception.type"] = type(exc).__name__
+
+    def to_otlp(self) -> dict:
+        """Спан в JSON-представлении OTLP"""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": self.status, "message": self.status_message}
+        }
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def parse_traceparent(header: str | None) -> SpanContext | None:
+    match = _TRACEPARENT.match(header or "")
+    if not match or set(match.group(1)) == {"0"} or set(match.group(2)) == {"0"}:
+        return None
+    return SpanContext(match.group(1), match.group(2))
+
+
+def format_traceparent(context: SpanContext) -> str:
+    return f"00-{context.trace_id}-{context.span_id}-01"
+
+
+class MemoryExporter:
+    """Последние TRACE_BUFFER_SIZE спанов воркера"""
+
+    def __init__(self, size: int):
+        self._spans = deque(maxlen=size)
+
+    def export(self, span: Span):
+        self._spans.append(span)
+
+    def spans(self, trace_id: str = None) -> list[Span]:
+        return [
+            span for span in list(self._spans)
+            if trace_id is None or span.trace_id == trace_id
+        ]
+
+    def clear(self):
+        self._spans.clear()
+
+
+class FileExporter:
+    """Спаны в NDJSON-файл; запись пачкой по завершении корневого спана"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            self._pending.append(span)
+            if span.parent_id is not None and len(self._pending) < 1000:
+                return
+            pending, self._pending = self._pending, []
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as file:
+            for pending_span in pending:
+                file.write(json.dumps(pending_span.to_otlp()) + "\n")
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.exporters = []
+        self.memory = None
+
+    def enable(self, settings=None):
+        settings = settings or get_settings()
+        self.exporters = []
+        self.memory = None
+        for name in settings.TRACE_EXPORTERS:
+            if name == "memory":
+                self.memory = MemoryExporter(settings.TRACE_BUFFER_SIZE)
+                self.exporters.append(self.memory)
+            elif name == "file":
+                self.exporters.append(FileExporter(settings.TRACE_FILE))
+            else:
+                raise ValueError(f"Unknown trace exporter: {name}")
+        if not self.enabled:
+            event.listen(Engine, "before_cursor_execute", _before_execute)
+            event.listen(Engine, "after_cursor_execute", _after_execute)
+            event.listen(Engine, "handle_error", _on_error)
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        event.remove(Engine, "before_cursor_execute", _before_execute)
+        event.remove(Engine, "after_cursor_execute", _after_execute)
+        event.remove(Engine, "handle_error", _on_error)
+        self.enabled = False
+
+    def begin(
+            self,
+            name: str,
+            kind: int = SPAN_KIND_INTERNAL,
+            parent: SpanContext = None,
+            attributes: dict = None
+    ) -> Span:
+        """Новый спан, дочерний к parent или к текущему спану контекста"""
+        if parent is None:
+            current = _current_span.get()
+            parent = current.context if current is not None else None
+        return Span(
+            name=name,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            kind=kind,
+            attributes=attributes or {}
+        )
+
+    def end(self, span: Span):
+        span.end_ns = time.time_ns()
+        for exporter in self.exporters:
+            exporter.export(span)
+
+    @contextmanager
+    def start_span(self, name: str, **kwargs):
+        """Спан на время блока; внутри он становится текущим"""
+        if not self.enabled:
+            yield None
+            return
+        span = self.begin(name, **kwargs)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end(span)
+
+
+tracer = Tracer()
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def traced(name=None):
+    """Декоратор: спан на каждый вызов функции (синхронной или async).
+
+    Без аргументов имя спана - модуль без префикса app.modules и имя
+    функции, например voting.services.vote_in_poll.
+    """
+    if callable(name):
+        return traced()(name)
+
+    def decorator(func):
+        span_name = name or (
+            f"{func.__module__.removeprefix('app.modules.')}.{func.__qualname__}"
+        )
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await func(*args, **kwargs)
+                with tracer.start_span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.start_span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def instrument_routes(application):
+    """Спаны для обработчиков всех маршрутов API.
+
+    FastAPI вызывает обработчик через route.dependant.call, поэтому
+    подменяется именно он; сигнатура уже разобрана при регистрации.
+    """
+    for route in application.routes:
+        if isinstance(route, APIRoute) and not hasattr(
+                route.dependant.call, "__wrapped__"
+        ):
+            route.dependant.call = traced(route.dependant.call)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_span.get() is None:
+        return
+    span = tracer.begin(
+        statement.split(None, 1)[0].upper() if statement.strip() else "SQL",
+        kind=SPAN_KIND_CLIENT,
+        attributes={
+            "db.system": conn.dialect.name,
+            "db.statement": statement,
+            "db.executemany": bool(executemany)
+        }
+    )
+    conn.info.setdefault("trace_spans", []).append(span)
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("trace_spans")
+    if spans:
+        tracer.end(spans.pop())
+
+
+def _on_error(exception_context):
+    conn = exception_context.connection
+    spans = conn.info.get("trace_spans") if conn is not None else None
+    if spans:
+        span = spans.pop()
+        span.record_exception(exception_context.original_exception)
+        tracer.end(span)
+
+
+class TracingMiddleware:
+    """Серверный спан на каждый HTTP-запрос с учетом входящего traceparent"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        parent = parse_traceparent(Headers(scope=scope).get(TRACEPARENT))
+        with tracer.start_span(
+                f"{method} {scope['path']}",
+                kind=SPAN_KIND_SERVER,
+                parent=parent,
+                attributes={
+                    "http.request.method": method,
+                    "url.path": scope["path"],
+                    "service.name": SERVICE_NAME
+                }
+        ) as span:
+            async def send_with_trace(message):
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    span.attributes["http.response.status_code"] = status_code
+                    if status_code >= 500:
+                        span.status = STATUS_ERROR
+                    MutableHeaders(scope=message)[TRACEPARENT] = format_traceparent(
+                        span.context
+                    )
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    span.name = f"{method} {route.path}"
+                    span.attributes["http.route"] = route.path
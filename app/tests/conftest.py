@@ -1,3 +1,7 @@
+import os
+import shutil
+import tempfile
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -5,17 +9,40 @@ from sqlalchemy.orm import sessionmaker, Session
 
 from app.main import app
 from app.database.base import Base
-from app.database.session import get_db
+from app.database.session import (
+    configure_sqlite_engine,
+    dispose_engine,
+    get_db,
+    get_engine
+)
 
 SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///./test.db"
 
+# Код, открывающий сессии сам (SessionLocal в тестах, фоновые задачи,
+# rate limit в базе), работает с временной базой, а не с закоммиченной
+# sqr_voting.db из DATABASE_URL. Настройки создаются лениво, поэтому
+# переменной окружения достаточно.
+APP_DATABASE_DIR = tempfile.mkdtemp(prefix="sqr_voting_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(APP_DATABASE_DIR, 'app.db')}"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def app_database():
+    """Схема во временной базе приложения (см. APP_DATABASE_DIR)"""
+    Base.metadata.create_all(bind=get_engine())
+    yield
+    dispose_engine()
+    shutil.rmtree(APP_DATABASE_DIR, ignore_errors=True)
+
 
 @pytest.fixture(scope="module")
 def engine():
-    return create_engine(
+    engine = create_engine(
         SQLALCHEMY_TEST_DATABASE_URL,
         connect_args={"check_same_thread": False}
     )
+    configure_sqlite_engine(engine)
+    return engine
 
 
 @pytest.fixture(scope="module")
@@ -0,0 +1,75 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.database.models import Choice, Poll, User
+from app.modules.auth.services import create_access_token
+
+
+@pytest.fixture
+def admin_token(db: Session):
+    db.add(User(email="admin@example.com", hashed_password="x", role="admin"))
+    db.commit()
+    return create_access_token({"sub": "admin@example.com", "role": "admin"})
+
+
+def test_bulk_import_ndjson(client: TestClient, db: Session, admin_token):
+    body = "\n".join(
+        f'{{"title": "Poll {i}", "choices": ["A", "B", "C"]}}' for i in range(5)
+    )
+    response = client.post(
+        "/admin/polls/bulk",
+        params={"token": admin_token},
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"created": 5}
+    assert db.query(Poll).count() == 5
+    assert db.query(Choice).count() == 15
+
+
+def test_bulk_import_csv(client: TestClient, db: Session, admin_token):
+    body = (
+        "title,description,choices,is_multiple_choice,close_date\n"
+        "Lunch,,Soup|Salad,true,2030-01-01T12:00:00\n"
+        '"Budget, 2031",Yearly,Yes|No,false,\n'
+    )
+    response = client.post(
+        "/admin/polls/bulk",
+        params={"token": admin_token},
+        content=body,
+        headers={"Content-Type": "text/csv"}
+    )
+
+    assert response.json() == {"created": 2}
+    lunch, budget = db.query(Poll).order_by(Poll.id).all()
+    assert lunch.is_multiple_choice is True
+    assert [choice.text for choice in lunch.choices] == ["Soup", "Salad"]
+    assert budget.title == "Budget, 2031"
+    assert budget.close_date is None
+
+
+def test_bulk_import_reports_invalid_line(client: TestClient, admin_token):
+    response = client.post(
+        "/admin/polls/bulk",
+        params={"token": admin_token},
+        content='{"title": "Ok", "choices": ["A"]}\n{"choices": ["A"]}\n',
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Line 2:")
+
+
+def test_bulk_import_rejects_invalid_utf8(client: TestClient, admin_token):
+    response = client.post(
+        "/admin/polls/bulk",
+        params={"token": admin_token},
+        content=b'{"title": "Ok", "choices": ["A"]}\n{"title": "\xff"}\n',
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Line 2: Invalid UTF-8"
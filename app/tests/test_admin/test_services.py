@@ -3,7 +3,7 @@ from unittest.mock import MagicMock
 from datetime import timedelta
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone
-from app.database.models import User, Poll, Choice
+from app.database.models import User, Poll, Choice, Vote
 from app.modules.admin.schemas import UserCreate, PollCreate, PollUpdate
 from app.modules.admin.services import (
     create_user,
@@ -13,6 +13,8 @@ from app.modules.admin.services import (
     delete_poll,
     delete_user,
     get_all_choices,
+    count_poll_votes,
+    purge_poll,
 )
 
 UTC = timezone.utc
@@ -83,17 +85,19 @@ async def test_create_poll_success(mock_db, poll_data):
     mock_db.commit.return_value = None
     mock_db.refresh.return_value = None
 
-    def refresh_mock(poll):
-        poll.id = 1
+    def flush_mock():
+        mock_db.add.call_args.args[0].id = 1
 
-    mock_db.refresh.side_effect = refresh_mock
+    mock_db.flush.side_effect = flush_mock
 
     result = await create_poll(mock_db, poll_data)
     assert result["id"] == 1
     assert result["title"] == poll_data.title
     assert len(result["choices"]) == 2
-    assert mock_db.add.call_count == 3
-    assert mock_db.commit.call_count == 2
+    assert mock_db.add.call_count == 1
+    assert mock_db.execute.call_count == 1
+    assert mock_db.commit.call_count == 1
+    mock_db.refresh.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -135,19 +139,30 @@ async def test_update_poll_not_found(mock_db, poll_update_data):
 
 
 @pytest.mark.asyncio
-async def test_check_and_close_polls(mock_db):
+async def test_check_and_close_polls(db: Session):
     now = datetime.now(timezone.utc)
-    open_poll = Poll(id=1, close_date=now - timedelta(hours=1), is_closed=False)
-    # closed_poll = Poll(id=2, close_date=now - timedelta(days=1), is_closed=True)
-    # future_poll = Poll(id=3, close_date=now + timedelta(days=1), is_closed=False)
-
-    mock_db.query.return_value.filter.return_value.all.return_value = [open_poll]
-
-    result = await check_and_close_polls(mock_db)
-
-    assert result["message"] == "1 polls have been closed."
-    assert open_poll.is_closed is True
-    mock_db.commit.assert_called_once()
+    user = User(email="sweep@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    expired = [
+        Poll(title=f"Expired {i}", creator_id=user.id,
+             close_date=now - timedelta(hours=1), is_closed=False)
+        for i in range(5)
+    ]
+    closed = Poll(title="Closed", creator_id=user.id,
+                  close_date=now - timedelta(days=1), is_closed=True)
+    future = Poll(title="Future", creator_id=user.id,
+                  close_date=now + timedelta(days=1), is_closed=False)
+    db.add_all([*expired, closed, future])
+    db.commit()
+
+    result = await check_and_close_polls(db, batch_size=2)
+
+    assert result["message"] == "5 polls have been closed."
+    assert sorted(result["closed_ids"]) == sorted(poll.id for poll in expired)
+    db.expire_all()
+    assert all(poll.is_closed for poll in expired)
+    assert future.is_closed is False
 
 
 @pytest.mark.asyncio
@@ -193,3 +208,57 @@ async def test_get_all_choices(mock_db):
     assert len(result) == 2
     assert result[0]["text"] == "Choice 1"
     assert result[1]["text"] == "Choice 2"
+
+
+def _poll_with_votes(db: Session, voters: int):
+    users = [
+        User(email=f"voter{i}@example.com", hashed_password="x")
+        for i in range(voters)
+    ]
+    db.add_all(users)
+    db.flush()
+    poll = Poll(title="Big Poll", creator_id=users[0].id)
+    poll.choices = [Choice(text="Yes"), Choice(text="No")]
+    db.add(poll)
+    db.flush()
+    db.add_all([
+        Vote(user_id=user.id, choice_id=poll.choices[i % 2].id)
+        for i, user in enumerate(users)
+    ])
+    db.commit()
+    return poll, users
+
+
+@pytest.mark.asyncio
+async def test_delete_poll_cascades_to_choices_and_votes(db: Session):
+    poll, _ = _poll_with_votes(db, voters=3)
+    db.expire_all()
+
+    await delete_poll(db, poll.id)
+
+    assert db.query(Choice).count() == 0
+    assert db.query(Vote).count() == 0
+
+
+@pytest.mark.asyncio
+async def test_delete_user_cascades_to_polls_and_votes(db: Session):
+    poll, users = _poll_with_votes(db, voters=2)
+    db.expire_all()
+
+    await delete_user(db, users[0].id)
+
+    assert db.query(Poll).count() == 0
+    assert db.query(Vote).count() == 0
+    assert db.query(User).count() == 1
+
+
+@pytest.mark.asyncio
+async def test_purge_poll_deletes_votes_in_batches(db: Session):
+    poll, _ = _poll_with_votes(db, voters=5)
+    assert await count_poll_votes(db, poll.id) == 5
+
+    assert purge_poll(db, poll.id, batch_size=2) == 5
+
+    assert db.query(Poll).count() == 0
+    assert db.query(Choice).count() == 0
+    assert db.query(Vote).count() == 0
@@ -0,0 +1,43 @@
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect
+
+from app.config import Settings, configure_settings, get_settings
+from app.database.session import get_engine
+from app.main import create_app
+
+
+@pytest.fixture
+def app_settings(tmp_path):
+    previous = get_settings()
+    settings = Settings(
+        DATABASE_URL=f"sqlite:///{tmp_path / 'factory.db'}",
+        SECRET_KEY="factory-secret",
+        ALGORITHM="HS256",
+        ACCESS_TOKEN_EXPIRE_MINUTES=30,
+        REFRESH_TOKEN_EXPIRE_DAYS=7
+    )
+    yield settings
+    configure_settings(previous)
+
+
+def test_create_app_runs_startup_once_in_lifespan(app_settings):
+    application = create_app(app_settings)
+    assert not hasattr(application.state, "startup_time_ms")
+
+    with TestClient(application) as client:
+        assert client.get("/").status_code == 200
+        assert application.state.startup_time_ms >= 0
+        assert str(get_engine().url) == app_settings.DATABASE_URL
+        assert "polls" in inspect(get_engine()).get_table_names()
+
+
+def test_importing_app_does_not_load_numpy():
+    code = "import sys, app.main; print('numpy' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "False"
@@ -117,34 +117,66 @@ def test_login_nonexistent_user(override_get_db):
 
 
 def test_token_refresh(test_user, override_get_db):
-    refresh_payload = {
+    login_response = client.post(
+        "/auth/login",
+        json={"email": test_user.email,
+              "password": test_user.raw_password}
+    )
+    refresh_token = login_response.json()["refresh_token"]
+
+    response = client.post(
+        "/auth/token/refresh",
+        json={"refresh_token": refresh_token}
+    )
+    assert response.status_code == 200
+    new_tokens = response.json()
+    assert "access_token" in new_tokens
+    assert "refresh_token" in new_tokens
+    assert new_tokens["token_type"] == "bearer"
+
+
+def test_token_refresh_accepts_deprecated_query_parameter(
+        test_user, override_get_db
+):
+    login_response = client.post(
+        "/auth/login",
+        json={"email": test_user.email,
+              "password": test_user.raw_password}
+    )
+    refresh_token = login_response.json()["refresh_token"]
+
+    response = client.post(
+        "/auth/token/refresh",
+        params={"refresh_token": refresh_token}
+    )
+    assert response.status_code == 200
+
+
+def test_token_refresh_rejects_access_token(test_user, override_get_db):
+    access_payload = {
         "sub": test_user.email,
         "role": test_user.role
     }
     expire = datetime.now() + timedelta(days=7)
-    refresh_payload.update({"exp": expire})
+    access_payload.update({"exp": expire})
 
-    refresh_token = jwt.encode(
-        refresh_payload,
+    access_token = jwt.encode(
+        access_payload,
         settings.SECRET_KEY,
         algorithm=settings.ALGORITHM
     )
 
     response = client.post(
         "/auth/token/refresh",
-        params={"refresh_token": refresh_token}
+        json={"refresh_token": access_token}
     )
-    assert response.status_code == 200
-    new_tokens = response.json()
-    assert "access_token" in new_tokens
-    assert "refresh_token" in new_tokens
-    assert new_tokens["token_type"] == "bearer"
+    assert response.status_code == 401
 
 
 def test_token_refresh_invalid(override_get_db):
     response = client.post(
         "/auth/token/refresh",
-        params={"refresh_token": "invalid.token.value"}
+        json={"refresh_token": "invalid.token.value"}
     )
     assert response.status_code == 401
     assert response.json()["detail"] == "Invalid refresh token"
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.database.models import RefreshToken, User
+from app.modules.auth import tokens
+from app.modules.auth.services import decode_refresh_token
+from app.shared.principals import token_versions
+
+
+@pytest.fixture
+def user(db: Session):
+    token_versions.clear()
+    user = User(email="rotation@example.com", hashed_password="x", role="user")
+    db.add(user)
+    db.commit()
+    yield user
+    token_versions.clear()
+
+
+def _refresh(client: TestClient, refresh_token: str):
+    return client.post(
+        "/auth/token/refresh", json={"refresh_token": refresh_token}
+    )
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = tokens.BloomFilter(1000, 0.01)
+    keys = [f"jti-{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 500
+
+
+def test_revoked_tokens_prune_expired():
+    revoked = tokens.RevokedTokens(capacity=100, error_rate=0.01)
+    now = datetime(2026, 1, 1)
+    revoked.add("old", now - timedelta(minutes=1))
+    revoked.add("fresh", now + timedelta(days=1))
+
+    assert revoked.prune(now) == 1
+    assert "old" not in revoked
+    assert "fresh" in revoked
+    assert len(revoked) == 1
+
+
+def test_refresh_rotates_token(client: TestClient, db: Session, user):
+    first = tokens.issue_refresh_token(db, user)
+    db.commit()
+
+    response = _refresh(client, first)
+    assert response.status_code == 200
+    second = response.json()["refresh_token"]
+
+    first_payload = decode_refresh_token(first)
+    second_payload = decode_refresh_token(second)
+    assert second_payload["fam"] == first_payload["fam"]
+    assert second_payload["jti"] != first_payload["jti"]
+    assert db.get(RefreshToken, first_payload["jti"]).revoked_at is not None
+    assert _refresh(client, second).status_code == 200
+
+
+def test_reused_token_revokes_family(client: TestClient, db: Session, user):
+    first = tokens.issue_refresh_token(db, user)
+    db.commit()
+    second = _refresh(client, first).json()["refresh_token"]
+
+    assert _refresh(client, first).status_code == 401
+    assert _refresh(client, second).status_code == 401
+
+    family = decode_refresh_token(first)["fam"]
+    assert db.query(RefreshToken).filter(
+        RefreshToken.family == family,
+        RefreshToken.revoked_at.is_(None)
+    ).count() == 0
+
+
+def test_logout_revokes_family(client: TestClient, db: Session, user):
+    refresh_token = tokens.issue_refresh_token(db, user)
+    db.commit()
+
+    response = client.post("/auth/logout", json={"refresh_token": refresh_token})
+    assert response.status_code == 200
+    assert _refresh(client, refresh_token).status_code == 401
+
+
+def test_refresh_token_is_not_an_access_token(client: TestClient, db: Session, user):
+    refresh_token = tokens.issue_refresh_token(db, user)
+    db.commit()
+
+    response = client.post(
+        "/polls/1/close", params={"token": refresh_token}
+    )
+    assert response.status_code == 401
@@ -0,0 +1,118 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database.models import Choice, Poll, User
+from app.shared.cache import SNAPSHOTS_CHANNEL, closed_poll_snapshots
+from app.shared.compression import (
+    CompressionMiddleware,
+    make_snapshot,
+    preferred_encoding,
+    snapshot_response
+)
+from app.shared.coordination import invalidation_bus
+
+GZIP_ONLY = {"Accept-Encoding": "gzip"}
+
+
+@pytest.fixture
+def small_threshold(monkeypatch):
+    monkeypatch.setattr(get_settings(), "COMPRESSION_MINIMUM_SIZE", 100)
+
+
+@pytest.fixture
+def compressed_client(small_threshold):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/large")
+    def large():
+        return {"items": list(range(1000))}
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(
+            (f"line {i}\n" * 50 for i in range(5)), media_type="text/plain"
+        )
+
+    return TestClient(app)
+
+
+def test_preferred_encoding():
+    assert preferred_encoding("gzip, deflate", ("br", "gzip")) == "gzip"
+    assert preferred_encoding("br;q=0, gzip;q=0.5", ("br", "gzip")) == "gzip"
+    assert preferred_encoding("*", ("br", "gzip")) == "br"
+    assert preferred_encoding("identity", ("gzip",)) is None
+    assert preferred_encoding("", ("gzip",)) is None
+
+
+def test_large_responses_are_compressed(compressed_client: TestClient):
+    response = compressed_client.get("/large", headers=GZIP_ONLY)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.json() == {"items": list(range(1000))}
+
+    response = compressed_client.get("/small", headers=GZIP_ONLY)
+    assert "Content-Encoding" not in response.headers
+
+
+def test_streaming_responses_are_compressed(compressed_client: TestClient):
+    response = compressed_client.get("/stream", headers=GZIP_ONLY)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.text == "".join(f"line {i}\n" * 50 for i in range(5))
+
+
+def test_closed_poll_results_snapshot(
+        client: TestClient, db: Session, small_threshold
+):
+    closed_poll_snapshots.clear()
+    creator = User(email="snapshot@example.com", hashed_password="x", role="user")
+    poll = Poll(
+        title="Snapshot",
+        creator=creator,
+        is_closed=True,
+        choices=[Choice(text="A" * 80), Choice(text="B" * 80)]
+    )
+    db.add(poll)
+    db.commit()
+
+    response = client.get(f"/polls/{poll.id}/results", headers=GZIP_ONLY)
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    snapshot = closed_poll_snapshots.get(poll.id)
+    assert gzip.decompress(snapshot.encoded["gzip"]) == snapshot.body
+    assert response.json()["results"] == {"A" * 80: 0, "B" * 80: 0}
+
+    cached = client.get(
+        f"/polls/{poll.id}/results", headers={"If-None-Match": snapshot.etag}
+    )
+    assert cached.status_code == 304
+
+    invalidation_bus.publish(db, SNAPSHOTS_CHANNEL, poll.id)
+    db.commit()
+    assert closed_poll_snapshots.get(poll.id) is None
+
+
+def test_uncached_snapshot_compresses_only_negotiated_encoding(small_threshold):
+    snapshot = make_snapshot(b"[" + b"1," * 200 + b"1]")
+    assert snapshot.encoded == {}
+
+    request = Request({
+        "type": "http",
+        "method": "GET",
+        "headers": [(b"accept-encoding", b"gzip")]
+    })
+    response = snapshot_response(request, snapshot)
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert list(snapshot.encoded) == ["gzip"]
+    assert gzip.decompress(response.body) == snapshot.body
@@ -0,0 +1,136 @@
+import asyncio
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.config import Settings, get_settings
+from app.database.models import LeaderLease, Poll, User
+from app.shared import scheduler
+from app.shared.cache import (
+    POLLS_CHANNEL,
+    USER_VOTES_CHANNEL,
+    polls_cache,
+    user_votes_cache
+)
+from app.shared.coordination import (
+    InvalidationBus,
+    invalidation_bus,
+    try_acquire_leadership,
+    release_leadership
+)
+
+
+def _now():
+    return datetime.now()
+
+
+def test_leadership_is_exclusive_until_lease_expires(db: Session):
+    assert try_acquire_leadership(db, "sweep", 30, owner="worker-a")
+    assert not try_acquire_leadership(db, "sweep", 30, owner="worker-b")
+    assert try_acquire_leadership(db, "sweep", 30, owner="worker-a")
+
+    lease = db.query(LeaderLease).filter(LeaderLease.name == "sweep").one()
+    lease.expires_at = lease.expires_at - timedelta(seconds=60)
+    db.commit()
+
+    assert try_acquire_leadership(db, "sweep", 30, owner="worker-b")
+    release_leadership(db, "sweep", owner="worker-b")
+    assert db.query(LeaderLease).count() == 0
+
+
+def test_invalidation_reaches_local_and_other_workers(db: Session):
+    other_worker = InvalidationBus()
+    other_worker.poll(db)
+    local_calls, remote_calls = [], []
+    invalidation_bus.subscribe("test-channel", lambda: local_calls.append(1))
+    other_worker.subscribe("test-channel", lambda: remote_calls.append(1))
+
+    invalidation_bus.publish(db, "test-channel")
+    assert local_calls == []
+    db.commit()
+
+    assert local_calls == [1]
+    assert other_worker.poll(db) == 1
+    assert remote_calls == [1]
+
+
+def test_invalidation_dropped_on_rollback(db: Session):
+    calls = []
+    invalidation_bus.subscribe("rolled-back", lambda: calls.append(1))
+
+    db.add(LeaderLease(name="rolled-back", owner="worker-a", expires_at=_now()))
+    invalidation_bus.publish(db, "rolled-back")
+    db.rollback()
+    db.commit()
+
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_polls_cache_cleared_by_invalidation(db: Session, monkeypatch):
+    monkeypatch.setattr(get_settings(), "CACHE_TTL_SECONDS", 60)
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        return len(loads)
+
+    polls_cache.clear()
+    assert await polls_cache.get_or_load("all", loader) == 1
+    assert await polls_cache.get_or_load("all", loader) == 1
+
+    invalidation_bus.publish(db, POLLS_CHANNEL)
+    db.commit()
+
+    assert await polls_cache.get_or_load("all", loader) == 2
+
+
+@pytest.mark.asyncio
+async def test_keyed_invalidation_discards_one_entry(db: Session, monkeypatch):
+    monkeypatch.setattr(get_settings(), "CACHE_TTL_SECONDS", 60)
+    user_votes_cache.clear()
+    user_votes_cache.set("a@example.com", {1: [1]})
+    user_votes_cache.set("b@example.com", {1: [2]})
+
+    invalidation_bus.publish(db, USER_VOTES_CHANNEL, "a@example.com")
+    db.commit()
+
+    assert user_votes_cache.get("a@example.com", 60) is None
+    assert user_votes_cache.get("b@example.com", 60) == {1: [2]}
+
+
+@pytest.mark.asyncio
+async def test_background_tick_runs_in_thread_and_renews_lease(
+        db: Session, monkeypatch
+):
+    monkeypatch.setattr(scheduler, "_is_leader", False)
+    user = User(email="owner@example.com", hashed_password="fake_hashed_password")
+    db.add(user)
+    db.flush()
+    now = datetime.now(UTC).replace(tzinfo=None)
+    db.add(Poll(title="Due", creator_id=user.id, close_date=now - timedelta(1)))
+    db.commit()
+
+    await asyncio.to_thread(scheduler.run_background_tick, lambda: db, True)
+    assert db.query(Poll.is_closed).scalar() is True
+
+    lease = db.query(LeaderLease).one()
+    lease.expires_at = now + timedelta(seconds=1)
+    db.commit()
+    await asyncio.to_thread(scheduler.run_background_tick, lambda: db, False)
+    db.expire_all()
+    assert db.query(LeaderLease).one().expires_at > now + timedelta(seconds=10)
+
+
+def test_settings_reject_lease_shorter_than_background_tick():
+    with pytest.raises(ValueError):
+        Settings(
+            DATABASE_URL="sqlite://",
+            SECRET_KEY="secret",
+            ALGORITHM="HS256",
+            ACCESS_TOKEN_EXPIRE_MINUTES=30,
+            REFRESH_TOKEN_EXPIRE_DAYS=7,
+            LEADER_LEASE_SECONDS=2,
+            INVALIDATION_POLL_SECONDS=5
+        )
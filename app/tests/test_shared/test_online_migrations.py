@@ -0,0 +1,150 @@
+import os
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import Index, MetaData, inspect
+
+from app.config import get_settings
+from app.database.base import Base
+from app.database.models import Choice, Poll, User, Vote
+from app.database.online_migrations import (
+    DONE,
+    backfill,
+    copy_and_swap,
+    estimate,
+    finished,
+    get_progress,
+    migration_engine
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = migration_engine(f"sqlite:///{tmp_path / 'online.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": i, "email": f"user{i}@example.com", "hashed_password": "x"}
+            for i in range(1, 26)
+        ])
+        conn.execute(Poll.__table__.insert(), {"id": 1, "title": "P", "creator_id": 1})
+        conn.execute(Choice.__table__.insert(), {"id": 1, "text": "A", "poll_id": 1})
+        conn.execute(Vote.__table__.insert(), [
+            {"id": i, "user_id": i, "choice_id": 1} for i in range(1, 26)
+        ])
+    yield engine
+    engine.dispose()
+
+
+def votes_with_choice_index():
+    metadata = MetaData()
+    for table in (User.__table__, Poll.__table__, Choice.__table__):
+        table.to_metadata(metadata)
+    target = Vote.__table__.to_metadata(metadata)
+    Index("ix_votes_choice_id", target.c.choice_id)
+    return target
+
+
+def test_backfill_is_batched_and_resumable(engine):
+    assert backfill(
+        engine, "votes_created_at", "votes", "created_at = '2030-01-01'",
+        where="created_at < '2030-01-01'", batch_size=10, duty_cycle=1, max_batches=2
+    ) == 20
+    with engine.begin() as conn:
+        assert get_progress(conn, "votes_created_at").last_id == 20
+        assert not finished(conn, "votes_created_at")
+
+    assert backfill(
+        engine, "votes_created_at", "votes", "created_at = '2030-01-01'",
+        where="created_at < '2030-01-01'", batch_size=10, duty_cycle=1
+    ) == 5
+    with engine.begin() as conn:
+        assert finished(conn, "votes_created_at")
+        assert conn.exec_driver_sql(
+            "SELECT COUNT(*) FROM votes WHERE created_at < '2030-01-01'"
+        ).scalar() == 0
+
+
+def test_copy_and_swap_keeps_concurrent_changes(engine):
+    target = votes_with_choice_index()
+    assert copy_and_swap(
+        engine, "votes_choice_index", target, batch_size=10, duty_cycle=1,
+        max_batches=1
+    ) == 10
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM votes WHERE id IN (3, 15)")
+        conn.exec_driver_sql("UPDATE votes SET user_id = 2 WHERE id = 20")
+        conn.exec_driver_sql(
+            "INSERT INTO votes (id, user_id, choice_id) VALUES (26, 1, 1)"
+        )
+
+    copy_and_swap(engine, "votes_choice_index", target, batch_size=10, duty_cycle=1)
+
+    with engine.begin() as conn:
+        assert get_progress(conn, "votes_choice_index").phase == DONE
+        rows = dict(conn.exec_driver_sql("SELECT id, user_id FROM votes").fetchall())
+        inspector = inspect(conn)
+        indexes = {index["name"] for index in inspector.get_indexes("votes")}
+        tables = inspector.get_table_names()
+        triggers = conn.exec_driver_sql(
+            "SELECT COUNT(*) FROM sqlite_schema WHERE type = 'trigger'"
+        ).scalar()
+    assert sorted(rows) == [i for i in range(1, 27) if i not in (3, 15)]
+    assert rows[20] == 2
+    assert {"ix_votes_choice_id", "ix_votes_user_id"} <= indexes
+    assert "_shadow_votes" not in tables
+    assert triggers == 0
+
+
+def test_estimate_changes_nothing(engine):
+    report = estimate(
+        engine, "votes", target=votes_with_choice_index(), batch_size=10, duty_cycle=0.5
+    )
+
+    assert report["rows"] == 25
+    assert report["batches"] == 3
+    assert report["estimated_seconds"] >= 0
+    with engine.begin() as conn:
+        assert "_shadow_votes" not in inspect(conn).get_table_names()
+        assert "ix_votes_user_id" in {
+            index["name"] for index in inspect(conn).get_indexes("votes")
+        }
+
+
+def test_alembic_skips_ddl_applied_online(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'upgrade.db'}"
+    monkeypatch.setattr(get_settings(), "DATABASE_URL", url)
+    config = Config()
+    config.set_main_option(
+        "script_location",
+        os.path.join(os.path.dirname(__file__), "..", "..", "..", "alembic")
+    )
+    command.upgrade(config, "c52e7a9f3d10")
+    engine = migration_engine(url)
+    with engine.begin() as conn:
+        for statement in (
+            "INSERT INTO users (id, email, hashed_password) VALUES (1, 'u', 'x')",
+            "INSERT INTO polls (id, title, creator_id) VALUES (1, 'P', 1)",
+            "INSERT INTO choices (id, text, poll_id) VALUES (1, 'A', 1)",
+            "INSERT INTO votes (user_id, choice_id) VALUES (1, 1)"
+        ):
+            conn.exec_driver_sql(statement)
+
+    copy_and_swap(
+        engine, "votes_cascade_user_id_index", Vote.__table__,
+        batch_size=10, duty_cycle=1
+    )
+    command.upgrade(config, "head")
+
+    with engine.begin() as conn:
+        indexes = {index["name"] for index in inspect(conn).get_indexes("votes")}
+        cascades = {
+            key["options"].get("ondelete")
+            for key in inspect(conn).get_foreign_keys("votes")
+        }
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM votes").scalar() == 1
+    engine.dispose()
+    assert "ix_votes_user_id" in indexes
+    assert cascades == {"CASCADE"}
@@ -0,0 +1,111 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database.models import User
+from app.modules.auth.services import create_access_token, create_user
+from app.shared.principals import current_token_version, token_versions
+
+
+@pytest.fixture
+def admin(db: Session):
+    token_versions.clear()
+    user = User(email="principal-admin@example.com", hashed_password="x", role="admin")
+    db.add(user)
+    db.commit()
+    yield user
+    token_versions.clear()
+
+
+def _token(user: User) -> str:
+    return create_access_token(
+        {"sub": user.email, "role": user.role, "ver": user.token_version}
+    )
+
+
+def test_token_version_is_cached(db: Session, admin):
+    payload = {"sub": admin.email, "ver": 0}
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+
+    assert current_token_version(db, payload) == 0
+    assert current_token_version(db, payload) == 0
+    assert current_token_version(db, {**payload, "ver": 1}) is None
+
+    event.remove(db.get_bind(), "before_cursor_execute", listener)
+    assert len([sql for sql in statements if "FROM users" in sql]) == 1
+
+
+def test_revoked_tokens_are_rejected(client: TestClient, db: Session, admin):
+    token = _token(admin)
+    assert client.get("/admin/choices", params={"token": token}).status_code == 200
+
+    response = client.post(
+        f"/admin/users/{admin.id}/revoke-tokens", params={"token": token}
+    )
+    assert response.status_code == 200
+
+    response = client.get("/admin/choices", params={"token": token})
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+    db.refresh(admin)
+    assert client.get(
+        "/admin/choices", params={"token": _token(admin)}
+    ).status_code == 200
+
+
+def test_deactivated_user_is_rejected(client: TestClient, db: Session, admin):
+    voter = User(email="principal-voter@example.com", hashed_password="x")
+    db.add(voter)
+    db.commit()
+    voter_token = _token(voter)
+    poll = {"title": "Poll", "choices": ["A", "B"]}
+    assert client.post(
+        "/polls/polls", params={"token": voter_token}, json=poll
+    ).status_code == 200
+
+    response = client.patch(
+        f"/admin/users/{voter.id}",
+        params={"token": _token(admin)},
+        json={"is_active": False}
+    )
+    assert response.json()["is_active"] is False
+
+    assert client.post(
+        "/polls/polls", params={"token": voter_token}, json=poll
+    ).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_unknown_email_is_cached_until_registration(db: Session, admin):
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    payload = {"sub": "principal-late@example.com", "ver": 0}
+    assert current_token_version(db, payload) is None
+    assert current_token_version(db, payload) is None
+    event.remove(db.get_bind(), "before_cursor_execute", listener)
+    assert len([sql for sql in statements if "FROM users" in sql]) == 1
+
+    await create_user(db, "principal-late@example.com", "password")
+    assert current_token_version(db, payload) == 0
+
+
+def test_token_version_cache_is_bounded(db: Session, admin, monkeypatch):
+    monkeypatch.setattr(get_settings(), "TOKEN_VERSION_CACHE_SIZE", 2)
+
+    for number in range(3):
+        token_versions.get(db, f"principal-{number}@example.com")
+    token_versions.get(db, admin.email)
+
+    assert len(token_versions) == 2
+    assert token_versions.get(db, admin.email) == 0
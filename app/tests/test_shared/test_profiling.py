@@ -0,0 +1,52 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database.models import User
+from app.database.profiling import query_profiler, statement_shape
+from app.modules.auth.services import create_access_token
+from app.modules.voting.services import get_active_polls
+
+
+@pytest.fixture
+def profiler(monkeypatch):
+    monkeypatch.setattr(get_settings(), "SLOW_QUERY_MS", 0)
+    query_profiler.reset()
+    query_profiler.enable()
+    yield query_profiler
+    query_profiler.disable()
+    query_profiler.reset()
+
+
+def test_statement_shape_collapses_parameter_lists():
+    statement = "SELECT id\n  FROM polls\n WHERE id IN (?, ?, ?)"
+    assert statement_shape(statement) == "SELECT id FROM polls WHERE id IN (?...)"
+
+
+@pytest.mark.asyncio
+async def test_profiler_records_origin_and_plan(db: Session, profiler):
+    await get_active_polls(db)
+
+    stats = [
+        stat for stat in profiler.top(50)
+        if "voting.services.get_active_polls" in stat["origins"]
+    ]
+    assert stats
+    assert all(stat["calls"] >= 1 and stat["plan"] for stat in stats)
+
+
+def test_query_stats_endpoint(client: TestClient, db: Session, profiler):
+    db.add(User(email="admin@example.com", hashed_password="x", role="admin"))
+    db.commit()
+    token = create_access_token({"sub": "admin@example.com", "role": "admin"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.get("/admin/query-stats", params={"limit": 5}, headers=headers)
+    assert response.status_code == 200
+    assert 0 < len(response.json()) <= 5
+
+    assert client.delete("/admin/query-stats", headers=headers).status_code == 200
+    profiler.disable()
+    response = client.get("/admin/query-stats", headers=headers)
+    assert response.status_code == 404
@@ -0,0 +1,139 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from app.config import get_settings
+from app.database.base import Base
+from app.shared.rate_limit import (
+    ConcurrencyLimitMiddleware,
+    DatabaseRateLimitBackend,
+    InMemoryRateLimitBackend,
+    set_rate_limit_backend
+)
+
+
+@pytest.fixture
+def memory_backend():
+    backend = InMemoryRateLimitBackend()
+    set_rate_limit_backend(backend)
+    yield backend
+    set_rate_limit_backend(None)
+
+
+def test_token_bucket_refills_over_time():
+    backend = InMemoryRateLimitBackend()
+
+    assert backend.take("k", rate=1, capacity=2, now=0)[0]
+    assert backend.take("k", rate=1, capacity=2, now=0)[0]
+    allowed, retry_after = backend.take("k", rate=1, capacity=2, now=0.5)
+    assert not allowed
+    assert retry_after == pytest.approx(0.5)
+    assert backend.take("k", rate=1, capacity=2, now=1.5)[0]
+
+
+def test_database_backend_shares_counters(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'limits.db'}")
+    Base.metadata.create_all(bind=engine)
+    first_worker = DatabaseRateLimitBackend(engine)
+    second_worker = DatabaseRateLimitBackend(engine)
+
+    assert first_worker.take("k", rate=1, capacity=1, now=0)[0]
+    assert not second_worker.take("k", rate=1, capacity=1, now=0)[0]
+    assert second_worker.take("k", rate=1, capacity=1, now=1)[0]
+    allowed, retry_after = first_worker.take("k", rate=1, capacity=1, now=1.25)
+    assert not allowed
+    assert retry_after == pytest.approx(0.75)
+    engine.dispose()
+
+
+def test_database_backend_first_requests_race_without_errors(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'limits.db'}")
+    Base.metadata.create_all(bind=engine)
+    workers = [DatabaseRateLimitBackend(engine) for _ in range(4)]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(
+            lambda i: workers[i % 4].take("new", rate=0.001, capacity=5, now=0)[0],
+            range(20)
+        ))
+
+    assert results.count(True) == 5
+    engine.dispose()
+
+
+def test_memory_backend_evicts_full_buckets(monkeypatch):
+    monkeypatch.setattr(InMemoryRateLimitBackend, "MIN_PRUNE_SIZE", 10)
+    backend = InMemoryRateLimitBackend()
+
+    for i in range(100):
+        backend.take(f"client-{i}", rate=1, capacity=2, now=i)
+
+    assert len(backend) <= 20
+    assert backend.take("client-99", rate=1, capacity=2, now=99)[0]
+    assert not backend.take("client-99", rate=1, capacity=2, now=99)[0]
+
+
+def test_login_is_rate_limited(client: TestClient, memory_backend, monkeypatch):
+    monkeypatch.setattr(get_settings(), "RATE_LIMIT_LOGIN_PER_MINUTE", 2)
+    credentials = {"email": "ghost@example.com", "password": "nope"}
+
+    assert client.post("/auth/login", json=credentials).status_code == 401
+    assert client.post("/auth/login", json=credentials).status_code == 401
+    response = client.post("/auth/login", json=credentials)
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_login_limit_is_per_email(client: TestClient, memory_backend, monkeypatch):
+    monkeypatch.setattr(get_settings(), "RATE_LIMIT_LOGIN_PER_MINUTE", 1)
+
+    for email in ("first@example.com", "second@example.com"):
+        credentials = {"email": email, "password": "nope"}
+        assert client.post("/auth/login", json=credentials).status_code == 401
+
+    credentials = {"email": " First@example.com", "password": "nope"}
+    assert client.post("/auth/login", json=credentials).status_code == 429
+
+
+def test_login_email_rotation_hits_client_limit(
+        client: TestClient, memory_backend, monkeypatch
+):
+    monkeypatch.setattr(get_settings(), "RATE_LIMIT_LOGIN_PER_CLIENT_PER_MINUTE", 3)
+
+    for number in range(3):
+        credentials = {"email": f"user{number}@example.com", "password": "nope"}
+        assert client.post("/auth/login", json=credentials).status_code == 401
+
+    credentials = {"email": "user3@example.com", "password": "nope"}
+    assert client.post("/auth/login", json=credentials).status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_sheds_overflow(monkeypatch):
+    monkeypatch.setattr(get_settings(), "MAX_CONCURRENT_REQUESTS", 1)
+    monkeypatch.setattr(get_settings(), "MAX_QUEUED_REQUESTS", 0)
+    release = asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    transport = httpx.ASGITransport(app=ConcurrencyLimitMiddleware(slow_app))
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as http:
+        first = asyncio.create_task(http.get("/"))
+        await asyncio.sleep(0.01)
+        rejected = await http.get("/")
+        release.set()
+        accepted = await first
+
+    assert rejected.status_code == 503
+    assert rejected.headers["Retry-After"] == "1"
+    assert accepted.status_code == 200
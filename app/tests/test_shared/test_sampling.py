@@ -0,0 +1,116 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database.models import User
+from app.database.session import get_session_factory
+from app.main import app
+from app.modules.auth.services import create_access_token
+from app.shared.principals import token_versions
+from app.shared.sampling import PROFILE_ID_HEADER, StackSampler
+
+
+def busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.fixture
+def admin_headers(db: Session):
+    db.add(User(email="admin@example.com", hashed_password="x", role="admin"))
+    db.commit()
+    token = create_access_token({"sub": "admin@example.com", "role": "admin"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def app_admin():
+    """Администратор в базе приложения: middleware открывает сессию сам"""
+    token_versions.clear()
+    db = get_session_factory()()
+    user = User(email="profiling-admin@example.com", hashed_password="x", role="admin")
+    db.add(user)
+    db.commit()
+    yield user
+    db.delete(user)
+    db.commit()
+    db.close()
+    token_versions.clear()
+
+
+def test_sampler_collapses_busy_thread_stacks():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy-1")
+    worker.start()
+    sampler = StackSampler(interval_ms=1)
+    sampler.start()
+    try:
+        while sampler.samples < 20:
+            stop.wait(0.01)
+    finally:
+        sampler.stop()
+        stop.set()
+        worker.join()
+
+    busy = [line for line in sampler.collapsed().splitlines() if "busy_loop" in line]
+    assert busy and all(line.startswith("busy;") for line in busy)
+
+    profile = sampler.speedscope()
+    frames = profile["shared"]["frames"]
+    (busy_profile,) = [p for p in profile["profiles"] if p["name"] == "busy"]
+    assert len(busy_profile["samples"]) == len(busy_profile["weights"])
+    assert any(
+        frames[index]["name"] == "busy_loop"
+        for sample in busy_profile["samples"] for index in sample
+    )
+
+
+def test_profile_endpoint(client: TestClient, admin_headers):
+    response = client.get(
+        "/admin/profile",
+        params={"seconds": 0.05, "format": "speedscope", "include_idle": True},
+        headers=admin_headers
+    )
+    assert response.status_code == 200
+    assert response.json()["profiles"]
+
+    response = client.get(
+        "/admin/profile", params={"seconds": 3600}, headers=admin_headers
+    )
+    assert response.status_code == 400
+
+
+def _app_admin_headers(user: User) -> dict:
+    token = create_access_token({"sub": user.email, "role": "admin", "ver": 0})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_request_profiling_header(app_admin, monkeypatch):
+    monkeypatch.setattr(get_settings(), "PROFILE_REQUESTS", True)
+    client = TestClient(app)
+    admin_headers = _app_admin_headers(app_admin)
+
+    assert PROFILE_ID_HEADER not in client.get("/polls/").headers
+    response = client.get("/polls/", headers={**admin_headers, "X-Profile": "1"})
+    profile_id = response.headers[PROFILE_ID_HEADER]
+
+    response = client.get(f"/admin/profiles/{profile_id}", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+
+def test_request_profiling_ignores_revoked_admin_token(app_admin, monkeypatch):
+    monkeypatch.setattr(get_settings(), "PROFILE_REQUESTS", True)
+    client = TestClient(app)
+    headers = {**_app_admin_headers(app_admin), "X-Profile": "1"}
+    assert PROFILE_ID_HEADER in client.get("/polls/", headers=headers).headers
+
+    response = client.post(
+        f"/admin/users/{app_admin.id}/revoke-tokens", headers=headers
+    )
+    assert response.status_code == 200
+
+    assert PROFILE_ID_HEADER not in client.get("/polls/", headers=headers).headers
@@ -0,0 +1,70 @@
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.database.models import User
+from app.modules.auth.services import create_access_token
+from app.shared import security
+from app.shared.logging import QueryTokenFilter
+from app.shared.principals import token_versions
+
+
+@pytest.fixture
+def admin_token(db: Session):
+    token_versions.clear()
+    db.add(User(email="bearer-admin@example.com", hashed_password="x", role="admin"))
+    db.commit()
+    yield create_access_token(
+        {"sub": "bearer-admin@example.com", "role": "admin", "ver": 0}
+    )
+    token_versions.clear()
+
+
+def test_bearer_header(client: TestClient, admin_token):
+    response = client.get(
+        "/admin/choices", headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 200
+
+
+def test_query_token_fallback(client: TestClient, admin_token):
+    response = client.get("/admin/choices", params={"token": admin_token})
+    assert response.status_code == 200
+
+
+def test_missing_token(client: TestClient):
+    response = client.get("/admin/choices")
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token is missing"
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+
+
+def test_token_is_decoded_once_per_request(
+        client: TestClient, admin_token, monkeypatch
+):
+    calls = []
+
+    def decode(token):
+        calls.append(token)
+        return decode_access_token(token)
+
+    decode_access_token = security.decode_access_token
+    monkeypatch.setattr(security, "decode_access_token", decode)
+
+    client.post(
+        "/polls/1/vote",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        json={"choice_ids": [1]}
+    )
+    assert calls == [admin_token]
+
+
+def test_query_tokens_are_masked_in_access_log():
+    record = logging.LogRecord(
+        "uvicorn.access", logging.INFO, __file__, 0, '%s - "%s %s"',
+        ("127.0.0.1", "GET", "/admin/choices?token=secret&x=1"), None
+    )
+    QueryTokenFilter().filter(record)
+    assert record.getMessage() == '127.0.0.1 - "GET /admin/choices?token=***&x=1"'
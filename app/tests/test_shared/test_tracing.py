@@ -0,0 +1,63 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.modules.auth.services import create_access_token
+from app.shared.tracing import (
+    SPAN_KIND_CLIENT,
+    SPAN_KIND_SERVER,
+    parse_traceparent,
+    tracer
+)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def tracing():
+    tracer.enable()
+    yield tracer
+    tracer.disable()
+
+
+def test_parse_traceparent():
+    context = parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01")
+    assert context == (TRACE_ID, PARENT_ID)
+    assert parse_traceparent(f"00-{'0' * 32}-{PARENT_ID}-01") is None
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(None) is None
+
+
+def test_nested_spans_share_trace(tracing):
+    with tracer.start_span("root") as root:
+        create_access_token({"sub": "user@example.com", "role": "user"})
+
+    (jwt_span,) = tracer.memory.spans(root.trace_id)[:-1]
+    assert jwt_span.name == "jwt.encode"
+    assert jwt_span.parent_id == root.span_id
+
+
+def test_request_spans_follow_traceparent(client: TestClient, db: Session, tracing):
+    response = client.get(
+        "/polls/", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"}
+    )
+
+    assert response.status_code == 200
+    assert parse_traceparent(response.headers["traceparent"]).trace_id == TRACE_ID
+    spans = {span.name: span for span in tracer.memory.spans(TRACE_ID)}
+    server = spans["GET /polls/"]
+    assert server.kind == SPAN_KIND_SERVER
+    assert server.parent_id == PARENT_ID
+    assert server.attributes["http.response.status_code"] == 200
+
+    service = spans["voting.services.get_active_polls"]
+    handler = next(
+        span for span in spans.values() if span.span_id == service.parent_id
+    )
+    assert handler.name.startswith("voting.routes.")
+    assert handler.parent_id == server.span_id
+    assert any(
+        span.kind == SPAN_KIND_CLIENT and span.parent_id == service.span_id
+        for span in spans.values()
+    )
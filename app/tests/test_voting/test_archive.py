@@ -0,0 +1,168 @@
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.database.models import ArchivedPoll, Poll, User, Vote
+from app.modules.admin.services import delete_poll
+from app.modules.voting.archive import (
+    FileArchive,
+    archive_closed_polls,
+    archive_poll,
+    restore_poll
+)
+from app.modules.voting.schemas import PollCreate
+from app.modules.voting.services import (
+    close_poll,
+    create_poll,
+    get_active_polls,
+    get_poll_details,
+    get_poll_results,
+    get_polls_details,
+    vote_in_poll
+)
+from app.shared.cache import archived_summaries
+
+
+@pytest.fixture(autouse=True)
+def clear_archived_summaries():
+    archived_summaries.clear()
+    yield
+    archived_summaries.clear()
+
+
+@pytest.fixture
+def closed_poll(db: Session):
+    async def _closed_poll(title: str = "Lunch"):
+        for email in ("owner@example.com", "voter@example.com"):
+            if not db.query(User).filter(User.email == email).first():
+                db.add(User(email=email, hashed_password="fake_hashed_password"))
+        db.commit()
+        poll = await create_poll(
+            db, PollCreate(title=title, choices=["Soup", "Salad"]),
+            "owner@example.com"
+        )
+        details = await get_poll_details(db, poll["id"])
+        for email, choice in (("owner@example.com", 0), ("voter@example.com", 1)):
+            await vote_in_poll(
+                db, poll["id"], [details["choices"][choice]["id"]], user_email=email
+            )
+        await close_poll(db, poll["id"], user_email="owner@example.com")
+        return poll["id"]
+
+    return _closed_poll
+
+
+@pytest.mark.asyncio
+async def test_archived_poll_reads_fall_back_to_snapshots(
+        db: Session, closed_poll, tmp_path
+):
+    poll_id = await closed_poll()
+    details = await get_poll_details(db, poll_id)
+    results = await get_poll_results(db, poll_id)
+    summary = next(p for p in await get_active_polls(db) if p["id"] == poll_id)
+
+    assert await archive_poll(db, poll_id, FileArchive(str(tmp_path))) == 2
+
+    assert db.get(Poll, poll_id) is None
+    assert db.query(Vote).count() == 0
+    assert (tmp_path / f"poll-{poll_id}.ndjson.gz").exists()
+    assert await get_polls_details(db, [poll_id, 999]) == [details]
+    assert await get_poll_results(db, poll_id) == results
+    assert summary in await get_active_polls(db)
+    assert archived_summaries.get("all") == (summary,)
+
+
+@pytest.mark.asyncio
+async def test_restore_poll_moves_rows_back(db: Session, closed_poll, tmp_path):
+    store = FileArchive(str(tmp_path))
+    poll_id = await closed_poll()
+    details = await get_poll_details(db, poll_id)
+    results = await get_poll_results(db, poll_id)
+    await archive_poll(db, poll_id, store)
+
+    assert len(await get_active_polls(db)) == 1
+
+    assert restore_poll(db, poll_id, store) == 2
+
+    assert db.get(ArchivedPoll, poll_id) is None
+    assert db.query(Vote).count() == 2
+    assert not (tmp_path / f"poll-{poll_id}.ndjson.gz").exists()
+    assert await get_poll_details(db, poll_id) == details
+    assert await get_poll_results(db, poll_id) == results
+    assert archived_summaries.get("all") is None
+
+
+@pytest.mark.asyncio
+async def test_archive_closed_polls_respects_age(
+        db: Session, closed_poll, tmp_path, monkeypatch
+):
+    from app.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "ARCHIVE_URL", str(tmp_path))
+    old_poll_id = await closed_poll("Old")
+    recent_poll_id = await closed_poll("Recent")
+    # Старый опрос закрыт вручную без close_date, свежий - досрочно,
+    # хотя close_date у него давно прошел
+    db.get(Poll, old_poll_id).closed_at = datetime.now() - timedelta(days=40)
+    db.get(Poll, recent_poll_id).close_date = datetime.now() - timedelta(days=40)
+    db.get(Poll, recent_poll_id).closed_at = datetime.now() - timedelta(days=1)
+    db.commit()
+
+    assert await archive_closed_polls(db, older_than_days=0) == []
+    assert await archive_closed_polls(db, older_than_days=30) == [old_poll_id]
+    assert db.get(Poll, recent_poll_id) is not None
+    assert db.get(ArchivedPoll, old_poll_id) is not None
+
+
+@pytest.mark.asyncio
+async def test_archive_closed_polls_stops_when_keep_going_fails(
+        db: Session, closed_poll, tmp_path, monkeypatch
+):
+    from app.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "ARCHIVE_URL", str(tmp_path))
+    poll_ids = [await closed_poll("First"), await closed_poll("Second")]
+    for poll_id in poll_ids:
+        db.get(Poll, poll_id).closed_at = datetime.now() - timedelta(days=40)
+    db.commit()
+    checks = iter([True, False])
+
+    archived = await archive_closed_polls(
+        db, older_than_days=30, keep_going=lambda: next(checks)
+    )
+
+    assert archived == poll_ids[:1]
+    assert db.get(Poll, poll_ids[1]) is not None
+
+
+@pytest.mark.asyncio
+async def test_close_poll_records_closed_at(db: Session, closed_poll):
+    poll_id = await closed_poll()
+
+    poll = db.get(Poll, poll_id)
+    assert poll.close_date is None
+    closed_ago = datetime.now(UTC).replace(tzinfo=None) - poll.closed_at
+    assert closed_ago < timedelta(minutes=1)
+
+
+@pytest.mark.asyncio
+async def test_delete_poll_removes_archived_poll(
+        db: Session, closed_poll, tmp_path, monkeypatch
+):
+    from app.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "ARCHIVE_URL", str(tmp_path))
+    poll_id = await closed_poll()
+    await archive_poll(db, poll_id)
+    assert len(await get_active_polls(db)) == 1
+
+    result = await delete_poll(db, poll_id)
+
+    assert result == {"message": "Poll deleted successfully"}
+
+    assert db.get(ArchivedPoll, poll_id) is None
+    assert not (tmp_path / f"poll-{poll_id}.ndjson.gz").exists()
+    assert await get_active_polls(db) == []
+    with pytest.raises(ValueError):
+        await delete_poll(db, poll_id)
@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy.orm import Session
+
+from app.database.models import Ballot, User, Vote
+from app.modules.voting.ballots import (
+    decode_selection,
+    encode_selection,
+    migrate_poll_to_ballots,
+    tally_selections
+)
+from app.modules.voting.schemas import PollCreate
+from app.modules.voting.services import (
+    close_poll,
+    create_poll,
+    get_active_polls,
+    get_poll_details,
+    vote_in_poll
+)
+
+
+def test_tally_selections_counts_bits():
+    selections = [
+        encode_selection([0, 9], 10),
+        encode_selection([9], 10),
+        encode_selection([], 10),
+        encode_selection([3, 9], 10)
+    ]
+
+    assert decode_selection(selections[3]) == [3, 9]
+    assert tally_selections(selections, 10).tolist() == [1, 0, 0, 1, 0, 0, 0, 0, 0, 3]
+
+
+@pytest.mark.asyncio
+async def test_multiple_choice_vote_stores_one_ballot(db: Session):
+    db.add_all([
+        User(email="first@example.com", hashed_password="x"),
+        User(email="second@example.com", hashed_password="x")
+    ])
+    db.commit()
+    poll = await create_poll(
+        db,
+        PollCreate(title="Multi", choices=["A", "B", "C"], is_multiple_choice=True),
+        "first@example.com"
+    )
+    choice_ids = [
+        choice["id"] for choice in (await get_poll_details(db, poll["id"]))["choices"]
+    ]
+
+    await vote_in_poll(db, poll["id"], choice_ids, "first@example.com")
+    await vote_in_poll(db, poll["id"], choice_ids[1:], "first@example.com")
+    await vote_in_poll(db, poll["id"], [choice_ids[2]], "second@example.com")
+
+    assert db.query(Vote).count() == 0
+    assert db.query(Ballot).count() == 2
+
+    await close_poll(db, poll["id"], "first@example.com")
+    polls = await get_active_polls(db)
+    assert polls[0]["results"] == {"A": 0, "B": 1, "C": 2}
+
+
+@pytest.mark.asyncio
+async def test_migrate_poll_votes_to_ballots(db: Session, monkeypatch):
+    from app.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "MULTIPLE_CHOICE_BALLOTS", False)
+    db.add(User(email="legacy@example.com", hashed_password="x"))
+    db.commit()
+    poll = await create_poll(
+        db,
+        PollCreate(title="Legacy", choices=["A", "B"], is_multiple_choice=True),
+        "legacy@example.com"
+    )
+    choice_ids = [
+        choice["id"] for choice in (await get_poll_details(db, poll["id"]))["choices"]
+    ]
+    await vote_in_poll(db, poll["id"], choice_ids, "legacy@example.com")
+    assert db.query(Vote).count() == 2
+
+    assert migrate_poll_to_ballots(db, poll["id"]) == 1
+
+    assert db.query(Vote).count() == 0
+    ballot = db.query(Ballot).one()
+    assert decode_selection(ballot.selection) == [0, 1]
+
+    await close_poll(db, poll["id"], "legacy@example.com")
+    polls = await get_active_polls(db)
+    assert polls[0]["results"] == {"A": 1, "B": 1}
@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database.models import User, VoteChange
+from app.modules.voting.changelog import (
+    compact_changes,
+    fold_all,
+    get_tallies,
+    rebuild_tallies
+)
+from app.modules.voting.schemas import PollCreate
+from app.modules.voting.services import (
+    close_poll,
+    create_poll,
+    get_active_polls,
+    get_poll_details,
+    vote_in_poll
+)
+
+
+@pytest.fixture
+def change_log(monkeypatch):
+    monkeypatch.setattr(get_settings(), "VOTE_CHANGE_LOG", True)
+
+
+async def _voted_poll(db: Session, is_multiple_choice: bool):
+    db.add_all([
+        User(email="a@example.com", hashed_password="x"),
+        User(email="b@example.com", hashed_password="x")
+    ])
+    db.commit()
+    poll = await create_poll(
+        db,
+        PollCreate(
+            title="Logged", choices=["A", "B", "C"],
+            is_multiple_choice=is_multiple_choice
+        ),
+        "a@example.com"
+    )
+    choice_ids = [
+        choice["id"] for choice in (await get_poll_details(db, poll["id"]))["choices"]
+    ]
+    return poll["id"], choice_ids
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("is_multiple_choice", [False, True])
+async def test_votes_fold_into_tallies(db: Session, change_log, is_multiple_choice):
+    poll_id, choice_ids = await _voted_poll(db, is_multiple_choice)
+
+    await vote_in_poll(db, poll_id, [choice_ids[0]], "a@example.com")
+    await vote_in_poll(db, poll_id, [choice_ids[1]], "a@example.com")
+    await vote_in_poll(db, poll_id, [choice_ids[1]], "b@example.com")
+
+    assert db.query(VoteChange).count() == 4
+    assert fold_all(db) == {poll_id}
+    assert get_tallies(db, [poll_id]) == {choice_ids[0]: 0, choice_ids[1]: 2}
+
+    await close_poll(db, poll_id, "a@example.com")
+    polls = await get_active_polls(db)
+    assert polls[0]["results"] == {"A": 0, "B": 2, "C": 0}
+
+
+@pytest.mark.asyncio
+async def test_compaction_keeps_tallies_replayable(db: Session, change_log):
+    poll_id, choice_ids = await _voted_poll(db, is_multiple_choice=False)
+    for choice_id in choice_ids + choice_ids[:1]:
+        await vote_in_poll(db, poll_id, [choice_id], "a@example.com")
+    await vote_in_poll(db, poll_id, [choice_ids[2]], "b@example.com")
+    fold_all(db)
+    expected = get_tallies(db, [poll_id])
+
+    compact_changes(db)
+    await vote_in_poll(db, poll_id, [choice_ids[1]], "b@example.com")
+    fold_all(db)
+    expected[choice_ids[1]] += 1
+    expected[choice_ids[2]] -= 1
+
+    assert get_tallies(db, [poll_id]) == expected
+    assert db.query(VoteChange).count() < 8
+    rebuild_tallies(db)
+    assert {
+        choice_id: score
+        for choice_id, score in get_tallies(db, [poll_id]).items() if score
+    } == {choice_id: score for choice_id, score in expected.items() if score}
@@ -0,0 +1,119 @@
+import shutil
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import get_settings
+from app.database.base import Base
+from app.database.models import User, Poll
+from app.database.session import (
+    get_db,
+    init_replicas,
+    mark_primary_sticky,
+    primary_sticky
+)
+from app.main import app
+from app.modules.auth.services import create_access_token
+from app.shared.cache import polls_cache
+
+
+def _auth(email: str) -> dict:
+    token = create_access_token({"sub": email, "role": "user"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _add_poll(session, title: str):
+    session.add(Poll(title=title, creator_id=1, is_closed=False))
+    session.commit()
+
+
+@pytest.fixture
+def primary_session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(email="creator@example.com", hashed_password="x"))
+    _add_poll(session, "Replicated poll")
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def replica_client(tmp_path, primary_session):
+    replica_path = tmp_path / "replica.db"
+    shutil.copyfile(tmp_path / "primary.db", replica_path)
+    _add_poll(primary_session, "Not yet replicated poll")
+    init_replicas([f"sqlite:///{replica_path}"])
+
+    def override_get_db():
+        yield primary_session
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    primary_sticky.clear()
+    init_replicas([])
+
+
+def test_poll_list_is_read_from_replica(replica_client: TestClient):
+    response = replica_client.get("/polls/")
+    assert response.status_code == 200
+    assert [poll["title"] for poll in response.json()] == ["Replicated poll"]
+
+
+def test_recent_writer_reads_from_primary(replica_client: TestClient):
+    primary_sticky.mark("creator@example.com")
+
+    response = replica_client.get("/polls/", headers=_auth("creator@example.com"))
+    assert [poll["title"] for poll in response.json()] == [
+        "Replicated poll",
+        "Not yet replicated poll"
+    ]
+
+
+def test_stickiness_is_per_user(replica_client: TestClient):
+    primary_sticky.mark("creator@example.com")
+
+    for headers in (_auth("other@example.com"), {}):
+        response = replica_client.get("/polls/", headers=headers)
+        assert [poll["title"] for poll in response.json()] == ["Replicated poll"]
+
+
+def test_expired_stickiness_reads_poll_details_from_replica(
+        replica_client: TestClient
+):
+    primary_sticky.mark("creator@example.com", now=time.monotonic() - 3600)
+    headers = _auth("creator@example.com")
+
+    assert replica_client.get("/polls/2", headers=headers).status_code == 404
+    assert replica_client.get("/polls/1", headers=headers).json()["title"] == (
+        "Replicated poll"
+    )
+
+
+def test_write_marks_user_sticky_after_commit(
+        replica_client: TestClient, primary_session
+):
+    mark_primary_sticky(primary_session, "creator@example.com")
+    assert not primary_sticky.is_sticky("creator@example.com")
+
+    primary_session.commit()
+    assert primary_sticky.is_sticky("creator@example.com")
+
+
+def test_recent_writer_bypasses_poll_list_cache(
+        replica_client: TestClient, monkeypatch
+):
+    monkeypatch.setattr(get_settings(), "CACHE_TTL_SECONDS", 60)
+    polls_cache.clear()
+    headers = _auth("creator@example.com")
+    assert len(replica_client.get("/polls/", headers=headers).json()) == 1
+
+    primary_sticky.mark("creator@example.com")
+    assert len(replica_client.get("/polls/", headers=headers).json()) == 2
+    assert len(replica_client.get("/polls/").json()) == 1
+    polls_cache.clear()
@@ -1,7 +1,98 @@
 from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database.models import Choice, Poll, User
+from app.modules.auth.services import create_access_token
+from app.shared.cache import polls_cache
+from app.shared.principals import token_versions
 
 
 def test_get_all_polls(client: TestClient):
     response = client.get("/polls/")
     assert response.status_code == 200
     assert response.json() == []
+
+
+def test_get_poll_details_not_found(client: TestClient):
+    response = client.get("/polls/999")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Poll not found"}
+
+
+def test_poll_list_etag(client: TestClient):
+    polls_cache.clear()
+    response = client.get("/polls/")
+    etag = response.headers["ETag"]
+
+    cached = client.get("/polls/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    changed = client.get("/polls/", headers={"If-None-Match": '"other"'})
+    assert changed.status_code == 200
+    assert changed.json() == []
+
+
+def test_get_polls_details_batch(client: TestClient, db: Session):
+    creator = User(email="batch@example.com", hashed_password="x", role="user")
+    polls = [
+        Poll(
+            title=f"Batch {i}",
+            creator=creator,
+            choices=[Choice(text="A"), Choice(text="B")]
+        )
+        for i in range(3)
+    ]
+    db.add_all(polls)
+    db.commit()
+    ids = [polls[2].id, polls[0].id, 999]
+
+    response = client.get(
+        "/polls/details", params={"ids": ",".join(map(str, ids))}
+    )
+    assert response.status_code == 200
+    details = response.json()
+    assert [poll["id"] for poll in details] == [polls[2].id, polls[0].id]
+    assert [choice["text"] for choice in details[0]["choices"]] == ["A", "B"]
+
+    assert client.get("/polls/details", params={"ids": "1,x"}).status_code == 422
+
+
+def test_my_votes(client: TestClient, db: Session, monkeypatch):
+    monkeypatch.setattr(get_settings(), "CACHE_TTL_SECONDS", 60)
+    token_versions.clear()
+    voter = User(email="my-votes@example.com", hashed_password="x", role="user")
+    single = Poll(
+        title="Single", creator=voter, choices=[Choice(text="A"), Choice(text="B")]
+    )
+    approval = Poll(
+        title="Approval",
+        creator=voter,
+        voting_method="approval",
+        is_multiple_choice=True,
+        ballot_storage=True,
+        choices=[Choice(text="X"), Choice(text="Y"), Choice(text="Z")]
+    )
+    db.add_all([single, approval])
+    db.commit()
+    headers = {
+        "Authorization": "Bearer " + create_access_token(
+            {"sub": voter.email, "role": "user", "ver": 0}
+        )
+    }
+    a, b = (choice.id for choice in single.choices)
+    x, _, z = (choice.id for choice in approval.choices)
+
+    assert client.get("/polls/my-votes", headers=headers).json() == {}
+
+    client.post(f"/polls/{single.id}/vote", headers=headers, json={"choice_ids": [a]})
+    client.post(
+        f"/polls/{approval.id}/vote", headers=headers, json={"choice_ids": [z, x]}
+    )
+    assert client.get("/polls/my-votes", headers=headers).json() == {
+        str(single.id): [a], str(approval.id): [x, z]
+    }
+
+    client.post(f"/polls/{single.id}/vote", headers=headers, json={"choice_ids": [b]})
+    assert client.get("/polls/my-votes", headers=headers).json()[str(single.id)] == [b]
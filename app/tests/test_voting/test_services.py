@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from app.database.models import User
 from fastapi.exceptions import HTTPException
 from app.modules.voting.services import (
+    get_active_polls,
     create_poll,
     get_poll_details,
     vote_in_poll,
@@ -89,3 +90,34 @@ async def test_vote_in_closed_poll(db: Session, create_user):
 
     assert exc_info.value.status_code == 400
     assert exc_info.value.detail == "Poll is closed"
+
+
+@pytest.mark.asyncio
+async def test_get_active_polls_counts_only_closed(db: Session, create_user):
+    create_user(email="user@example.com")
+
+    open_poll = await create_poll(
+        db, PollCreate(title="Open", choices=["A", "B"]), "user@example.com"
+    )
+    closed_poll = await create_poll(
+        db, PollCreate(title="Closed", choices=["C", "D"]), "user@example.com"
+    )
+    open_details = await get_poll_details(db, open_poll["id"])
+    closed_details = await get_poll_details(db, closed_poll["id"])
+
+    await vote_in_poll(
+        db, open_poll["id"],
+        [open_details["choices"][0]["id"]],
+        user_email="user@example.com"
+    )
+    await vote_in_poll(
+        db, closed_poll["id"],
+        [closed_details["choices"][1]["id"]],
+        user_email="user@example.com"
+    )
+    await close_poll(db, closed_poll["id"], user_email="user@example.com")
+
+    polls = {poll["title"]: poll for poll in await get_active_polls(db)}
+    assert polls["Open"]["results"] == {"A": 0, "B": 0}
+    assert polls["Closed"]["results"] == {"C": 0, "D": 1}
+    assert polls["Closed"]["is_closed"] is True
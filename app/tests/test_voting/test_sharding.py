@@ -0,0 +1,110 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database.models import User, Vote
+from app.modules.admin.services import delete_user
+from app.database.sharding import (
+    init_shards,
+    rebalance_poll,
+    shard_for_poll,
+    shard_session
+)
+from app.modules.voting.schemas import PollCreate
+from app.modules.voting.services import (
+    close_poll,
+    create_poll,
+    get_active_polls,
+    get_poll_details,
+    vote_in_poll
+)
+
+
+@pytest.fixture
+def shards(tmp_path):
+    init_shards([
+        f"sqlite:///{tmp_path / 'votes_0.db'}",
+        f"sqlite:///{tmp_path / 'votes_1.db'}"
+    ])
+    yield
+    init_shards([])
+
+
+def _shard_vote_count(db: Session, shard: int) -> int:
+    with shard_session(db, shard) as shard_db:
+        return shard_db.query(Vote).count()
+
+
+@pytest.mark.asyncio
+async def test_votes_are_routed_to_poll_shard(db: Session, shards):
+    db.add(User(email="voter@example.com", hashed_password="x"))
+    db.commit()
+    poll = await create_poll(
+        db, PollCreate(title="Sharded", choices=["A", "B"]), "voter@example.com"
+    )
+    choices = (await get_poll_details(db, poll["id"]))["choices"]
+
+    await vote_in_poll(db, poll["id"], [choices[1]["id"]], "voter@example.com")
+    await vote_in_poll(db, poll["id"], [choices[0]["id"]], "voter@example.com")
+
+    shard = shard_for_poll(db, poll["id"])
+    assert db.query(Vote).count() == 0
+    assert _shard_vote_count(db, shard) == 1
+    assert _shard_vote_count(db, 1 - shard) == 0
+
+    await close_poll(db, poll["id"], "voter@example.com")
+    polls = await get_active_polls(db)
+    assert polls[0]["results"] == {"A": 1, "B": 0}
+
+
+@pytest.mark.asyncio
+async def test_delete_user_purges_their_polls_from_shards(db: Session, shards):
+    db.add_all([
+        User(email="owner@example.com", hashed_password="x"),
+        User(email="guest@example.com", hashed_password="x")
+    ])
+    db.commit()
+    poll = await create_poll(
+        db, PollCreate(title="Owned", choices=["A", "B"]), "owner@example.com"
+    )
+    choices = (await get_poll_details(db, poll["id"]))["choices"]
+    await vote_in_poll(db, poll["id"], [choices[0]["id"]], "guest@example.com")
+    shard = shard_for_poll(db, poll["id"])
+    owner = db.query(User).filter(User.email == "owner@example.com").one()
+
+    await delete_user(db, owner.id)
+
+    assert _shard_vote_count(db, shard) == 0
+    assert await get_active_polls(db) == []
+
+
+@pytest.mark.asyncio
+async def test_rebalance_moves_poll_votes(db: Session, shards):
+    db.add(User(email="mover@example.com", hashed_password="x"))
+    db.commit()
+    poll = await create_poll(
+        db, PollCreate(title="Moving", choices=["Yes", "No"]), "mover@example.com"
+    )
+    choices = (await get_poll_details(db, poll["id"]))["choices"]
+    await vote_in_poll(db, poll["id"], [choices[0]["id"]], "mover@example.com")
+    source = shard_for_poll(db, poll["id"])
+
+    assert rebalance_poll(db, poll["id"], 1 - source) == 1
+
+    assert shard_for_poll(db, poll["id"]) == 1 - source
+    assert _shard_vote_count(db, source) == 0
+    assert _shard_vote_count(db, 1 - source) == 1
+
+    await close_poll(db, poll["id"], "mover@example.com")
+    polls = await get_active_polls(db)
+    assert polls[0]["results"] == {"Yes": 1, "No": 0}
+
+
+def test_shards_enforce_local_foreign_keys_only(db: Session, shards):
+    with shard_session(db, 0) as shard_db:
+        assert shard_db.execute(text("PRAGMA foreign_keys")).scalar() == 1
+        assert shard_db.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        for table in ("votes", "ballots", "vote_changes", "choice_tallies"):
+            assert shard_db.execute(
+                text(f"PRAGMA foreign_key_list({table})")
+            ).all() == []
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from fastapi.exceptions import HTTPException
+from sqlalchemy.orm import Session
+
+from app.database.models import User
+from app.modules.voting import tally
+from app.modules.voting.ballots import encode_ranking, unpack_rankings
+from app.modules.voting.schemas import PollCreate
+from app.modules.voting.services import (
+    close_poll,
+    create_poll,
+    get_poll_details,
+    get_poll_results,
+    vote_in_poll
+)
+
+# 4 x A>B>C, 3 x B>C>A, 2 x C>B
+RANKED_BALLOTS = [[0, 1, 2]] * 4 + [[1, 2, 0]] * 3 + [[2, 1]] * 2
+
+
+def _rankings():
+    return unpack_rankings([encode_ranking(ballot) for ballot in RANKED_BALLOTS], 3)
+
+
+def test_instant_runoff_transfers_eliminated_votes():
+    rounds, winner = tally.instant_runoff(_rankings(), 3)
+
+    assert [counts.tolist() for counts in rounds] == [[4, 3, 2], [4, 5, 0]]
+    assert winner == 1
+
+
+def test_borda_ignores_unranked_choices():
+    assert tally.borda(_rankings(), 3).tolist() == [8, 12, 7]
+
+
+def test_leader_requires_unique_maximum():
+    assert tally.leader(np.array([2, 5, 1])) == 1
+    assert tally.leader(np.array([5, 5, 1])) is None
+
+
+@pytest.fixture
+def voters(db: Session):
+    users = [User(email=f"voter{i}@example.com", hashed_password="x") for i in range(9)]
+    db.add_all(users)
+    db.commit()
+    return [user.email for user in users]
+
+
+async def _poll_choice_ids(db: Session, poll_id: int) -> list[int]:
+    return [choice["id"] for choice in (await get_poll_details(db, poll_id))["choices"]]
+
+
+@pytest.mark.asyncio
+async def test_irv_poll_results(db: Session, voters):
+    poll = await create_poll(
+        db,
+        PollCreate(title="Ranked", choices=["A", "B", "C"], voting_method="irv"),
+        voters[0]
+    )
+    choice_ids = await _poll_choice_ids(db, poll["id"])
+    for email, ballot in zip(voters, RANKED_BALLOTS):
+        await vote_in_poll(db, poll["id"], [choice_ids[i] for i in ballot], email)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await get_poll_results(db, poll["id"])
+    assert exc_info.value.status_code == 400
+
+    await close_poll(db, poll["id"], voters[0])
+    results = await get_poll_results(db, poll["id"])
+
+    assert results["winner"] == "B"
+    assert results["results"] == {"A": 4, "B": 5, "C": 0}
+    assert results["rounds"][0] == {"A": 4, "B": 3, "C": 2}
+
+
+@pytest.mark.asyncio
+async def test_weighted_poll_requires_weights(db: Session, voters):
+    poll = await create_poll(
+        db,
+        PollCreate(title="Weighted", choices=["X", "Y"], voting_method="weighted"),
+        voters[0]
+    )
+    choice_ids = await _poll_choice_ids(db, poll["id"])
+
+    with pytest.raises(HTTPException) as exc_info:
+        await vote_in_poll(db, poll["id"], choice_ids, voters[0])
+    assert exc_info.value.status_code == 400
+
+    await vote_in_poll(db, poll["id"], choice_ids, voters[0], weights=[3, 1])
+    await vote_in_poll(db, poll["id"], [choice_ids[1]], voters[1], weights=[5])
+    await close_poll(db, poll["id"], voters[0])
+
+    results = await get_poll_results(db, poll["id"])
+    assert results["results"] == {"X": 3, "Y": 6}
+    assert results["winner"] == "Y"
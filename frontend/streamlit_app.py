@@ -1,7 +1,12 @@
 import streamlit as st
-import requests
+import asyncio
+import contextvars
+import httpx
 from datetime import datetime
+import importlib.util
 import os
+import threading
+import time
 from typing import List, Dict
 import json
 import uuid
@@ -10,6 +15,141 @@ from dotenv import load_dotenv
 load_dotenv()
 
 BASE_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "5"))
+POLLS_CACHE_TTL = float(os.getenv("POLLS_CACHE_TTL_SECONDS", "5"))
+POLL_DETAILS_BATCH = 500
+RETRY_STATUSES = (502, 503, 504)
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+# Trace shared by the requests of one user action (see fetch_dashboard)
+current_trace_id = contextvars.ContextVar("current_trace_id", default=None)
+
+
+async def inject_traceparent(request: httpx.Request):
+    """W3C traceparent header, so backend spans join the frontend's trace"""
+    if "traceparent" not in request.headers:
+        trace_id = current_trace_id.get() or uuid.uuid4().hex
+        request.headers["traceparent"] = f"00-{trace_id}-{uuid.uuid4().hex[:16]}-01"
+
+
+class ApiClient:
+    """Shared httpx.AsyncClient running on its own event loop thread.
+
+    Streamlit runs the script synchronously, so coroutines are submitted
+    to the loop with run(). Independent requests inside one coroutine are
+    sent concurrently over the shared keep-alive pool (HTTP/2 when the
+    h2 package is installed).
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(
+            target=self.loop.run_forever, name="api-client", daemon=True
+        ).start()
+        self.client = httpx.AsyncClient(
+            base_url=BASE_URL,
+            timeout=REQUEST_TIMEOUT,
+            transport=httpx.AsyncHTTPTransport(
+                http2=HTTP2,
+                retries=2,
+                limits=httpx.Limits(max_connections=20)
+            ),
+            event_hooks={"request": [inject_traceparent]}
+        )
+        # GET path -> (fetched_at, ETag, body), shared by all sessions.
+        # Only touched on the client loop thread, so it needs no lock.
+        self.responses = {}
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        return self.run(self.client.request(method, path, **kwargs))
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+        """GET retried with backoff on 502/503/504"""
+        for attempt in range(3):
+            response = await self.client.get(path, **kwargs)
+            if response.status_code not in RETRY_STATUSES:
+                break
+            await asyncio.sleep(0.2 * 2 ** attempt)
+        return response
+
+    async def get_json(self, path: str, headers: dict = None):
+        """Cached GET: fresh for POLLS_CACHE_TTL, then If-None-Match revalidation.
+
+        The body is public and cached per path; headers only identify the
+        user, so the backend reads a recent writer's data from the primary.
+        """
+        cached = self.responses.get(path)
+        if cached and time.monotonic() - cached[0] < POLLS_CACHE_TTL:
+            return cached[2]
+        headers = dict(headers or {})
+        if cached and cached[1]:
+            headers["If-None-Match"] = cached[1]
+        response = await self.get(path, headers=headers)
+        if response.status_code == 304 and cached:
+            self.responses[path] = (time.monotonic(), cached[1], cached[2])
+            return cached[2]
+        response.raise_for_status()
+        data = response.json()
+        self.responses[path] = (
+            time.monotonic(), response.headers.get("ETag"), data
+        )
+        return data
+
+    async def _invalidate(self, prefix: str):
+        for path in [path for path in self.responses if path.startswith(prefix)]:
+            self.responses.pop(path, None)
+
+    def invalidate(self, prefix: str):
+        """Drop cached responses on the client loop, where get_json writes them"""
+        self.run(self._invalidate(prefix))
+
+
+@st.cache_resource
+def get_api_client() -> ApiClient:
+    return ApiClient()
+
+
+def api_request(method: str, path: str, **kwargs) -> httpx.Response:
+    return get_api_client().request(method, path, **kwargs)
+
+
+async def fetch_dashboard(api: ApiClient, access_token: str = None):
+    """Polls, details of active polls and the user's votes.
+
+    The poll list and my-votes are requested together, then all detail
+    batches at once, so a render costs about two round trips at most.
+    All of them belong to one trace.
+    """
+    current_trace_id.set(uuid.uuid4().hex)
+    auth = {"Authorization": f"Bearer {access_token}"} if access_token else {}
+
+    async def my_votes():
+        if access_token is None:
+            return None
+        return await api.get("/polls/my-votes", headers=auth)
+
+    polls, votes_response = await asyncio.gather(
+        api.get_json("/polls/", auth), my_votes()
+    )
+    active_ids = [poll["id"] for poll in polls if not poll["is_closed"]]
+    batches = await asyncio.gather(*(
+        api.get_json(
+            "/polls/details?ids="
+            + ",".join(map(str, active_ids[i:i + POLL_DETAILS_BATCH])),
+            auth
+        )
+        for i in range(0, len(active_ids), POLL_DETAILS_BATCH)
+    ))
+    details = {poll["id"]: poll for batch in batches for poll in batch}
+    return polls, details, votes_response
+
+
+def invalidate_polls():
+    """Drop cached poll data after a change made by this user"""
+    get_api_client().invalidate("/polls")
 
 
 def init_session_state():
@@ -19,7 +159,8 @@ def init_session_state():
         'user_email': None,
         'is_logged_in': False,
         'polls': [],
-        'user_votes': {}
+        'user_votes': {},
+        'my_votes_loaded': False
     }
     for key, value in session_keys.items():
         if key not in st.session_state:
@@ -31,10 +172,9 @@ init_session_state()
 
 def register_user(email: str, password: str):
     """New user register"""
-    url = f"{BASE_URL}/auth/register"
     data = {"email": email, "password": password}
     try:
-        response = requests.post(url, json=data)
+        response = api_request("POST", "/auth/register", json=data)
         if response.status_code == 200:
             st.success("User registered successfully!")
             return True
@@ -49,10 +189,9 @@ def register_user(email: str, password: str):
 
 def login_user(email: str, password: str):
     """User authentification"""
-    url = f"{BASE_URL}/auth/login"
     data = {"email": email, "password": password}
     try:
-        response = requests.post(url, json=data)
+        response = api_request("POST", "/auth/login", json=data)
         response.raise_for_status()  # Exception generation
         tokens = response.json()
         st.session_state.update({
@@ -63,7 +202,7 @@ def login_user(email: str, password: str):
         })
         st.success("Logged in successfully!")
         return True
-    except requests.HTTPError as e:
+    except httpx.HTTPStatusError as e:
         if e.response.status_code == 401:
             st.error("Login failed: Invalid credentials")
         else:
@@ -76,13 +215,23 @@ def login_user(email: str, password: str):
 
 def logout_user():
     """Log out"""
+    if st.session_state.refresh_token:
+        try:
+            api_request(
+                "POST",
+                "/auth/logout",
+                json={"refresh_token": st.session_state.refresh_token}
+            )
+        except httpx.HTTPError:
+            pass
     st.session_state.update({
         'access_token': None,
         'refresh_token': None,
         'user_email': None,
         'is_logged_in': False,
         'polls': [],
-        'user_votes': {}
+        'user_votes': {},
+        'my_votes_loaded': False
     })
     st.success("Logged out successfully!")
 
@@ -92,8 +241,9 @@ def refresh_access_token():
     if not st.session_state.refresh_token:
         return False
     try:
-        response = requests.post(
-            f"{BASE_URL}/auth/token/refresh",
+        response = api_request(
+            "POST",
+            "/auth/token/refresh",
             json={"refresh_token": st.session_state.refresh_token}
         )
         if response.status_code == 200:
@@ -107,20 +257,59 @@ def refresh_access_token():
         return False
 
 
-def get_all_polls():
-    """Getting all polls"""
+def set_user_votes(response: httpx.Response):
+    st.session_state.user_votes = {
+        int(poll_id): choice_ids for poll_id, choice_ids in response.json().items()
+    }
+    st.session_state.my_votes_loaded = True
+
+
+def load_my_votes():
+    """Restoring polls the user has already voted in"""
     try:
-        response = requests.get(f"{BASE_URL}/polls/")
+        response = api_request(
+            "GET",
+            "/polls/my-votes",
+            headers={"Authorization": f"Bearer {st.session_state.access_token}"}
+        )
         response.raise_for_status()
-        return response.json()
+    except Exception as e:
+        st.error(f"Error fetching your votes: {str(e)}")
+        return
+    set_user_votes(response)
+
+
+def load_polls() -> List[Dict]:
+    """Getting all polls"""
+    api = get_api_client()
+    try:
+        return api.run(api.get_json("/polls/"))
     except Exception as e:
         st.error(f"Error fetching polls: {str(e)}")
         return []
 
 
-def refresh_polls():
-    """Updating list of polls"""
-    st.session_state.polls = get_all_polls()
+def load_dashboard():
+    """Loading everything the page renders in one concurrent batch"""
+    load_votes = (
+        st.session_state.is_logged_in and not st.session_state.my_votes_loaded
+    )
+    try:
+        polls, details, votes_response = get_api_client().run(fetch_dashboard(
+            get_api_client(),
+            st.session_state.access_token if load_votes else None
+        ))
+    except Exception as e:
+        st.error(f"Error fetching polls: {str(e)}")
+        return [], {}
+
+    if votes_response is not None:
+        if votes_response.status_code == 200:
+            set_user_votes(votes_response)
+        elif votes_response.status_code == 401 and refresh_access_token():
+            load_my_votes()
+    st.session_state.polls = polls
+    return polls, details
 
 
 def create_new_poll(poll_data: Dict):
@@ -131,15 +320,14 @@ def create_new_poll(poll_data: Dict):
     }
 
     try:
-        params = {"token": st.session_state.access_token}
-        response = requests.post(
-            f"{BASE_URL}/polls/polls",
+        response = api_request(
+            "POST",
+            "/polls/polls",
             json=poll_data,
-            headers=headers,
-            params=params
-
+            headers=headers
         )
         if response.status_code == 200:
+            invalidate_polls()
             st.success("Poll created successfully!")
             st.rerun()
         else:
@@ -148,7 +336,7 @@ def create_new_poll(poll_data: Dict):
                 st.error(f"Failed to create poll: {error_detail}")
             except json.JSONDecodeError:
                 st.error(f"Server returned invalid response: {response.text}")
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         st.error(f"Connection error: {str(e)}")
     except Exception as e:
         st.error(f"Unexpected error: {str(e)}")
@@ -165,14 +353,14 @@ def submit_vote(poll_id: int, choice_ids: List[int]):
         "Content-Type": "application/json"
     }
     try:
-        params = {"token": st.session_state.access_token, "poll_id": poll_id}
-        response = requests.post(
-            f"{BASE_URL}/polls/{poll_id}/vote",
+        response = api_request(
+            "POST",
+            f"/polls/{poll_id}/vote",
             json={"choice_ids": choice_ids},
-            headers=headers,
-            params=params
+            headers=headers
         )
         if response.status_code == 200:
+            invalidate_polls()
             st.session_state.user_votes[poll_id] = True
             st.success("Vote submitted!")
             return True
@@ -191,15 +379,15 @@ def close_poll(poll_id: int, new_close_date: str = None):
         "Content-Type": "application/json"
     }
     close_data = {"new_close_date": new_close_date} if new_close_date else {}
-    params = {"token": st.session_state.access_token, "poll_id": poll_id}
     try:
-        response = requests.post(
-            f"{BASE_URL}/polls/{poll_id}/close",
+        response = api_request(
+            "POST",
+            f"/polls/{poll_id}/close",
             json=close_data,
-            headers=headers,
-            params=params
+            headers=headers
         )
         if response.status_code == 200:
+            invalidate_polls()
             st.success("Poll closed successfully!")
             st.rerun()
         else:
@@ -239,45 +427,32 @@ def auth_forms():
 
     with tab3:
         st.subheader("View Polls")
-        display_closed_polls()
+        display_closed_polls(load_polls())
 
 
-def get_all_polls_request():
-    response = requests.get(f"{BASE_URL}/polls")
-    if response.status_code != 200:
-        st.error("Error loading polls")
-        return
-    polls = response.json()
-    return polls
-
-
-def display_closed_polls():
-    polls = get_all_polls()
+def display_closed_polls(polls: List[Dict]):
     closed_polls = [p for p in polls if p['is_closed']]
     st.write("### Closed polls")
     for poll in closed_polls:
         render_poll(poll, is_active=False)
 
 
-def display_active_polls():
-    polls = get_all_polls()
-
+def display_active_polls(polls: List[Dict], details: Dict[int, Dict]):
     active_polls = [p for p in polls if not p['is_closed']]
     st.write("### Active polls")
     for poll in active_polls:
-        render_poll(poll, is_active=True)
+        render_poll(poll, is_active=True, details=details.get(poll['id']))
 
 
-def show_voting_form(poll: Dict, session_key: str):
+def show_voting_form(poll: Dict, session_key: str, details: Dict):
     poll_id = poll['id']
-    response = requests.get(f"{BASE_URL}/polls/{poll_id}").json()
-    choices = response['choices']
+    choices = details['choices']
 
     if f'selected_{poll_id}' not in st.session_state:
         st.session_state[f'selected_{poll_id}'] = []
     selected_ids = st.session_state[f'selected_{poll_id}']
 
-    if response['is_multiple_choice']:
+    if details['is_multiple_choice']:
         for choice in choices:
             is_checked = choice['id'] in selected_ids
             checkbox = st.checkbox(
@@ -339,7 +514,7 @@ def show_results(poll: Dict, session_key: str):
             )
 
 
-def render_poll(poll: Dict, is_active: bool):
+def render_poll(poll: Dict, is_active: bool, details: Dict = None):
     poll_id = poll['id']
     container = st.container()
 
@@ -354,8 +529,11 @@ def render_poll(poll: Dict, is_active: bool):
         if f'selected_{poll_id}' not in st.session_state:
             st.session_state[f'selected_{poll_id}'] = []
 
-        if is_active and not st.session_state.user_votes.get(poll_id, False):
-            show_voting_form(poll, session_key)
+        if (
+            is_active and details
+            and not st.session_state.user_votes.get(poll_id, False)
+        ):
+            show_voting_form(poll, session_key, details)
         else:
             show_results(poll, session_key)
 
@@ -366,11 +544,13 @@ def render_poll(poll: Dict, is_active: bool):
 
 def handle_close_poll(poll_id: int):
     try:
-        response = requests.post(
-            f"{BASE_URL}/polls/{poll_id}/close",
+        response = api_request(
+            "POST",
+            f"/polls/{poll_id}/close",
             headers={"Authorization": f"Bearer {st.session_state.access_token}"}
         )
         if response.status_code == 200:
+            invalidate_polls()
             st.success("Poll is closed")
             st.rerun()
     except Exception as e:
@@ -412,14 +592,15 @@ if not st.session_state.is_logged_in:
     auth_forms()
 else:
     st.header(f"Welcome, {st.session_state.user_email}!")
+    polls, details = load_dashboard()
 
     tab1, tab2, tab3 = st.tabs(["Active Polls", "Closed Polls", "Create Poll"])
 
     with tab1:
-        display_active_polls()
+        display_active_polls(polls, details)
 
     with tab2:
-        display_closed_polls()
+        display_closed_polls(polls)
 
     with tab3:
         create_poll_form()
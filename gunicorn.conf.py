@@ -0,0 +1,7 @@
+from app.config import get_settings
+
+settings = get_settings()
+
+bind = settings.BIND
+workers = settings.WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
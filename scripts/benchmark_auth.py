@@ -0,0 +1,111 @@
+"""Бенчмарк разрешения зависимостей аутентификации.
+
+Сравнивает прежнюю схему (модель TokenParam из строки запроса, объявленная
+в обработчике рядом с get_current_admin) с текущей зависимостью, которая
+читает заголовок Authorization и разбирает токен один раз за запрос.
+
+Запуск: python -m scripts.benchmark_auth [--requests 5000]
+"""
+import argparse
+import time
+
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.base import Base
+from app.database.models import User
+from app.database.session import get_db
+from app.modules.auth.services import create_access_token, decode_access_token
+from app.shared.principals import current_token_version
+from app.shared.security import get_current_admin
+
+ADMIN_EMAIL = "benchmark-admin@example.com"
+
+
+class LegacyTokenParam(BaseModel):
+    token: str
+
+
+async def legacy_current_user(
+        token_param: LegacyTokenParam = Depends(), db=Depends(get_db)
+):
+    """Прежняя зависимость: токен только из параметра запроса"""
+    payload = decode_access_token(token_param.token)
+    if not payload or current_token_version(db, payload) is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return {"email": payload["sub"], "role": payload["role"]}
+
+
+async def legacy_current_admin(user=Depends(legacy_current_user)):
+    if user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user
+
+
+def build_app(session_factory) -> FastAPI:
+    app = FastAPI()
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+
+    @app.get("/legacy")
+    async def legacy(
+            token_param: LegacyTokenParam = Depends(),
+            db=Depends(get_db),
+            admin=Depends(legacy_current_admin)
+    ):
+        return {"ok": True}
+
+    @app.get("/bearer")
+    async def bearer(db=Depends(get_db), admin=Depends(get_current_admin)):
+        return {"ok": True}
+
+    return app
+
+
+def timed(label: str, client: TestClient, n_requests: int, path: str, **kwargs):
+    response = client.get(path, **kwargs)
+    assert response.status_code == 200, response.text
+    started = time.perf_counter()
+    for _ in range(n_requests):
+        client.get(path, **kwargs)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32}{elapsed / n_requests * 1e6:8.1f} us/request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auth dependency benchmark")
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as db:
+        db.add(User(email=ADMIN_EMAIL, hashed_password="x", role="admin"))
+        db.commit()
+
+    token = create_access_token({"sub": ADMIN_EMAIL, "role": "admin", "ver": 0})
+    client = TestClient(build_app(session_factory))
+    timed("query TokenParam (before)", client, args.requests, "/legacy",
+          params={"token": token})
+    timed("Authorization header (after)", client, args.requests, "/bearer",
+          headers={"Authorization": f"Bearer {token}"})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Бенчмарк подсчета ранжированных бюллетеней.
+
+Запуск: python -m scripts.benchmark_tally [--ballots 1000000] [--choices 8]
+"""
+import argparse
+import time
+from collections import Counter
+
+import numpy as np
+
+from app.modules.voting import tally
+from app.modules.voting.ballots import encode_ranking, unpack_rankings
+
+
+def make_selections(n_ballots: int, n_choices: int, seed: int) -> list[bytes]:
+    """Случайные частичные ранжирования в формате таблицы ballots"""
+    rng = np.random.default_rng(seed)
+    popularity = np.linspace(1.0, 0.0, n_choices)
+    rankings = np.argsort(-(rng.random((n_ballots, n_choices)) + popularity), axis=1)
+    lengths = rng.integers(1, n_choices + 1, size=n_ballots)
+    return [
+        encode_ranking(ranking[:length])
+        for ranking, length in zip(rankings, lengths)
+    ]
+
+
+def python_instant_runoff(ballots: list[list[int]]):
+    """Наивный IRV: полный пересчет всех бюллетеней в каждом раунде"""
+    eliminated = set()
+    while True:
+        counts = Counter(
+            next(choice for choice in ballot if choice not in eliminated)
+            for ballot in ballots
+            if any(choice not in eliminated for choice in ballot)
+        )
+        total = sum(counts.values())
+        leader, votes = counts.most_common(1)[0]
+        if votes * 2 > total or len(counts) == 1:
+            return leader
+        eliminated.add(min(counts, key=lambda choice: (counts[choice], choice)))
+
+
+def timed(label: str, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<28}{time.perf_counter() - started:8.3f} s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ranked ballot tally benchmark")
+    parser.add_argument("--ballots", type=int, default=1_000_000)
+    parser.add_argument("--choices", type=int, default=8)
+    parser.add_argument("--python-sample", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    selections = timed(
+        "generate + encode", make_selections, args.ballots, args.choices, args.seed
+    )
+    rankings = timed("unpack", unpack_rankings, selections, args.choices)
+    rounds, winner = timed(
+        "irv (numpy)", tally.instant_runoff, rankings, args.choices
+    )
+    timed("borda (numpy)", tally.borda, rankings, args.choices)
+    print(f"irv: {len(rounds)} rounds, winner position {winner}")
+
+    sample = [
+        [int(choice) for choice in ranking if choice < args.choices]
+        for ranking in rankings[:args.python_sample]
+    ]
+    sample_winner = timed(
+        f"irv (python, {len(sample)})", python_instant_runoff, sample
+    )
+    sample_rounds, numpy_winner = tally.instant_runoff(
+        rankings[:args.python_sample], args.choices
+    )
+    assert sample_winner == numpy_winner, (sample_winner, numpy_winner)
+
+
+if __name__ == "__main__":
+    main()